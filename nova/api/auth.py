@@ -119,5 +119,9 @@ class NovaKeystoneContext(wsgi.Middleware):
             LOG.debug("Neither X_USER_ID nor X_USER found in request")
             return webob.exc.HTTPUnauthorized()
 
+        # The context only lives for this request, so each distinct policy
+        # check only needs to be evaluated once, for example when rendering
+        # a list of servers.
+        ctx.enable_policy_cache()
         req.environ['nova.context'] = ctx
         return self.application
@@ -81,6 +81,15 @@ class AvailabilityZoneController(wsgi.Controller):
             host_services[service['availability_zone'] + service['host']].\
                     append(service)
 
+        # Check whether all of the listed services are up at once.
+        listed_services = [service
+                           for zone in available_zones
+                           for host in zone_hosts.get(zone, [])
+                           for service in host_services[zone + host]]
+        alive_services = dict(zip(
+            map(id, listed_services),
+            self.servicegroup_api.services_are_up(listed_services)))
+
         result = []
         for zone in available_zones:
             hosts = {}
@@ -88,7 +97,7 @@ class AvailabilityZoneController(wsgi.Controller):
                 hosts[host] = {}
                 for service in host_services[zone + host]:
                     #检查service是否up
-                    alive = self.servicegroup_api.service_is_up(service)
+                    alive = alive_services[id(service)]
                     hosts[host][service['binary']] = {
                         'available': alive,
                         'active': service['disabled'] is not True,
@@ -50,8 +50,9 @@ class HypervisorsController(wsgi.Controller):
         self.servicegroup_api = servicegroup.API()
 
     def _view_hypervisor(self, hypervisor, service, detail, req, servers=None,
-                         with_servers=False, **kwargs):
-        alive = self.servicegroup_api.service_is_up(service)
+                         with_servers=False, alive=None, **kwargs):
+        if alive is None:
+            alive = self.servicegroup_api.service_is_up(service)
         # The 2.53 microversion returns the compute node uuid rather than id.
         uuid_for_id = api_version_request.is_supported(
             req, min_version=UUID_FOR_ID_MIN_VERSION)
@@ -164,7 +165,10 @@ class HypervisorsController(wsgi.Controller):
                 msg = _('marker [%s] not found') % marker
                 raise webob.exc.HTTPBadRequest(explanation=msg)
 
-        hypervisors_list = []
+        # Look up the services of all of the compute nodes first so that
+        # their state can be checked with a single servicegroup call.
+        hypervisors_services = []
+        services = {}
         #遍历每个compute节点
         for hyp in compute_nodes:
             try:
@@ -172,12 +176,12 @@ class HypervisorsController(wsgi.Controller):
                 if with_servers:
                     instances = self.host_api.instance_get_all_by_host(
                         context, hyp.host)
-                service = self.host_api.service_get_by_compute_host(
-                    context, hyp.host)
-                hypervisors_list.append(
-                    self._view_hypervisor(
-                        hyp, service, detail, req, servers=instances,
-                        with_servers=with_servers))
+                if hyp.host not in services:
+                    services[hyp.host] = (
+                        self.host_api.service_get_by_compute_host(
+                            context, hyp.host))
+                hypervisors_services.append(
+                    (hyp, services[hyp.host], instances))
             except (exception.ComputeHostNotFound,
                     exception.HostMappingNotFound):
                 # The compute service could be deleted which doesn't delete
@@ -187,6 +191,15 @@ class HypervisorsController(wsgi.Controller):
                           'service may be deleted and compute nodes need to '
                           'be manually cleaned up.', hyp.host)
 
+        alive = self.servicegroup_api.services_are_up(
+            [service for _hyp, service, _instances in hypervisors_services])
+        hypervisors_list = [
+            self._view_hypervisor(
+                hyp, service, detail, req, servers=instances,
+                with_servers=with_servers, alive=is_up)
+            for (hyp, service, instances), is_up in zip(
+                hypervisors_services, alive)]
+
         hypervisors_dict = dict(hypervisors=hypervisors_list)
         if links:
             hypervisors_links = self._view_builder.get_links(
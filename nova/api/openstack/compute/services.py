@@ -89,7 +89,7 @@ class ServiceController(wsgi.Controller):
         return _services
 
     def _get_service_detail(self, svc, additional_fields, req,
-                            cell_down_support=False):
+                            cell_down_support=False, alive=None):
         # NOTE(tssurya): The below logic returns a minimal service construct
         # consisting of only the host, binary and status fields for the compute
         # services in the down cell.
@@ -98,7 +98,8 @@ class ServiceController(wsgi.Controller):
                     'host': svc.host,
                     'status': "UNKNOWN"}
 
-        alive = self.servicegroup_api.service_is_up(svc)
+        if alive is None:
+            alive = self.servicegroup_api.service_is_up(svc)
         state = (alive and "up") or "down"
         active = 'enabled'
         if svc['disabled']:
@@ -136,8 +137,15 @@ class ServiceController(wsgi.Controller):
         _services = self._get_services(req)
         cell_down_support = api_version_request.is_supported(req,
             min_version=PARTIAL_CONSTRUCT_FOR_CELL_DOWN_MIN_VERSION)
+        # Check whether all of the services are up at once, except for the
+        # minimal service constructs of the services in down cells.
+        checked = [svc for svc in _services
+                   if not cell_down_support or 'uuid' in svc]
+        alive = dict(zip(map(id, checked),
+                         self.servicegroup_api.services_are_up(checked)))
         return [self._get_service_detail(svc, additional_fields, req,
-                cell_down_support=cell_down_support) for svc in _services]
+                cell_down_support=cell_down_support,
+                alive=alive.get(id(svc))) for svc in _services]
 
     def _enable(self, body, context):
         """Enable scheduling for a service."""
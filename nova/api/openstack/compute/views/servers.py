@@ -71,6 +71,54 @@ class ViewBuilder(common.ViewBuilder):
         self._flavor_builder = views_flavors.ViewBuilder()
         self.compute_api = compute.API()
 
+    @staticmethod
+    def _get_request_cache(request):
+        """Return a dict of values shared by the servers of a request.
+
+        Rendering a list of servers repeatedly needs the same links and
+        lookups for servers sharing an image, a flavor or a host, so they are
+        computed once per request and memoized here.
+        """
+        return request.environ.setdefault('nova.servers_view_cache', {})
+
+    def _get_links(self, request, identifier, collection_name):
+        cache = self._get_request_cache(request)
+        key = ('links', collection_name)
+        if key not in cache:
+            cache[key] = (
+                self._get_href_link(request, '', collection_name),
+                self._get_bookmark_link(request, '', collection_name))
+        href_prefix, bookmark_prefix = cache[key]
+        return [{
+            "rel": "self",
+            "href": common.url_join(href_prefix, str(identifier)),
+        },
+        {
+            "rel": "bookmark",
+            "href": common.url_join(bookmark_prefix, str(identifier)),
+        }]
+
+    def _get_cached_bookmark_link(self, request, builder, identifier,
+                                  collection_name):
+        cache = self._get_request_cache(request)
+        key = ('bookmark', collection_name, identifier)
+        if key not in cache:
+            cache[key] = builder._get_bookmark_link(request, identifier,
+                                                    collection_name)
+        return cache[key]
+
+    @classmethod
+    def _get_availability_zone(cls, request, context, instance):
+        # The availability zone only depends on the host of the instance and
+        # the availability zone recorded in the instance.
+        host = instance.host if 'host' in instance else None
+        key = ('availability_zone', host, instance.get('availability_zone'))
+        cache = cls._get_request_cache(request)
+        if key not in cache:
+            cache[key] = avail_zone.get_instance_availability_zone(context,
+                                                                   instance)
+        return cache[key]
+
     def create(self, request, instance):
         """View that should be returned when an instance is created."""
 
@@ -277,7 +325,7 @@ class ViewBuilder(common.ViewBuilder):
 
         context = request.environ['nova.context']
         if show_AZ:
-            az = avail_zone.get_instance_availability_zone(context, instance)
+            az = self._get_availability_zone(request, context, instance)
             # NOTE(mriedem): The OS-EXT-AZ prefix should not be used for new
             # attributes after v2.1. They are only in v2.1 for backward compat
             # with v2.0.
@@ -524,9 +572,10 @@ class ViewBuilder(common.ViewBuilder):
         image_ref = instance["image_ref"]
         if image_ref:
             image_id = str(common.get_id_from_href(image_ref))
-            bookmark = self._image_builder._get_bookmark_link(request,
-                                                              image_id,
-                                                              "images")
+            bookmark = self._get_cached_bookmark_link(request,
+                                                      self._image_builder,
+                                                      image_id,
+                                                      "images")
             return {
                 "id": image_id,
                 "links": [{
@@ -562,9 +611,10 @@ class ViewBuilder(common.ViewBuilder):
                                          show_extra_specs)
 
         flavor_id = instance_type["flavorid"]
-        flavor_bookmark = self._flavor_builder._get_bookmark_link(request,
-                                                                  flavor_id,
-                                                                  "flavors")
+        flavor_bookmark = self._get_cached_bookmark_link(request,
+                                                         self._flavor_builder,
+                                                         flavor_id,
+                                                         "flavors")
         return {
             "id": str(flavor_id),
             "links": [{
@@ -27,11 +27,13 @@ import webob
 from nova.api.openstack import api_version_request as api_version
 from nova.api.openstack import versioned_method
 from nova.api import wsgi
+import nova.conf
 from nova import exception
 from nova import i18n
 from nova.i18n import _
 
 
+CONF = nova.conf.CONF
 LOG = logging.getLogger(__name__)
 
 _SUPPORTED_CONTENT_TYPES = (
@@ -216,11 +218,58 @@ class JSONDeserializer(ActionDispatcher):
 class JSONDictSerializer(ActionDispatcher):
     """Default JSON request body serialization."""
 
+    # Number of list items encoded together by serialize_iter()
+    _ITER_BATCH_SIZE = 100
+
     def serialize(self, data, action='default'):
         return self.dispatch(data, action=action)
 
     def default(self, data):
-        return six.text_type(jsonutils.dumps(data))
+        return six.text_type(self._dumps(data))
+
+    @staticmethod
+    def _dumps(data):
+        return jsonutils.dumps(data)
+
+    def serialize_iter(self, data, min_items):
+        """Serialize data incrementally.
+
+        Top-level list values of a dict with at least min_items items, like
+        the servers of a servers/detail response, are encoded in batches of
+        items so the whole response never has to be held as one string. The
+        concatenation of the returned chunks is identical to serialize().
+
+        :param data: the response body to serialize
+        :param min_items: the minimum length of a list to encode it
+                          incrementally
+        :returns: an iterator of text chunks, or None if data has no list
+                  large enough to be worth encoding incrementally
+        """
+        if not isinstance(data, dict):
+            return None
+        if not any(isinstance(value, list) and len(value) >= min_items
+                   for value in data.values()):
+            return None
+        if not all(isinstance(key, six.string_types) for key in data):
+            # Leave the conversion of keys to the encoder
+            return None
+        return self._iter_dict(data, min_items)
+
+    def _iter_dict(self, data, min_items):
+        yield '{'
+        for index, (key, value) in enumerate(data.items()):
+            yield '%s%s: ' % (', ' if index else '', self._dumps(key))
+            if isinstance(value, list) and len(value) >= min_items:
+                yield '['
+                for start in range(0, len(value), self._ITER_BATCH_SIZE):
+                    items = value[start:start + self._ITER_BATCH_SIZE]
+                    yield '%s%s' % (', ' if start else '',
+                                    ', '.join(self._dumps(item)
+                                              for item in items))
+                yield ']'
+            else:
+                yield self._dumps(value)
+        yield '}'
 
 
 def response(code):
@@ -282,9 +331,18 @@ class ResponseObject(object):
         serializer = self.serializer
 
         body = None
-        if self.obj is not None:
-            body = serializer.serialize(self.obj)
-        response = webob.Response(body=body)
+        app_iter = None
+        min_items = CONF.api.response_streaming_min_items
+        if self.obj is not None and min_items:
+            app_iter = serializer.serialize_iter(self.obj, min_items)
+        if app_iter is not None:
+            response = webob.Response(
+                app_iter=(encodeutils.safe_encode(chunk)
+                          for chunk in app_iter))
+        else:
+            if self.obj is not None:
+                body = serializer.serialize(self.obj)
+            response = webob.Response(body=body)
         response.status_int = self.code
         for hdr, val in self._headers.items():
             if six.PY2:
@@ -745,6 +803,9 @@ class ControllerMetaclass(type):
         cls_dict['wsgi_actions'] = actions
         if versioned_methods:
             cls_dict[VER_METHOD_ATTR] = versioned_methods
+        # Dispatch table of the versioned method selected for a
+        # (method name, major version, minor version), filled on first use
+        cls_dict['_versioned_dispatch'] = {}
 
         return super(ControllerMetaclass, mcs).__new__(mcs, name, bases,
                                                        cls_dict)
@@ -782,17 +843,28 @@ class Controller(object):
             else:
                 ver = args[0].api_version_request
 
-            func_list = self.versioned_methods[key]
-            for func in func_list:
-                if ver.matches(func.start_version, func.end_version):
-                    # Update the version_select wrapper function so
-                    # other decorator attributes like wsgi.response
-                    # are still respected.
-                    functools.update_wrapper(version_select, func.func)
-                    return func.func(self, *args, **kwargs)
-
-            # No version match
-            raise exception.VersionNotFoundForAPIMethod(version=ver)
+            dispatch = object.__getattribute__(self, '_versioned_dispatch')
+            dispatch_key = (key, ver.ver_major, ver.ver_minor)
+            try:
+                func = dispatch[dispatch_key]
+            except KeyError:
+                func = None
+                for candidate in self.versioned_methods[key]:
+                    if ver.matches(candidate.start_version,
+                                   candidate.end_version):
+                        func = candidate
+                        break
+                dispatch[dispatch_key] = func
+
+            if func is None:
+                # No version match
+                raise exception.VersionNotFoundForAPIMethod(version=ver)
+
+            # Update the version_select wrapper function so
+            # other decorator attributes like wsgi.response
+            # are still respected.
+            functools.update_wrapper(version_select, func.func)
+            return func.func(self, *args, **kwargs)
 
         try:
             version_meth_dict = object.__getattribute__(self, VER_METHOD_ATTR)
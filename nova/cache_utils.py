@@ -109,6 +109,10 @@ class CacheClient(object):
             return None
         return value
 
+    def get_multi(self, keys):
+        return [None if value == cache.NO_VALUE else value
+                for value in self.region.get_multi(keys)]
+
     def set(self, key, value):
         return self.region.set(key, value)
 
@@ -74,6 +74,7 @@ from nova.pci import request as pci_request
 from nova.policies import servers as servers_policies
 import nova.policy
 from nova import profiler
+from nova import quota
 from nova import rpc
 from nova.scheduler.client import query
 from nova.scheduler.client import report
@@ -2474,6 +2475,18 @@ class API(base.Base):
         # during down cell (desperate) situation.
         im = objects.InstanceMapping.get_by_instance_uuid(context,
                                                           instance.uuid)
+        # Only instances which were created in a cell database are counted in
+        # the quota usage counters.
+        if (CONF.quota.count_usage_from_counters and
+                im.cell_mapping is not None):
+            # NOTE: The flag is changed with a conditional update, and only
+            # the caller which changed it updates the counters, so that
+            # concurrent deletes or restores of the instance are only counted
+            # once.
+            if im.set_queued_for_delete(qfd):
+                quota.update_instance_usage_counters(context, instance,
+                                                     count=-1 if qfd else 1)
+            return
         im.queued_for_delete = qfd
         im.save()
 
@@ -3624,12 +3637,18 @@ class API(base.Base):
         # TODO(sean-k-mooney): add PCI NUMA affinity policy check.
 
     @staticmethod
-    def _check_quota_for_upsize(context, instance, current_flavor, new_flavor):
+    def _check_quota_for_upsize(context, instance, current_flavor, new_flavor,
+                                revert=False):
         project_id, user_id = quotas_obj.ids_from_instance(context,
                                                            instance)
         # Deltas will be empty if the resize is not an upsize.
         deltas = compute_utils.upsize_quota_delta(new_flavor,
                                                   current_flavor)
+        # NOTE: The quota usage counters are not lowered when a downsize is
+        # requested, so they still include the usage of the flavor a revert
+        # goes back to.
+        if revert and CONF.quota.count_usage_from_counters:
+            return
         if deltas:
             try:
                 res_deltas = {'cores': deltas.get('cores', 0),
@@ -3656,6 +3675,26 @@ class API(base.Base):
                                                  req=reqs,
                                                  used=useds,
                                                  allowed=total_alloweds)
+            if revert:
+                return
+            # NOTE: The upsize is added to the quota usage counters now rather
+            # than when compute switches the flavor of the instance, so that
+            # a resize which fails leaves the counters above the actual usage
+            # rather than below it until they are reconciled.
+            quota.update_usage_counters(context, project_id, user_id, deltas)
+
+    @staticmethod
+    def _revert_usage_counters_for_upsize(context, instance):
+        if not CONF.quota.count_usage_from_counters:
+            return
+        deltas = compute_utils.upsize_quota_delta(instance.flavor,
+                                                  instance.old_flavor)
+        if deltas:
+            project_id, user_id = quotas_obj.ids_from_instance(context,
+                                                               instance)
+            quota.update_usage_counters(
+                context, project_id, user_id,
+                {resource: -delta for resource, delta in deltas.items()})
 
     @check_instance_lock
     @check_instance_state(vm_state=[vm_states.RESIZED])
@@ -3669,7 +3708,7 @@ class API(base.Base):
 
         # If this is a resize down, a revert might go over quota.
         self._check_quota_for_upsize(context, instance, instance.flavor,
-                                     instance.old_flavor)
+                                     instance.old_flavor, revert=True)
 
         # The AZ for the server may have changed when it was migrated so while
         # we are in the API and have access to the API DB, update the
@@ -3723,6 +3762,11 @@ class API(base.Base):
         instance.task_state = task_states.RESIZE_REVERTING
         instance.save(expected_task_state=[None])
 
+        # Remove the upsize added to the quota usage counters when the resize
+        # was requested, now that the task state guards against concurrent
+        # reverts.
+        self._revert_usage_counters_for_upsize(context, instance)
+
         migration.status = 'reverting'
         migration.save()
 
@@ -3761,6 +3805,13 @@ class API(base.Base):
         migration.status = 'confirming'
         migration.save()
 
+        # The quota usage counters are not lowered when a downsize is
+        # requested, so count the usage again now that it is confirmed.
+        if (CONF.quota.count_usage_from_counters and
+                compute_utils.upsize_quota_delta(instance.old_flavor,
+                                                 instance.flavor)):
+            quota.invalidate_usage_counters(context, instance.project_id)
+
         self._record_action_start(context, instance,
                                   instance_actions.CONFIRM_RESIZE)
 
@@ -171,8 +171,13 @@ def get_instance_objects_sorted(ctx, filters, limit, marker, expected_attrs,
         expected_attrs = copy.copy(expected_attrs)
         expected_attrs.remove('fault')
 
+    defer_attrs = None
+    if CONF.api.instance_list_deferred_hydration:
+        defer_attrs = instance_obj._INSTANCE_DEFERRABLE_FIELDS
+
     instance_list = instance_obj._make_instance_list(ctx,
-        objects.InstanceList(), instance_generator, expected_attrs)
+        objects.InstanceList(), instance_generator, expected_attrs,
+        defer_attrs=defer_attrs)
     down_cell_uuids = (instance_lister.cells_failed +
                        instance_lister.cells_timed_out)
     return instance_list, down_cell_uuids
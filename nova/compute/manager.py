@@ -27,6 +27,7 @@ terminating it.
 
 import base64
 import binascii
+import collections
 import contextlib
 import copy
 import functools
@@ -602,6 +603,8 @@ class ComputeManager(manager.Manager):
         else:
             # CONF.max_concurrent_live_migrations is 0 (unlimited)
             self._live_migration_executor = futurist.GreenThreadPoolExecutor()
+        self._live_migration_memory_budget = compute_utils.MemoryBudget(
+            CONF.max_concurrent_live_migration_memory_mb)
         # This is a dict, keyed by instance uuid, to a two-item tuple of
         # migration object and Future for the queued live migration.
         self._waiting_live_migrations = {}
@@ -1547,7 +1550,9 @@ class ComputeManager(manager.Manager):
             # to move on since there isn't anything we can do.
             if future is None:
                 continue
-            if future.cancel():
+            if (future.cancel() or
+                    self._live_migration_memory_budget.cancel(
+                        migration.instance_uuid)):
                 self._set_migration_status(migration, 'cancelled')
                 LOG.info('Successfully cancelled queued live migration.',
                          instance_uuid=migration.instance_uuid)
@@ -7763,34 +7768,56 @@ class ComputeManager(manager.Manager):
             phase=fields.NotificationPhase.START, bdms=bdms)
 
         connector = self.driver.get_volume_connector(instance)
+        volume_bdms = [bdm for bdm in bdms
+                       if bdm.is_volume and bdm.attachment_id is not None]
+        # The errors raised while creating the attachments. No more
+        # attachments are created once one has failed.
+        attach_errors = []
+
+        def _create_attachment(bdm):
+            if attach_errors:
+                return
+            try:
+                # This bdm uses the new cinder v3.44 API.
+                # We will create a new attachment for this
+                # volume on this migration destination host. The old
+                # attachment will be deleted on the source host
+                # when the migration succeeds. The old attachment_id
+                # is stored in dict with the key being the bdm.volume_id
+                # so it can be restored on rollback.
+                #
+                # Also note that attachment_update is not needed as we
+                # are providing the connector in the create call.
+                attach_ref = self.volume_api.attachment_create(
+                    context, bdm.volume_id, bdm.instance_uuid,
+                    connector=connector, mountpoint=bdm.device_name)
+
+                # save current attachment so we can detach it on success,
+                # or restore it on a rollback.
+                # NOTE(mdbooth): This data is no longer used by the source
+                # host since change Ibe9215c0. We can't remove it until we
+                # are sure the source host has been upgraded.
+                migrate_data.old_vol_attachment_ids[bdm.volume_id] = \
+                    bdm.attachment_id
+
+                # update the bdm with the new attachment_id.
+                bdm.attachment_id = attach_ref['id']
+                bdm.save()
+            except Exception as e:
+                attach_errors.append(e)
+
         try:
-            for bdm in bdms:
-                if bdm.is_volume and bdm.attachment_id is not None:
-                    # This bdm uses the new cinder v3.44 API.
-                    # We will create a new attachment for this
-                    # volume on this migration destination host. The old
-                    # attachment will be deleted on the source host
-                    # when the migration succeeds. The old attachment_id
-                    # is stored in dict with the key being the bdm.volume_id
-                    # so it can be restored on rollback.
-                    #
-                    # Also note that attachment_update is not needed as we
-                    # are providing the connector in the create call.
-                    attach_ref = self.volume_api.attachment_create(
-                        context, bdm.volume_id, bdm.instance_uuid,
-                        connector=connector, mountpoint=bdm.device_name)
-
-                    # save current attachment so we can detach it on success,
-                    # or restore it on a rollback.
-                    # NOTE(mdbooth): This data is no longer used by the source
-                    # host since change Ibe9215c0. We can't remove it until we
-                    # are sure the source host has been upgraded.
-                    migrate_data.old_vol_attachment_ids[bdm.volume_id] = \
-                        bdm.attachment_id
-
-                    # update the bdm with the new attachment_id.
-                    bdm.attachment_id = attach_ref['id']
-                    bdm.save()
+            # Create the attachments at most
+            # [compute]/live_migration_volume_attach_concurrency at a time.
+            # All of them are created or have failed before the first error
+            # is raised, so that they are all rolled back.
+            attach_pool = eventlet.GreenPool(
+                size=CONF.compute.live_migration_volume_attach_concurrency)
+            for bdm in volume_bdms:
+                attach_pool.spawn_n(_create_attachment, bdm)
+            attach_pool.waitall()
+            if attach_errors:
+                raise attach_errors[0]
 
             block_device_info = self._get_instance_block_device_info(
                                 context, instance, refresh_conn_info=True,
@@ -7833,10 +7860,22 @@ class ComputeManager(manager.Manager):
 
         # Volume connections are complete, tell cinder that all the
         # attachments have completed.
-        for bdm in bdms:
-            if bdm.is_volume and bdm.attachment_id is not None:
+        complete_errors = []
+
+        def _complete_attachment(bdm):
+            try:
                 self.volume_api.attachment_complete(context,
                                                     bdm.attachment_id)
+            except Exception as e:
+                complete_errors.append(e)
+
+        complete_pool = eventlet.GreenPool(
+            size=CONF.compute.live_migration_volume_attach_concurrency)
+        for bdm in volume_bdms:
+            complete_pool.spawn_n(_complete_attachment, bdm)
+        complete_pool.waitall()
+        if complete_errors:
+            raise complete_errors[0]
 
         self._notify_about_instance_usage(
                      context, instance, "live_migration.pre.end",
@@ -8016,6 +8055,24 @@ class ComputeManager(manager.Manager):
                     source_bdms)
         return migrate_data
 
+    def _do_live_migration_in_memory_budget(self, context, dest, instance,
+                                            block_migration, migration,
+                                            migrate_data):
+        # NOTE: The migration stays queued until the memory of the instance
+        # fits in [DEFAULT]/max_concurrent_live_migration_memory_mb. The wait
+        # is cancelled when the queued migration is aborted.
+        budget = self._live_migration_memory_budget
+        memory_mb = instance.flavor.memory_mb if budget.total_mb else 0
+        try:
+            with budget.reserve(memory_mb, key=instance.uuid):
+                self._do_live_migration(context, dest, instance,
+                                        block_migration, migration,
+                                        migrate_data)
+        except exception.MemoryBudgetReservationCancelled:
+            LOG.debug('Queued migration %s aborted while waiting for the '
+                      'live migration memory budget.', migration.uuid,
+                      instance=instance)
+
     def _do_live_migration(self, context, dest, instance, block_migration,
                            migration, migrate_data):
         # NOTE(danms): We should enhance the RT to account for migrations
@@ -8107,8 +8164,8 @@ class ComputeManager(manager.Manager):
         self._waiting_live_migrations[instance.uuid] = (None, None)
         try:
             future = self._live_migration_executor.submit(
-                self._do_live_migration, context, dest, instance,
-                block_migration, migration, migrate_data)
+                self._do_live_migration_in_memory_budget, context, dest,
+                instance, block_migration, migration, migrate_data)
             self._waiting_live_migrations[instance.uuid] = (migration, future)
         except RuntimeError:
             # GreenThreadPoolExecutor.submit will raise RuntimeError if the
@@ -8188,16 +8245,19 @@ class ComputeManager(manager.Manager):
         try:
             migration, future = (
                 self._waiting_live_migrations.pop(instance.uuid))
-            if future and future.cancel():
+            if future and (future.cancel() or
+                           self._live_migration_memory_budget.cancel(
+                               instance.uuid)):
                 # If we got here, we've successfully aborted the queued
-                # migration and _do_live_migration won't run so we need
-                # to set the migration status to cancelled and send the
-                # notification. If Future.cancel() fails, it means
-                # _do_live_migration is running and the migration status
-                # is preparing, and _do_live_migration() itself will attempt
-                # to pop the queued migration, hit a KeyError, and rollback,
-                # set the migration to cancelled and send the
-                # live.migration.abort.end notification.
+                # migration, either before it started or while it waited
+                # for the live migration memory budget, and
+                # _do_live_migration won't run so we need to set the
+                # migration status to cancelled and send the notification.
+                # If both fail, it means _do_live_migration is running and
+                # the migration status is preparing, and _do_live_migration()
+                # itself will attempt to pop the queued migration, hit a
+                # KeyError, and rollback, set the migration to cancelled and
+                # send the live.migration.abort.end notification.
                 self._set_migration_status(migration, 'cancelled')
         except KeyError:
             migration = objects.Migration.get_by_id(context, migration_id)
@@ -10211,8 +10271,7 @@ class ComputeManager(manager.Manager):
 
         results = {}
 
-        LOG.info('Caching %i image(s) by request', len(image_ids))
-        for image_id in image_ids:
+        def _cache_image(image_id):
             try:
                 cached = self.driver.cache_image(context, image_id)
                 if cached:
@@ -10233,6 +10292,16 @@ class ComputeManager(manager.Manager):
                           {'image_id': image_id,
                            'err': e})
 
+        LOG.info('Caching %i image(s) by request', len(image_ids))
+        # Download the images in the requested order, at most
+        # [image_cache]/precache_host_concurrency of them at a time. An image
+        # requested more than once is only downloaded once.
+        fetch_pool = eventlet.GreenPool(
+            size=CONF.image_cache.precache_host_concurrency)
+        for image_id in collections.OrderedDict.fromkeys(image_ids):
+            fetch_pool.spawn_n(_cache_image, image_id)
+        fetch_pool.waitall()
+
         return results
 
     @periodic_task.periodic_task(spacing=CONF.instance_delete_interval)
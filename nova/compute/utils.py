@@ -16,11 +16,13 @@
 
 import contextlib
 import functools
+import heapq
 import inspect
 import itertools
 import math
 import traceback
 
+import eventlet.event
 import netifaces
 from oslo_log import log
 from oslo_serialization import jsonutils
@@ -1460,6 +1462,88 @@ class UnlimitedSemaphore(object):
         return 0
 
 
+class MemoryBudget(object):
+    """Limit the total memory of the instances of concurrent operations.
+
+    An operation reserves the memory of its instance from the budget, and
+    waits for enough of the budget to be released by other operations when
+    it does not fit. The waiting operation with the least memory is resumed
+    first. An operation reserving more memory than the budget only waits for
+    all other operations to be done. A waiting operation can be cancelled by
+    the key it reserved the memory with.
+
+    :param total_mb: The budget in MiB, or 0 for an unlimited budget.
+    """
+
+    def __init__(self, total_mb):
+        self.total_mb = total_mb
+        self.used_mb = 0
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def _resume_waiters(self):
+        while (self._waiters and
+               self.used_mb + self._waiters[0][0] <= self.total_mb):
+            memory_mb, _, _, event = heapq.heappop(self._waiters)
+            self.used_mb += memory_mb
+            event.send(True)
+
+    def _remove_waiter(self, waiter):
+        self._waiters.remove(waiter)
+        heapq.heapify(self._waiters)
+
+    def cancel(self, key):
+        """Cancel the reservations waiting with the given key.
+
+        The cancelled reservations raise MemoryBudgetReservationCancelled.
+
+        :returns: True if a waiting reservation was cancelled, else False.
+        """
+        if key is None:
+            return False
+        cancelled = [waiter for waiter in self._waiters if waiter[2] == key]
+        for waiter in cancelled:
+            self._remove_waiter(waiter)
+            waiter[3].send(False)
+        return bool(cancelled)
+
+    @contextlib.contextmanager
+    def reserve(self, memory_mb, key=None):
+        """Reserve memory from the budget for the duration of the context.
+
+        :param memory_mb: The memory to reserve in MiB.
+        :param key: An optional key to cancel the reservation with while it
+            waits.
+        :raises: MemoryBudgetReservationCancelled if cancelled while waiting.
+        """
+        if not self.total_mb:
+            yield
+            return
+
+        memory_mb = min(memory_mb, self.total_mb)
+        event = eventlet.event.Event()
+        waiter = (memory_mb, next(self._counter), key, event)
+        heapq.heappush(self._waiters, waiter)
+        self._resume_waiters()
+        try:
+            reserved = event.wait()
+        except BaseException:
+            # The waiting greenthread was killed.
+            with excutils.save_and_reraise_exception():
+                if not event.ready():
+                    self._remove_waiter(waiter)
+                elif event.wait():
+                    self.used_mb -= memory_mb
+                    self._resume_waiters()
+        if not reserved:
+            raise exception.MemoryBudgetReservationCancelled(key=key)
+        try:
+            yield
+        finally:
+            self.used_mb -= memory_mb
+            self._resume_waiters()
+
+
 # This semaphore is used to enforce a limit on disk-IO-intensive operations
 # (image downloads, image conversions) at any given time.
 # It is initialized at ComputeManager.init_host()
@@ -26,6 +26,7 @@ from oslo_db import exception as db_exc
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_serialization import jsonutils
+from oslo_service import periodic_task
 from oslo_utils import excutils
 from oslo_utils import timeutils
 from oslo_utils import versionutils
@@ -53,11 +54,13 @@ from nova import objects
 from nova.objects import base as nova_object
 from nova.objects import fields
 from nova import profiler
+from nova import quota
 from nova import rpc
 from nova.scheduler.client import query
 from nova.scheduler.client import report
 from nova.scheduler import utils as scheduler_utils
 from nova import servicegroup
+from nova.servicegroup import heartbeat
 from nova import utils
 from nova.volume import cinder
 
@@ -112,13 +115,20 @@ class ConductorManager(manager.Manager):
     namespace.  See the ComputeTaskManager class for details.
     """
 
-    target = messaging.Target(version='3.0')
+    target = messaging.Target(version='3.1')
 
     def __init__(self, *args, **kwargs):
         super(ConductorManager, self).__init__(service_name='conductor',
                                                *args, **kwargs)
         self.compute_task_mgr = ComputeTaskManager()
         self.additional_endpoints.append(self.compute_task_mgr)
+        # Map of object action name to [calls, coalesced calls, total
+        # seconds, max seconds], see _record_object_action.
+        self._object_action_stats = collections.defaultdict(
+            lambda: [0, 0, 0.0, 0.0])
+        # Map of coalesce key to the eventlet Event of the object class
+        # action in progress, see _coalesce_object_class_action.
+        self._object_class_actions_in_progress = {}
 
     # NOTE(hanlind): This can be removed in version 4.0 of the RPC API
     def provider_fw_rule_get_all(self, context):
@@ -139,8 +149,99 @@ class ConductorManager(manager.Manager):
         except Exception:
             raise messaging.ExpectedException()
 
+    def _record_object_action(self, action, elapsed, coalesced=False):
+        if CONF.conductor.object_action_stats_interval <= 0:
+            return
+        stats = self._object_action_stats[action]
+        stats[0] += 1
+        if coalesced:
+            stats[1] += 1
+        stats[2] += elapsed
+        stats[3] = max(stats[3], elapsed)
+
+    @periodic_task.periodic_task(
+        spacing=CONF.conductor.object_action_stats_interval)
+    def _log_object_action_stats(self, context):
+        if CONF.conductor.object_action_stats_interval <= 0:
+            return
+        stats, self._object_action_stats = (
+            self._object_action_stats,
+            collections.defaultdict(lambda: [0, 0, 0.0, 0.0]))
+        # Log the actions which took the most time in total first.
+        for action, (calls, coalesced, total, maximum) in sorted(
+                stats.items(), key=lambda item: item[1][2], reverse=True):
+            LOG.info('Object action %(action)s: %(calls)d calls '
+                     '(%(coalesced)d coalesced), average %(avg).3f seconds, '
+                     'maximum %(max).3f seconds.',
+                     {'action': action, 'calls': calls,
+                      'coalesced': coalesced, 'avg': total / calls,
+                      'max': maximum})
+
+    @staticmethod
+    def _get_coalesce_key(context, objname, objmethod, object_versions,
+                          args, kwargs):
+        """Get the key identifying identical object class action calls.
+
+        :returns: A hashable key, or None if the call should not be coalesced
+        """
+        action = '%s.%s' % (objname, objmethod)
+        if action not in CONF.conductor.coalesced_object_class_actions:
+            return None
+        try:
+            # NOTE: Only coalesce calls whose arguments are plain primitives,
+            # objects and other types are not reliably comparable.
+            call_args = jsonutils.dumps([args, kwargs], sort_keys=True,
+                                        default=None)
+        except (TypeError, ValueError):
+            return None
+        return (action, tuple(sorted(object_versions.items())), call_args,
+                context.user_id, context.project_id, context.is_admin,
+                context.read_deleted)
+
+    def _coalesce_object_class_action(self, key, fn):
+        """Call fn, or wait for the identical call already in progress.
+
+        :returns: A tuple of the result and whether the call was coalesced
+        """
+        event = self._object_class_actions_in_progress.get(key)
+        if event is not None:
+            return event.wait(), True
+        event = eventlet.event.Event()
+        self._object_class_actions_in_progress[key] = event
+        try:
+            result = fn()
+        except Exception as exc:
+            event.send_exception(exc)
+            raise
+        else:
+            event.send(result)
+        finally:
+            del self._object_class_actions_in_progress[key]
+        return result, False
+
     def object_class_action_versions(self, context, objname, objmethod,
                                      object_versions, args, kwargs):
+        timer = timeutils.StopWatch()
+        timer.start()
+        coalesced = False
+        try:
+            key = self._get_coalesce_key(context, objname, objmethod,
+                                         object_versions, args, kwargs)
+            if key is None:
+                return self._object_class_action_versions(
+                    context, objname, objmethod, object_versions, args,
+                    kwargs)
+            result, coalesced = self._coalesce_object_class_action(
+                key, functools.partial(
+                    self._object_class_action_versions, context, objname,
+                    objmethod, object_versions, args, kwargs))
+            return result
+        finally:
+            self._record_object_action('%s.%s' % (objname, objmethod),
+                                       timer.elapsed(), coalesced)
+
+    def _object_class_action_versions(self, context, objname, objmethod,
+                                      object_versions, args, kwargs):
         objclass = nova_object.NovaObject.obj_class_from_name(
             objname, object_versions[objname])
         args = tuple([context] + list(args))
@@ -166,6 +267,16 @@ class ConductorManager(manager.Manager):
 
     def object_action(self, context, objinst, objmethod, args, kwargs):
         """Perform an action on an object."""
+        timer = timeutils.StopWatch()
+        timer.start()
+        try:
+            return self._object_action(context, objinst, objmethod, args,
+                                       kwargs)
+        finally:
+            self._record_object_action(
+                '%s.%s' % (objinst.obj_name(), objmethod), timer.elapsed())
+
+    def _object_action(self, context, objinst, objmethod, args, kwargs):
         oldobj = objinst.obj_clone()
         result = self._object_dispatch(objinst, objmethod, args, kwargs)
         updates = dict()
@@ -184,6 +295,14 @@ class ConductorManager(manager.Manager):
         updates['obj_what_changed'] = objinst.obj_what_changed()
         return updates, result
 
+    def service_heartbeat(self, context, service_id):
+        """Record a state report from a service.
+
+        This is used by the batch servicegroup driver, see
+        nova.servicegroup.drivers.batch.
+        """
+        heartbeat.HEARTBEATS.record(service_id)
+
     def object_backport_versions(self, context, objinst, object_versions):
         target = object_versions[objinst.obj_name()]
         LOG.debug('Backporting %(obj)s to %(ver)s with versions %(manifest)s',
@@ -1414,6 +1533,7 @@ class ComputeTaskManager(base.Base):
 
             with obj_target_cell(instance, cell0) as cctxt:
                 instance.create()
+                quota.update_instance_usage_counters(context, instance)
                 if inst_mapping:
                     inst_mapping.cell_mapping = cell0
                     inst_mapping.save()
@@ -1469,6 +1589,13 @@ class ComputeTaskManager(base.Base):
         cell_mapping_cache = {}
         instances = []
         host_az = {}  # host=az cache to optimize multi-create
+        batch_db_updates = CONF.conductor.batch_multi_create_db_updates
+        build_request_uuids = None
+        if batch_db_updates:
+            # NOTE: Look up which build requests are still around with a
+            # single query rather than one query per instance below.
+            build_request_uuids = objects.BuildRequestList.get_instance_uuids(
+                context, instance_uuids)
 
         for (build_request, request_spec, host_list) in six.moves.zip(
                 build_requests, request_specs, host_lists):
@@ -1503,8 +1630,8 @@ class ComputeTaskManager(base.Base):
             # the build request is still around and wasn't deleted by the user
             # already.
             try:
-                objects.BuildRequest.get_by_instance_uuid(
-                    context, instance.uuid)
+                self._check_build_request_exists(
+                    context, instance, build_request_uuids)
             except exception.BuildRequestNotFound:
                 # the build request is gone so we're done for this instance
                 LOG.debug('While scheduling instance, the build request '
@@ -1534,6 +1661,13 @@ class ComputeTaskManager(base.Base):
                     instances.append(instance)
                     cell_mapping_cache[instance.uuid] = cell
 
+        # Add the usage of the created instances to the quota usage counters,
+        # which the quota recheck below may count from.
+        created = [inst for inst in instances if inst is not None]
+        if created:
+            quota.update_instance_usage_counters(context, created[0],
+                                                 count=len(created))
+
         # NOTE(melwitt): We recheck the quota after creating the
         # objects to prevent users from allocating more resources
         # than their allowed quota in the event of a race. This is
@@ -1552,6 +1686,10 @@ class ComputeTaskManager(base.Base):
                                                   block_device_mapping, tags,
                                                   cell_mapping_cache)
 
+        # When batching, a list of (build_request, request_spec, instance,
+        # cell, host, host_list, filter_props, instance_bdms, instance_tags)
+        # tuples which are ready to be mapped to their cell and built.
+        builds = []
         zipped = six.moves.zip(build_requests, request_specs, host_lists,
                               instances)
         for (build_request, request_spec, host_list, instance) in zipped:
@@ -1604,35 +1742,126 @@ class ComputeTaskManager(base.Base):
             instance.tags = instance_tags if instance_tags \
                 else objects.TagList()
 
-            # Update mapping for instance.
-            self._map_instance_to_cell(context, instance, cell)
-
-            if not self._delete_build_request(
-                    context, build_request, instance, cell, instance_bdms,
-                    instance_tags):
-                # The build request was deleted before/during scheduling so
-                # the instance is gone and we don't have anything to build for
-                # this one.
+            if batch_db_updates:
+                # The instance mappings are updated for all of the instances
+                # at once below.
+                builds.append((build_request, request_spec, instance, cell,
+                               host, host_list, filter_props, instance_bdms,
+                               instance_tags))
                 continue
-
-            # NOTE(danms): Compute RPC expects security group names or ids
-            # not objects, so convert this to a list of names until we can
-            # pass the objects.
-            legacy_secgroups = [s.identifier
-                                for s in request_spec.security_groups]
-            with obj_target_cell(instance, cell) as cctxt:
-                #要求在host节点上创建虚机
-                self.compute_rpcapi.build_and_run_instance(
-                    cctxt, instance=instance, image=image,
-                    request_spec=request_spec,
-                    filter_properties=filter_props,
+            self._build_and_run_instance(
+                context, build_request, request_spec, instance, cell, host,
+                host_list, filter_props, instance_bdms, instance_tags, image,
+                admin_password, injected_files, requested_networks)
+
+        if batch_db_updates and builds:
+            self._map_instances_to_cells(
+                context, [(b[2], b[3]) for b in builds])
+            for build in builds:
+                self._build_and_run_instance(
+                    context, *build, image=image,
                     admin_password=admin_password,
                     injected_files=injected_files,
                     requested_networks=requested_networks,
-                    security_groups=legacy_secgroups,
-                    block_device_mapping=instance_bdms,
-                    host=host.service_host, node=host.nodename,
-                    limits=host.limits, host_list=host_list)
+                    instance_mapped=True)
+
+    def _build_and_run_instance(self, context, build_request, request_spec,
+                                instance, cell, host, host_list, filter_props,
+                                instance_bdms, instance_tags, image,
+                                admin_password, injected_files,
+                                requested_networks, instance_mapped=False):
+        """Map a created instance to its cell and cast to build it.
+
+        :param instance_mapped: True if the instance mapping already points at
+            the given cell, False if it should be updated here.
+        """
+        # NOTE(mdbooth): The instance mapping must be updated after the
+        #                instance record is complete in the cell, and before
+        #                the build request is destroyed.
+        if not instance_mapped:
+            # Update mapping for instance.
+            self._map_instance_to_cell(context, instance, cell)
+
+        if not self._delete_build_request(
+                context, build_request, instance, cell, instance_bdms,
+                instance_tags):
+            # The build request was deleted before/during scheduling so
+            # the instance is gone and we don't have anything to build for
+            # this one.
+            return
+
+        # NOTE(danms): Compute RPC expects security group names or ids
+        # not objects, so convert this to a list of names until we can
+        # pass the objects.
+        legacy_secgroups = [s.identifier
+                            for s in request_spec.security_groups]
+        with obj_target_cell(instance, cell) as cctxt:
+            #要求在host节点上创建虚机
+            self.compute_rpcapi.build_and_run_instance(
+                cctxt, instance=instance, image=image,
+                request_spec=request_spec,
+                filter_properties=filter_props,
+                admin_password=admin_password,
+                injected_files=injected_files,
+                requested_networks=requested_networks,
+                security_groups=legacy_secgroups,
+                block_device_mapping=instance_bdms,
+                host=host.service_host, node=host.nodename,
+                limits=host.limits, host_list=host_list)
+
+    @staticmethod
+    def _check_build_request_exists(context, instance, build_request_uuids):
+        """Check that the build request for an instance still exists.
+
+        :param context: nova auth RequestContext
+        :param instance: Instance object being built
+        :param build_request_uuids: Set of instance UUIDs which were found to
+            have a build request by a single bulk lookup, or None to look up
+            the build request for this instance.
+        :raises: BuildRequestNotFound if the build request was deleted
+        """
+        if build_request_uuids is None:
+            objects.BuildRequest.get_by_instance_uuid(context, instance.uuid)
+        elif instance.uuid not in build_request_uuids:
+            raise exception.BuildRequestNotFound(uuid=instance.uuid)
+
+    @staticmethod
+    def _map_instances_to_cells(context, instances_and_cells):
+        """Update the instance mappings to point at their given cells.
+
+        This is the bulk version of _map_instance_to_cell, which loads all of
+        the instance mappings with a single query and updates them with a
+        single query per cell.
+
+        :param context: nova auth RequestContext
+        :param instances_and_cells: List of (Instance, CellMapping) tuples for
+            the instances being built and the cells they were created in.
+        """
+        uuids = [inst.uuid for inst, cell in instances_and_cells]
+        inst_mappings = {
+            im.instance_uuid: im for im in
+            objects.InstanceMappingList.get_by_instance_uuids(context, uuids)}
+        uuids_by_cell = collections.OrderedDict()
+        cells_by_uuid = {}
+        for instance, cell in instances_and_cells:
+            inst_mapping = inst_mappings.get(instance.uuid)
+            if inst_mapping is None:
+                raise exception.InstanceMappingNotFound(uuid=instance.uuid)
+            # Perform the same final sanity check as _map_instance_to_cell.
+            if (inst_mapping.obj_attr_is_set('cell_mapping') and
+                    inst_mapping.cell_mapping is not None):
+                LOG.error('During scheduling instance is already mapped to '
+                          'another cell: %s. This should not happen and is an '
+                          'indication of bigger problems. If you see this you '
+                          'should report it to the nova team. Overwriting '
+                          'the mapping to point at cell %s.',
+                          inst_mapping.cell_mapping.identity, cell.identity,
+                          instance=instance)
+            uuids_by_cell.setdefault(cell.uuid, []).append(instance.uuid)
+            cells_by_uuid[cell.uuid] = cell
+        for cell_uuid, cell_instance_uuids in uuids_by_cell.items():
+            objects.InstanceMappingList.update_cell_bulk(
+                context, cell_instance_uuids, cells_by_uuid[cell_uuid])
 
     @staticmethod
     def _map_instance_to_cell(context, instance, cell):
@@ -1777,6 +2006,27 @@ class ComputeTaskManager(base.Base):
             return False
         return True
 
+    @staticmethod
+    def _get_precache_concurrency(aggregate):
+        """Get the number of hosts to pre-cache images on in parallel.
+
+        This is the precache_concurrency metadata of the aggregate if set,
+        [image_cache]/precache_concurrency otherwise.
+        """
+        value = None
+        if aggregate.obj_attr_is_set('metadata'):
+            value = aggregate.metadata.get('precache_concurrency')
+        if value is not None:
+            try:
+                if int(value) > 0:
+                    return int(value)
+            except ValueError:
+                pass
+            LOG.warning('Ignoring invalid precache_concurrency metadata '
+                        '%(value)r of aggregate %(aggregate)s',
+                        {'value': value, 'aggregate': aggregate.uuid})
+        return CONF.image_cache.precache_concurrency
+
     def cache_images(self, context, aggregate, image_ids):
         """Cache a set of images on the set of hosts in an aggregate.
 
@@ -1794,7 +2044,7 @@ class ComputeTaskManager(base.Base):
             fields.NotificationPhase.START)
 
         clock = timeutils.StopWatch()
-        threads = CONF.image_cache.precache_concurrency
+        threads = self._get_precache_concurrency(aggregate)
         fetch_pool = eventlet.GreenPool(size=threads)
 
         hosts_by_cell = {}
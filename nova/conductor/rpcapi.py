@@ -198,6 +198,8 @@ class ConductorAPI(object):
     that they can handle the version_cap being set to 3.0.
 
     * Remove provider_fw_rule_get_all()
+
+    * 3.1  - Add service_heartbeat()
     """
 
     VERSION_ALIASES = {
@@ -252,6 +254,13 @@ class ConductorAPI(object):
         return cctxt.call(context, 'object_backport_versions', objinst=objinst,
                           object_versions=object_versions)
 
+    def can_send_service_heartbeat(self):
+        return self.client.can_send_version('3.1')
+
+    def service_heartbeat(self, context, service_id):
+        cctxt = self.client.prepare(version='3.1')
+        cctxt.cast(context, 'service_heartbeat', service_id=service_id)
+
 #向conductor发送消息
 @profiler.trace_cls("rpc")
 class ComputeTaskAPI(object):
@@ -66,6 +66,7 @@ class LiveMigrationTask(base.TaskBase):
         self.request_spec = request_spec
         self._source_cn = None
         self._held_allocations = None
+        self._compute_info = {}
         self.network_api = neutron.API()
 
     def _execute(self):
@@ -319,8 +320,14 @@ class LiveMigrationTask(base.TaskBase):
                     mem_inst=mem_inst))
 
     def _get_compute_info(self, host):
-        return objects.ComputeNode.get_first_node_by_host_for_old_compat(
-            self.context, host)
+        # NOTE: The compute node of the source host is needed for each
+        # destination host checked, and the compute node of a requested
+        # destination host by several checks, so look each one up once.
+        if host not in self._compute_info:
+            self._compute_info[host] = (
+                objects.ComputeNode.get_first_node_by_host_for_old_compat(
+                    self.context, host))
+        return self._compute_info[host]
 
     def _check_compatible_with_source_hypervisor(self, destination):
         source_info = self._get_compute_info(self.source)
@@ -340,6 +347,11 @@ class LiveMigrationTask(base.TaskBase):
     def _call_livem_checks_on_host(self, destination, provider_mapping):
         self._check_can_migrate_specific_resources()
         self._check_can_migrate_pci(self.source, destination)
+        # NOTE: The destination and source checks are done for this instance
+        # only. Each live migration comes from its own API request and runs
+        # its own task, so the checks of the instances of a host drain are
+        # not batched into one RPC, and the next instance is not prepared
+        # while this one migrates.
         try:
             self.migrate_data = self.compute_rpcapi.\
                 check_can_live_migrate_destination(self.context, self.instance,
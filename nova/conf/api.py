@@ -347,6 +347,30 @@ Related options:
 
 * instance_list_cells_batch_strategy
 * max_limit
+"""),
+    cfg.BoolOpt("instance_list_deferred_hydration",
+        default=False,
+        help="""
+When enabled, instance list operations in the API keep the flavor,
+info_cache, numa_topology and pci_requests of each instance in their
+database form and only convert them to objects when they are first
+accessed. This reduces the CPU time and memory needed to list a large
+number of instances when the response does not need all of those
+attributes, for example ``GET /servers`` without details. The data is
+still fetched in the same database queries, so no additional queries
+are performed when the attributes are used.
+"""),
+    cfg.IntOpt("response_streaming_min_items",
+        default=0,
+        min=0,
+        help="""
+When set to a positive value, API responses containing a list of at least
+this many items, for example the servers of a ``GET /servers/detail``
+response, are encoded to JSON and sent to the WSGI server incrementally
+instead of being built as a single string first. This lowers the peak
+memory used by large list responses. The response body is identical but
+is sent without a ``Content-Length`` header. The default of 0 disables
+incremental encoding.
 """),
     cfg.BoolOpt("list_records_by_skipping_down_cells",
         default=True,
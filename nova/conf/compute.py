@@ -665,6 +665,42 @@ Possible values:
 * 0 : treated as unlimited.
 * Any positive integer representing maximum number of live migrations
   to run concurrently.
+
+Related options:
+
+* ``max_concurrent_live_migration_memory_mb``
+"""),
+    cfg.IntOpt('max_concurrent_live_migration_memory_mb',
+        default=0,
+        min=0,
+        help="""
+Maximum total memory, in MiB, of the instances being live migrated
+concurrently from this host.
+
+The time taken and the network bandwidth used to live migrate an instance
+mostly depend on the size of its memory, which
+``max_concurrent_live_migrations`` does not take into account. When this
+option is set, a queued live migration only starts once the memory of the
+instance fits in what is left of this budget by the live migrations already
+running, so that many small instances or a few large instances are migrated
+at the same time, for example when draining a host for maintenance. Among
+the queued live migrations which are waiting for the budget, the ones of the
+smallest instances are started first. An instance with more memory than this
+budget is migrated on its own. A live migration waiting for this budget is
+still queued, and can be aborted.
+
+Since queued live migrations only wait for this budget once they are started
+by ``max_concurrent_live_migrations``, it should be set high enough, or to 0,
+for this budget to be the limiting factor.
+
+Possible values:
+
+* 0 : treated as unlimited.
+* Any positive integer representing the maximum total memory in MiB.
+
+Related options:
+
+* ``max_concurrent_live_migrations``
 """),
     cfg.IntOpt('block_device_allocate_retries',
         default=60,
@@ -889,6 +925,27 @@ Related options:
   True, this controls the amount of time to wait before timing out and either
   failing if ``vif_plugging_is_fatal`` is True, or simply continuing with the
   live migration
+"""),
+    cfg.IntOpt('live_migration_volume_attach_concurrency',
+        default=1,
+        min=1,
+        help="""
+Maximum number of volume attachments to create in parallel on the destination
+host of a live migration.
+
+Before a server with volumes attached is live migrated, a new attachment is
+created in the block storage service for each of its volumes on the destination
+compute host. By default the attachments are created one at a time, so the time
+taken to prepare the destination host grows with the number of volumes of the
+server. Higher numbers create that many attachments at the same time, which
+shortens the preparation of servers with many volumes, at the cost of a higher
+load on the block storage service.
+
+This option only applies to the attachments in the block storage service. The
+volumes are still connected to the destination host, and the network interfaces
+of the server plugged, one at a time.
+
+Note that this option is read on the destination host of a live migration.
 """),
     cfg.IntOpt('max_concurrent_disk_ops',
         default=0,
@@ -31,6 +31,76 @@ ALL_OPTS = [
         help="""
 Number of workers for OpenStack Conductor service. The default will be the
 number of CPUs available.
+"""),
+    cfg.BoolOpt(
+        'batch_multi_create_db_updates',
+        default=False,
+        help="""
+Batch the API database updates made when building a multi-create request.
+
+When enabled, the conductor checks which build requests still exist with a
+single query for all of the instances in a multi-create request, rather than
+one query per instance, and maps the instances to their selected cell with a
+single update per cell rather than loading and saving each instance mapping.
+This reduces the number of API database round trips made while building
+large batches of servers, for example when booting with ``min_count``.
+
+Only those two steps are batched. The build requests, request specs and
+instance mappings created by the API, the instance records, block device
+mappings and tags created in each cell, the build request deletions and the
+``build_and_run_instance`` casts to the compute hosts are still handled one
+instance at a time.
+"""),
+    cfg.IntOpt(
+        'object_action_stats_interval',
+        default=0,
+        min=0,
+        help="""
+Interval, in seconds, at which to log object action statistics.
+
+The conductor proxies object methods for services which are not allowed to
+access the database, such as nova-compute. When this option is set to a
+positive value, the conductor records the number of calls, the number of
+coalesced calls and the average and maximum latency of each object action
+and logs a summary at this interval, which helps identify the periodic tasks
+responsible for most of the conductor load.
+
+Possible values:
+
+* 0: Disables the statistics (default)
+* Any positive integer in seconds
+
+Related options:
+
+* ``[conductor] coalesced_object_class_actions``
+"""),
+    cfg.ListOpt(
+        'coalesced_object_class_actions',
+        default=[],
+        help="""
+Read-only object class actions whose identical concurrent calls are coalesced.
+
+When many compute services run the same periodic tasks, the conductor often
+receives identical object class actions at the same time. For the actions
+listed here, a call which is identical to one already in progress, that is
+with the same arguments, object versions and request context credentials,
+waits for and returns the result of the call in progress rather than
+querying the database again.
+
+Only actions which do not modify any state may be listed, since the coalesced
+callers do not execute the action themselves.
+
+Possible values:
+
+* A list of ``<ObjectName>.<method>`` names, for example::
+
+    InstanceList.get_by_host,ComputeNode.get_by_host_and_nodename,
+    MigrationList.get_in_progress_by_host_and_node,
+    Service.get_by_compute_host
+
+Related options:
+
+* ``[conductor] object_action_stats_interval``
 """),
 ]
 
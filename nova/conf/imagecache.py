@@ -71,6 +71,27 @@ Unused unresized base images younger than this will not be removed.
         deprecated_group='libvirt',
         help="""
 Unused resized base images younger than this will not be removed.
+"""),
+    cfg.IntOpt('backing_file_full_scan_interval',
+               default=0,
+               min=0,
+               help="""
+Interval in seconds between full scans of the backing files of instance disks.
+
+The image cache manager of the libvirt driver needs to know which cached images
+back the disks of the instances of the host, which it finds out by running
+``qemu-img info`` on every instance disk on every run. When this option is set
+to a positive number of seconds, the backing files found are recorded in an
+index under ``[DEFAULT]/state_path`` which persists across restarts of the
+service, and ``qemu-img info`` is only run again on a disk when the disk file
+or its instance directory has changed since it was recorded, or when the last
+full scan is older than this interval. The default of 0 runs ``qemu-img info``
+on every instance disk on every run of the image cache manager.
+
+Related options:
+
+* ``[image_cache]/manager_interval``
+* ``[DEFAULT]/state_path``
 """),
     cfg.IntOpt('precache_concurrency',
                default=1,
@@ -84,6 +105,143 @@ will happen in parallel. Higher numbers will cause more computes to work
 in parallel and may result in reduced time to complete the operation, but
 may also DDoS the image service. Lower numbers will result in more sequential
 operation, lower image service load, but likely longer runtime to completion.
+
+This can be overridden for the hosts of an aggregate by setting the
+``precache_concurrency`` metadata key of the aggregate to a positive integer.
+
+Related options:
+
+* ``[image_cache]/precache_host_concurrency``
+"""),
+    cfg.IntOpt('precache_host_concurrency',
+               default=1,
+               min=1,
+               help="""
+Maximum number of images to download in parallel on a compute host when
+requested to pre-cache images.
+
+When an image precache request for several images is made, each compute node
+downloads the images one at a time by default. Higher numbers allow a compute
+node to download several images at the same time, which may reduce the time
+to complete the operation when the download of a single image does not
+saturate the network or the image service. Note that the number of concurrent
+image downloads is also limited by ``[DEFAULT]/max_concurrent_disk_ops`` when
+that option is set.
+
+Related options:
+
+* ``[image_cache]/precache_concurrency``
+* ``[DEFAULT]/max_concurrent_disk_ops``
+"""),
+    cfg.BoolOpt('peer_transfer',
+        default=False,
+        help="""
+Download images from other compute hosts before the image service.
+
+When this option is set to True, the images cached by the libvirt driver are
+served to other compute hosts over HTTP, and images to be cached are first
+looked up on the other compute hosts of the host aggregates this host is a
+member of. An image found on another host is downloaded from it and verified
+against the checksum recorded by the image service, and is downloaded from the
+image service when it is not found or fails verification. This reduces the
+load on the image service when many compute hosts need the same image, for
+example during the roll out of a new image.
+
+Images are only downloaded from other hosts when they are cached in the
+format they are stored in by the image service, so this is of limited use when
+``[DEFAULT]/force_raw_images`` is set to True and images are not stored in the
+raw format. Images whose signature is verified are always downloaded from the
+image service.
+
+Security considerations:
+
+The cached images of every project using this host are served to any client
+presenting ``[image_cache]/peer_transfer_token``, regardless of which projects
+may access the images. The images and the token are sent in clear text over
+HTTP. Anyone who can reach the ``[image_cache]/peer_transfer_listen`` address
+and learns the token, for example by observing the traffic between compute
+hosts, can therefore read any cached image, including private images of other
+projects. Only enable this option when that address is on a network which is
+reachable by, and only carries traffic of, the compute hosts.
+
+Related options:
+
+* ``[image_cache]/peer_transfer_token``
+* ``[image_cache]/peer_transfer_listen``
+* ``[image_cache]/peer_transfer_port``
+* ``[image_cache]/peer_transfer_timeout``
+* ``[image_cache]/peer_transfer_max_peers``
+"""),
+    cfg.StrOpt('peer_transfer_token',
+        secret=True,
+        help="""
+The token shared by the compute hosts to serve cached images to each other.
+
+Requests for cached images which do not carry this token are rejected, and
+it is sent with the requests made to other compute hosts. It must be the same
+on all compute hosts, and must be set when ``[image_cache]/peer_transfer`` is
+enabled. Note that it is sent in clear text, see the security considerations
+of ``[image_cache]/peer_transfer``.
+
+Related options:
+
+* ``[image_cache]/peer_transfer``
+"""),
+    cfg.StrOpt('peer_transfer_listen',
+        default='$my_ip',
+        help="""
+The IP address on which cached images are served to other compute hosts.
+
+Other compute hosts connect to the ``[DEFAULT]/my_ip`` address of this host,
+so this must be either that address or an address matching all addresses.
+
+Related options:
+
+* ``[image_cache]/peer_transfer``
+"""),
+    cfg.PortOpt('peer_transfer_port',
+        default=8797,
+        help="""
+The port on which cached images are served to other compute hosts.
+
+This must be the same on all compute hosts.
+
+Related options:
+
+* ``[image_cache]/peer_transfer``
+"""),
+    cfg.IntOpt('peer_transfer_timeout',
+        default=10,
+        min=1,
+        help="""
+Timeout in seconds when connecting to or reading from other compute hosts
+while downloading images from them.
+
+This is also the total time spent looking up an image on other compute hosts
+before downloading it. Once it has elapsed, the image is downloaded from the
+image service instead of asking the remaining hosts.
+
+Related options:
+
+* ``[image_cache]/peer_transfer``
+* ``[image_cache]/peer_transfer_max_peers``
+"""),
+    cfg.IntOpt('peer_transfer_max_peers',
+        default=3,
+        min=1,
+        help="""
+The maximum number of other compute hosts an image is looked up on.
+
+The hosts are picked at random among the other compute hosts of the host
+aggregates this host is a member of, so that the number of requests made for
+each image does not grow with the size of the aggregates and the downloads
+are spread over the hosts which have the image. When none of them has the
+image, it is downloaded from the image service.
+
+Related options:
+
+* ``[image_cache]/peer_transfer``
+* ``[image_cache]/peer_transfer_timeout``
 """),
 ]
 
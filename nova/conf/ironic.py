@@ -89,6 +89,27 @@ Related options:
              'Nodes matching the partition_key value will be distributed '
              'between all services specified here. '
              'If partition_key is unset, this option is ignored.'),
+    cfg.IntOpt(
+        'node_cache_full_refresh_interval',
+        default=0,
+        min=0,
+        help="""
+Interval in seconds between full refreshes of the cache of Ironic nodes.
+
+The cache of the Ironic nodes managed by this service is refreshed every time
+the resource tracker updates the available resources, by default by listing
+all the nodes from the Ironic API. With a large number of nodes this can take a
+long time. When this option is set to a positive value, the nodes are only all
+listed at most once per this interval. In between, only the UUID and update
+time of the nodes are listed, the nodes which were added or updated since the
+last refresh are retrieved, and the nodes which are no longer listed are
+removed from the cache.
+
+Possible values:
+
+* 0: always refresh the whole cache (default)
+* A positive integer in seconds.
+"""),
 ]
 
 
@@ -334,6 +334,28 @@ Maximum bandwidth(in MiB/s) to be used during migration.
 If set to 0, the hypervisor will choose a suitable default. Some hypervisors
 do not support this feature and will return an error if bandwidth is not 0.
 Please refer to the libvirt documentation for further details.
+"""),
+    cfg.IntOpt('live_migration_parallel_connections',
+               default=1,
+               min=1,
+               help="""
+Number of connections used to transfer the memory of a guest during live
+migration.
+
+When set to a value greater than 1, the memory of the guest is transferred
+over that many parallel connections, which can shorten live migrations
+limited by the throughput of a single connection, typically on fast networks
+or with ``live_migration_with_native_tls`` enabled. This requires libvirt
+5.2.0 and QEMU 4.0.0 or later, and is not used for tunnelled migrations or
+when post-copy is permitted, which QEMU does not support together with
+parallel connections. The default of 1 migrates the memory of a guest over a
+single connection.
+
+Related options:
+
+* live_migration_tunnelled
+* live_migration_permit_post_copy
+* live_migration_with_native_tls
 """),
     cfg.IntOpt('live_migration_downtime',
                default=500,
@@ -431,6 +453,30 @@ Related options:
 
 * live_migration_permit_auto_converge
 * live_migration_timeout_action
+"""),
+    cfg.BoolOpt('live_migration_adaptive_convergence',
+                default=False,
+                help="""
+Adapt the live migration to its progress instead of following fixed steps.
+
+By default, the maximum downtime of a live migration is increased in fixed
+steps over time, and post-copy is only used when the completion timeout is
+reached. When this option is set to True, the transfer rate of the migration
+and the amount of memory dirtied by the guest during each iteration of the
+migration are also monitored:
+
+* The maximum downtime is raised to the downtime needed to complete the
+  migration as soon as it is within ``live_migration_downtime``, instead of
+  waiting for the step allowing it.
+* When post-copy is permitted, the migration is switched to post-copy as
+  soon as the memory left to transfer no longer shrinks between iterations,
+  instead of when the completion timeout is reached.
+
+Related options:
+
+* live_migration_downtime
+* live_migration_downtime_steps
+* live_migration_permit_post_copy
 """),
     cfg.BoolOpt('live_migration_permit_auto_converge',
                 default=False,
@@ -647,6 +693,29 @@ Related options:
                default='$instances_path/snapshots',
                help='Location where libvirt driver will store snapshots '
                     'before uploading them to image service'),
+    cfg.BoolOpt('snapshot_streaming',
+                default=False,
+                help="""
+Upload cold snapshots to the image service while they are read.
+
+By default, the root disk of an instance is first copied to a file under
+``[libvirt]/snapshots_directory`` when it cannot be snapshotted directly in
+the storage backend, and the file is then uploaded to the image service, which
+requires local space for the whole disk and reads and writes the disk twice.
+When this option is set to True, cold snapshots in the ``raw`` format of disks
+of the ``flat`` (with ``raw`` disks), ``lvm`` and ``rbd`` image backends are
+instead uploaded to the image service while the disk is read, without any
+local copy. Other snapshots are made as usual.
+
+Note that the instance stays suspended until the upload of a streamed cold
+snapshot is complete, which takes longer than copying the disk locally.
+
+Related options:
+
+* ``[libvirt]/snapshots_directory``
+* ``[libvirt]/snapshot_image_format``
+* ``[workarounds]/disable_libvirt_livesnapshot``
+"""),
     cfg.StrOpt('xen_hvmloader_path',
                default='/usr/lib/xen/boot/hvmloader',
                help='Location where the Xen hvmloader is kept'),
@@ -1003,6 +1072,27 @@ type.
 Related options:
 
 * snapshot_image_format
+"""),
+    cfg.BoolOpt('reflink_copies',
+                default=False,
+                help="""
+Clone disk images instead of copying their data when possible.
+
+When this option is set to True, the local copies of disk images made by the
+libvirt driver, such as the copy of a cached image to the disk of an instance
+with the ``flat`` image backend or with ``[DEFAULT]/use_cow_images`` set to
+False, and the extraction of snapshots of ``raw`` disks, share the data of
+the original image through reflinks, which only copy metadata and take the
+same time regardless of the size of the image. This requires the instances
+path to be on a file system which supports reflinks, such as XFS created with
+reflink support or Btrfs. Disk images are copied as usual when the file system
+does not support reflinks.
+
+Related options:
+
+* ``[DEFAULT]/instances_path``
+* ``[DEFAULT]/use_cow_images``
+* ``[libvirt]/images_type``
 """),
 ]
 
@@ -1095,6 +1185,25 @@ The libvirt UUID of the secret for the rbd_user volumes.
                default=5,
                help="""
 The RADOS client timeout in seconds when initially connecting to the cluster.
+"""),
+    cfg.BoolOpt('rbd_persistent_connections',
+                default=False,
+                help="""
+Reuse the connections to the Ceph cluster for RBD image operations.
+
+By default a new connection to the Ceph cluster, which requires connecting and
+authenticating to the monitors, is made for every operation on RBD images and
+closed afterwards, and the usage of the pool is retrieved by running the
+``ceph df`` command. When this option is set to True, a single connection per
+RADOS client name and Ceph configuration file is kept open by each process
+and shared by all operations, and the usage of the pool is retrieved through
+that connection. A connection which is no longer connected is replaced.
+
+Related options:
+
+* ``[libvirt]/rbd_user``
+* ``[libvirt]/images_rbd_ceph_conf``
+* ``[libvirt]/rbd_connect_timeout``
 """),
 ]
 
@@ -258,6 +258,48 @@ query during each quota check, if this configuration option is set to True.
 Operators who want to avoid the performance hit from the EXISTS queries should
 wait to set this configuration option to True until after they have completed
 their online data migrations via ``nova-manage db online_data_migrations``.
+"""),
+    cfg.BoolOpt(
+        'count_usage_from_counters',
+        default=False,
+        help="""
+Enable the counting of quota usage from usage counters in the API database.
+
+Counting quota usage for instances, cores and ram requires querying every cell
+database (or the placement service, see ``count_usage_from_placement``) for
+each quota check, which can dominate the latency of creating and resizing
+servers for projects with a large number of servers.
+
+When this option is set to True, the usage of each project and user is kept in
+counters in the API database instead. The counters are updated when servers
+are created, deleted, restored and resized, and are reconciled with the usage
+counted from the cell databases or the placement service when they are missing
+or older than ``usage_counters_max_age``. The difference found between the
+counters and the counted usage during a reconciliation is logged.
+
+Between reconciliations the counters can drift from the actual usage, for
+example when a server fails to resize or when a server is deleted while being
+scheduled, so quota limits are enforced less strictly with this option set.
+
+Related options:
+
+* usage_counters_max_age
+"""),
+    cfg.IntOpt(
+        'usage_counters_max_age',
+        default=300,
+        min=0,
+        help="""
+Maximum age in seconds of quota usage counters.
+
+Usage counters of a project or user which were last reconciled longer than
+this ago are reconciled with the usage counted from the cell databases or the
+placement service the next time they are read. Set to 0 to only reconcile
+counters which are missing.
+
+Related options:
+
+* count_usage_from_counters
 """),
 ]
 
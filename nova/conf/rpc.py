@@ -37,6 +37,29 @@ Operations with RPC calls that utilize this value:
 Related options:
 
 * rpc_response_timeout
+"""),
+    cfg.BoolOpt("rpc_compact_object_serialization",
+        default=False,
+        help="""
+Send versioned objects over RPC using the compact primitive format.
+
+By default, every versioned object sent over RPC repeats its name, namespace,
+version and field names, which makes messages carrying lists of objects, such
+as instance lists, request specs and compute nodes, much larger than the data
+they contain. When this option is enabled, each message stores every distinct
+object schema once and encodes the objects as lists of field values indexed
+by that schema.
+
+Services always accept objects in both the regular and the compact format,
+but services from older releases only understand the regular format. Even
+when this option is enabled, objects are only sent in the compact format
+once the minimum service version of the services which receive objects over
+RPC, which are ``nova-compute``, ``nova-conductor``, ``nova-scheduler``,
+``nova-osapi_compute``, ``nova-metadata`` and ``nova-network``, shows that all
+of them, in every cell the service can see, have been upgraded to a release
+which supports it. The
+minimum service version is checked once and cached until the service is
+restarted or sent SIGHUP.
 """),
 ]
 
@@ -21,6 +21,7 @@ SERVICEGROUP_OPTS = [
         choices=[
             ('db', 'Database ServiceGroup driver'),
             ('mc', 'Memcache ServiceGroup driver'),
+            ('batch', 'Batched database ServiceGroup driver'),
         ],
         help="""
 This option specifies the driver to be used for the servicegroup service.
@@ -30,12 +31,62 @@ compute worker running the nova-compute daemon starts, it calls the join API
 to join the compute group. Services like nova scheduler can query the
 ServiceGroup API to check if a node is alive. Internally, the ServiceGroup
 client driver automatically updates the compute worker status. There are
-multiple backend implementations for this service: Database ServiceGroup driver
-and Memcache ServiceGroup driver.
+multiple backend implementations for this service: Database ServiceGroup
+driver, Memcache ServiceGroup driver and Batched database ServiceGroup driver.
+
+The Batched database ServiceGroup driver collects the state reports of the
+services in memory, see ``servicegroup_heartbeat_backend``, and writes them
+to the database with a single update every ``servicegroup_flush_interval``
+seconds rather than each service updating its own record every
+``report_interval`` seconds.
 
 Related Options:
 
 * ``service_down_time`` (maximum time since last check-in for up service)
+* ``servicegroup_heartbeat_backend``
+* ``servicegroup_flush_interval``
+"""),
+    cfg.StrOpt('servicegroup_heartbeat_backend',
+        default='conductor',
+        choices=[
+            ('conductor', 'State reports are sent to nova-conductor, which '
+             'writes them to the database'),
+            ('local', 'Each service writes its own state reports to the '
+             'database, which is mainly useful for testing'),
+        ],
+        help="""
+Where the Batched database ServiceGroup driver collects state reports.
+
+This option is only used when ``servicegroup_driver`` is set to ``batch``.
+With the ``conductor`` backend, services send their state reports to
+nova-conductor, which keeps the time of the last report of each service in
+memory and writes the reports of all services to the database in bulk. If the
+conductor service is too old to accept state reports, services fall back to
+updating their own database record. The ``local`` backend collects the state
+reports of the services running in the same process only.
+
+Related Options:
+
+* ``servicegroup_driver``
+* ``servicegroup_flush_interval``
+"""),
+    cfg.IntOpt('servicegroup_flush_interval',
+        default=10,
+        min=1,
+        help="""
+Interval, in seconds, at which collected state reports are written to the
+database.
+
+This option is only used when ``servicegroup_driver`` is set to ``batch``.
+Services which check whether other services are up using the database, such
+as those not collecting the state reports themselves, see the state reports
+up to this many seconds late, so this should be well below
+``service_down_time``.
+
+Related Options:
+
+* ``servicegroup_driver``
+* ``service_down_time``
 """),
 ]
 
@@ -140,6 +140,10 @@ class RequestContext(context.RequestContext):
         if self.is_admin is None:
             self.is_admin = policy.check_is_admin(self)
 
+        # NOTE: Memo of policy check results, only enabled for the lifetime
+        # of an API request. See enable_policy_cache().
+        self._policy_cache = None
+
     def get_auth_plugin(self):
         if self.user_auth_plugin:
             return self.user_auth_plugin
@@ -221,6 +225,33 @@ class RequestContext(context.RequestContext):
 
         return context
 
+    def enable_policy_cache(self):
+        """Memoize the result of the policy checks done with this context.
+
+        This must only be used for short-lived contexts, like the one of an
+        API request, since changes to the policy rules will not be seen by
+        checks which were already done. Copies of this context, like the
+        ones returned by elevated(), share the memo; the credentials used in
+        a check are part of its key so they do not see each others results.
+        """
+        self._policy_cache = {}
+
+    def _get_policy_cache_key(self, action, target):
+        if self._policy_cache is None:
+            return None
+        if target is not None:
+            if not isinstance(target, dict):
+                return None
+            target = frozenset(target.items())
+        key = (action, target, self.is_admin, tuple(self.roles),
+               self.user_id, self.project_id, self.system_scope)
+        try:
+            hash(key)
+        except TypeError:
+            # The target contains unhashable values, do not memoize
+            return None
+        return key
+
     def can(self, action, target=None, fatal=True):
         """Verifies that the given action is valid on the target in this
         context.
@@ -239,12 +270,24 @@ class RequestContext(context.RequestContext):
         :return: returns a non-False value (not necessarily "True") if
             authorized and False if not authorized and fatal is False.
         """
+        cache_key = self._get_policy_cache_key(action, target)
+        if cache_key is not None and cache_key in self._policy_cache:
+            result = self._policy_cache[cache_key]
+            # NOTE: Failed fatal checks are re-evaluated below so that they
+            # raise the exact same exception as before.
+            if result or not fatal:
+                return result
         try:
-            return policy.authorize(self, action, target)
+            result = policy.authorize(self, action, target)
         except exception.Forbidden:
+            if cache_key is not None:
+                self._policy_cache[cache_key] = False
             if fatal:
                 raise
             return False
+        if cache_key is not None:
+            self._policy_cache[cache_key] = result
+        return result
 
     def to_policy_values(self):
         policy = super(RequestContext, self).to_policy_values()
@@ -182,6 +182,19 @@ def service_update(context, service_id, values):
     return IMPL.service_update(context, service_id, values)
 
 
+def service_update_heartbeats(context, heartbeats):
+    """Record state reports for multiple services with a single update.
+
+    :param heartbeats: Dict, keyed by service id, of (number of state reports,
+        time of the last state report) tuples. The number of state reports is
+        added to the report_count of the service and the time of the last one
+        is stored as its last_seen_up.
+    :returns: The number of services updated. Services which do not exist are
+        ignored.
+    """
+    return IMPL.service_update_heartbeats(context, heartbeats)
+
+
 ###################
 
 
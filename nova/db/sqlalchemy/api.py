@@ -564,6 +564,28 @@ def service_update(context, service_id, values):
     return service_ref
 
 
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+@pick_context_manager_writer
+def service_update_heartbeats(context, heartbeats):
+    if not heartbeats:
+        return 0
+    report_counts = {}
+    last_seen_ups = {}
+    for service_id, (count, last_seen_up) in heartbeats.items():
+        report_counts[service_id] = count
+        last_seen_ups[service_id] = last_seen_up
+    # NOTE: Update all of the services with a single multi-row UPDATE, the
+    # values for each row are selected by service id.
+    return model_query(context, models.Service).\
+        filter(models.Service.id.in_(list(heartbeats))).\
+        update({'report_count': models.Service.report_count + sa.case(
+                    report_counts, value=models.Service.id, else_=0),
+                'last_seen_up': sa.case(
+                    last_seen_ups, value=models.Service.id,
+                    else_=models.Service.last_seen_up)},
+               synchronize_session=False)
+
+
 ###################
 
 
@@ -1290,15 +1312,30 @@ def _build_instance_get(context, columns_to_join=None):
     return query
 
 
+# Maximum number of values used in the IN clause of a single query when
+# manually joining instance data, so large lists are fetched in chunks.
+_MANUAL_JOIN_CHUNK_SIZE = 1000
+
+
+def _chunk_uuids(uuids):
+    for i in range(0, len(uuids), _MANUAL_JOIN_CHUNK_SIZE):
+        yield uuids[i:i + _MANUAL_JOIN_CHUNK_SIZE]
+
+
 def _instances_fill_metadata(context, instances, manual_joins=None):
     """Selectively fill instances with manually-joined metadata. Note that
     instance will be converted to a dict.
 
+    Each manually-joined table is queried once per chunk of
+    _MANUAL_JOIN_CHUNK_SIZE instances, regardless of the number of instances.
+
     :param context: security context
     :param instances: list of instances to fill
     :param manual_joins: list of tables to manually join (can be any
-                         combination of 'metadata' and 'system_metadata' or
-                         None to take the default of both)
+                         combination of 'metadata', 'system_metadata',
+                         'pci_devices', 'fault', 'tags' and 'extra.<column>'
+                         or None to take the default of 'metadata' and
+                         'system_metadata')
     """
     #取所有instance的uuid
     uuids = [inst['uuid'] for inst in instances]
@@ -1306,26 +1343,41 @@ def _instances_fill_metadata(context, instances, manual_joins=None):
     if manual_joins is None:
         manual_joins = ['metadata', 'system_metadata']
 
-    meta = collections.defaultdict(list)
-    if 'metadata' in manual_joins:
-        for row in _instance_metadata_get_multi(context, uuids):
-            meta[row['instance_uuid']].append(row)
+    extra_columns = [column.split('.', 1)[1] for column in manual_joins
+                     if column.startswith('extra.')]
 
+    meta = collections.defaultdict(list)
     sys_meta = collections.defaultdict(list)
-    if 'system_metadata' in manual_joins:
-        for row in _instance_system_metadata_get_multi(context, uuids):
-            sys_meta[row['instance_uuid']].append(row)
-
     pcidevs = collections.defaultdict(list)
-    if 'pci_devices' in manual_joins:
-        for row in _instance_pcidevs_get_multi(context, uuids):
-            pcidevs[row['instance_uuid']].append(row)
+    tags = collections.defaultdict(list)
+    extras = {}
+    faults = {}
+    for chunk in _chunk_uuids(uuids):
+        if 'metadata' in manual_joins:
+            for row in _instance_metadata_get_multi(context, chunk):
+                meta[row['instance_uuid']].append(row)
+
+        if 'system_metadata' in manual_joins:
+            for row in _instance_system_metadata_get_multi(context, chunk):
+                sys_meta[row['instance_uuid']].append(row)
 
-    if 'fault' in manual_joins:
-        faults = instance_fault_get_by_instance_uuids(context, uuids,
-                                                      latest=True)
-    else:
-        faults = {}
+        if 'pci_devices' in manual_joins:
+            for row in _instance_pcidevs_get_multi(context, chunk):
+                pcidevs[row['instance_uuid']].append(row)
+
+        if 'tags' in manual_joins:
+            for row in _instance_tags_get_multi(context, chunk):
+                tags[row['resource_id']].append(row)
+
+        if extra_columns:
+            for row in _instance_extra_get_multi(context, chunk,
+                                                 extra_columns):
+                extras[row.instance_uuid] = {
+                    column: getattr(row, column) for column in extra_columns}
+
+        if 'fault' in manual_joins:
+            faults.update(instance_fault_get_by_instance_uuids(
+                context, chunk, latest=True))
 
     filled_instances = []
     for inst in instances:
@@ -1334,6 +1386,12 @@ def _instances_fill_metadata(context, instances, manual_joins=None):
         inst['metadata'] = meta[inst['uuid']]
         if 'pci_devices' in manual_joins:
             inst['pci_devices'] = pcidevs[inst['uuid']]
+        if 'tags' in manual_joins:
+            # NOTE: The tags relationship only joins non-deleted instances,
+            # so mirror that here.
+            inst['tags'] = [] if inst['deleted'] else tags[inst['uuid']]
+        if extra_columns:
+            inst['extra'] = extras.get(inst['uuid'])
         inst_faults = faults.get(inst['uuid'])
         inst['fault'] = inst_faults and inst_faults[0] or None
         filled_instances.append(inst)
@@ -1344,9 +1402,11 @@ def _instances_fill_metadata(context, instances, manual_joins=None):
 def _manual_join_columns(columns_to_join):
     """Separate manually joined columns from columns_to_join
 
-    If columns_to_join contains 'metadata', 'system_metadata', 'fault', or
-    'pci_devices' those columns are removed from columns_to_join and added
-    to a manual_joins list to be used with the _instances_fill_metadata method.
+    If columns_to_join contains 'metadata', 'system_metadata', 'fault',
+    'pci_devices', 'tags' or 'extra.<column>' those columns are removed from
+    columns_to_join and added to a manual_joins list to be used with the
+    _instances_fill_metadata method. The 'extra' relationship itself is no
+    longer joined if all of the requested extra columns are manually joined.
 
     The columns_to_join formal parameter is copied and not modified, the return
     tuple has the modified columns_to_join list to be used with joinedload in
@@ -1357,10 +1417,19 @@ def _manual_join_columns(columns_to_join):
     """
     manual_joins = []
     columns_to_join_new = copy.copy(columns_to_join)
-    for column in ('metadata', 'system_metadata', 'pci_devices', 'fault'):
+    for column in ('metadata', 'system_metadata', 'pci_devices', 'fault',
+                   'tags'):
         if column in columns_to_join_new:
             columns_to_join_new.remove(column)
             manual_joins.append(column)
+    extra_columns = [column for column in columns_to_join_new
+                     if column.startswith('extra.')]
+    if extra_columns:
+        for column in extra_columns:
+            columns_to_join_new.remove(column)
+        if 'extra' in columns_to_join_new:
+            columns_to_join_new.remove('extra')
+        manual_joins.extend(extra_columns)
     return manual_joins, columns_to_join_new
 
 
@@ -2010,11 +2079,16 @@ def _instance_get_all_query(context, project_only=False, joins=None):
 
 @pick_context_manager_reader_allow_async
 def instance_get_all_by_host(context, host, columns_to_join=None):
+    if columns_to_join is None:
+        manual_joins = None
+    else:
+        manual_joins, columns_to_join = (
+            _manual_join_columns(columns_to_join))
     query = _instance_get_all_query(context, joins=columns_to_join)
     #通过query.filter_by(host=host)查出绑定在host上的所有instance
     return _instances_fill_metadata(context,
                                     query.filter_by(host=host).all(),
-                                    manual_joins=columns_to_join)
+                                    manual_joins=manual_joins)
 
 
 def _instance_get_all_uuids_by_hosts(context, hosts):
@@ -2391,6 +2465,16 @@ def instance_extra_update_by_uuid(context, instance_uuid, values):
     return rows_updated
 
 
+def _instance_extra_get_multi(context, instance_uuids, columns):
+    if not instance_uuids:
+        return []
+    args = [models.InstanceExtra.instance_uuid] + [
+        getattr(models.InstanceExtra, column) for column in columns]
+    return model_query(context, models.InstanceExtra, args=args,
+                       read_deleted='yes').filter(
+        models.InstanceExtra.instance_uuid.in_(instance_uuids))
+
+
 @pick_context_manager_reader
 def instance_extra_get_by_instance_uuid(context, instance_uuid,
                                         columns=None):
@@ -4457,6 +4541,13 @@ def instance_tag_set(context, instance_uuid, tags):
         resource_id=instance_uuid).all()
 
 
+def _instance_tags_get_multi(context, instance_uuids):
+    if not instance_uuids:
+        return []
+    return context.session.query(models.Tag).filter(
+        models.Tag.resource_id.in_(instance_uuids))
+
+
 @pick_context_manager_reader
 def instance_tag_get_by_instance_uuid(context, instance_uuid):
     _check_instance_exists_in_project(context, instance_uuid)
@@ -697,6 +697,11 @@ class ImageHandlerUnsupported(NovaException):
     msg_fmt = _("Error: unsupported image handler %(image_handler)s.")
 
 
+class ImageDownloadModuleError(NovaException):
+    msg_fmt = _("There was an error with the download module %(module)s. "
+                "%(reason)s")
+
+
 class PreserveEphemeralNotSupported(Invalid):
     msg_fmt = _("The current driver does not support "
                 "preserving ephemeral partitions.")
@@ -1590,6 +1595,11 @@ class LiveMigrationNotSubmitted(NovaException):
                 "instance %(instance_uuid)s for processing.")
 
 
+class MemoryBudgetReservationCancelled(NovaException):
+    msg_fmt = _("The memory budget reservation for %(key)s was cancelled "
+                "while waiting.")
+
+
 class SelectionObjectsWithOldRPCVersionNotSupported(NovaException):
     msg_fmt = _("Requests for Selection objects with alternates are not "
                 "supported in select_destinations() before RPC version 4.5; "
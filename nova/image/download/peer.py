@@ -0,0 +1,183 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Download images from the image cache of other compute hosts.
+
+The images cached by the libvirt driver are served by
+nova.virt.libvirt.imagecache when [image_cache]/peer_transfer is enabled.
+"""
+
+import hashlib
+import os
+import random
+
+from oslo_log import log as logging
+from oslo_utils import netutils
+from oslo_utils import timeutils
+import requests
+
+import nova.conf
+from nova import exception
+from nova.i18n import _
+from nova import objects
+
+
+CONF = nova.conf.CONF
+LOG = logging.getLogger(__name__)
+
+SCHEME = 'peer'
+CHUNK_SIZE = 64 * 1024
+# The header carrying [image_cache]/peer_transfer_token in requests to peers.
+TOKEN_HEADER = 'X-Image-Cache-Token'
+
+
+class PeerTransfer(object):
+    """Download images from the other compute hosts of the same aggregates.
+
+    The peers of this host are the other hosts of the aggregates this host is
+    a member of. A random sample of the peers is asked in turn whether it has
+    the image cached in the format it is stored in by the image service, and
+    the first one which has it is downloaded from. The downloaded data is
+    verified against the checksum recorded by the image service.
+    """
+
+    def __str__(self):
+        return SCHEME
+
+    def _get_peers(self, context):
+        """Return the IP addresses of a random sample of the peers.
+
+        At most [image_cache]/peer_transfer_max_peers peers are returned, so
+        that the number of hosts asked for an image does not grow with the
+        size of the aggregates this host is a member of.
+        """
+        aggregates = objects.AggregateList.get_by_host(context, CONF.host)
+        hosts = set()
+        for aggregate in aggregates:
+            hosts.update(aggregate.hosts)
+        hosts.discard(CONF.host)
+        # NOTE: Spread the downloads of hosts sharing the same aggregates over
+        # the peers which have the image.
+        hosts = random.sample(sorted(hosts), min(
+            len(hosts), CONF.image_cache.peer_transfer_max_peers))
+        if not hosts:
+            return []
+        host_ips = {}
+        for node in objects.ComputeNodeList.get_all_by_hosts(context, hosts):
+            if node.host_ip:
+                host_ips.setdefault(node.host, node.host_ip)
+        return [host_ips[host] for host in hosts if host in host_ips]
+
+    @staticmethod
+    def _get_url(host_ip, image_id):
+        return 'http://%s:%d/images/%s' % (
+            netutils.escape_ipv6(str(host_ip)),
+            CONF.image_cache.peer_transfer_port, image_id)
+
+    @staticmethod
+    def _get_headers():
+        return {TOKEN_HEADER: CONF.image_cache.peer_transfer_token}
+
+    def _has_image(self, url, size, timeout):
+        try:
+            resp = requests.head(url, headers=self._get_headers(),
+                                 timeout=timeout)
+        except requests.RequestException as e:
+            LOG.debug('Unable to reach %(url)s: %(error)s',
+                      {'url': url, 'error': e})
+            return False
+        if resp.status_code != 200:
+            return False
+        # NOTE: An image converted to raw when it was cached is not the same
+        # as the image stored by the image service, and can be told apart by
+        # its size without downloading it.
+        return int(resp.headers.get('Content-Length', -1)) == size
+
+    def _fetch(self, url, dst_file, checksum, sync):
+        md5 = hashlib.md5()
+        resp = requests.get(url, headers=self._get_headers(), stream=True,
+                            timeout=CONF.image_cache.peer_transfer_timeout)
+        try:
+            resp.raise_for_status()
+            with open(dst_file, 'wb') as f:
+                for chunk in resp.iter_content(CHUNK_SIZE):
+                    md5.update(chunk)
+                    f.write(chunk)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        finally:
+            resp.close()
+        return md5.hexdigest() == checksum
+
+    def download(self, context, url_parts, dst_file, metadata, sync=True,
+                 **kwargs):
+        """Download an image from a peer.
+
+        :param url_parts: The parsed peer://<image id> URL of the image.
+        :param dst_file: The path to download the image to.
+        :param metadata: The image metadata returned by the image service.
+        :param sync: Whether to flush the downloaded image to persistent
+                     storage.
+        :raises: ImageDownloadModuleError if the image could not be
+                 downloaded from any peer.
+        """
+        image_id = url_parts.netloc
+        if not CONF.image_cache.peer_transfer_token:
+            raise exception.ImageDownloadModuleError(
+                module=str(self),
+                reason=_('[image_cache]/peer_transfer_token is not set.'))
+        size = metadata.get('size')
+        checksum = metadata.get('checksum')
+        if not size or not checksum:
+            raise exception.ImageDownloadModuleError(
+                module=str(self),
+                reason=_('Image %s has no size or checksum.') % image_id)
+
+        # NOTE: Looking the image up on the peers takes at most as long as a
+        # single request to a peer may take, however many peers are asked and
+        # whether or not they respond.
+        timer = timeutils.StopWatch(
+            duration=CONF.image_cache.peer_transfer_timeout)
+        timer.start()
+        for host_ip in self._get_peers(context.elevated()):
+            if timer.expired():
+                LOG.debug('Timed out looking up image %s on the peers',
+                          image_id)
+                break
+            url = self._get_url(host_ip, image_id)
+            if not self._has_image(url, size, timer.leftover()):
+                continue
+            try:
+                if self._fetch(url, dst_file, checksum, sync):
+                    LOG.info('Downloaded image %(image)s from %(host)s',
+                             {'image': image_id, 'host': host_ip})
+                    return
+                LOG.warning('Image %(image)s downloaded from %(host)s does '
+                            'not match its checksum',
+                            {'image': image_id, 'host': host_ip})
+            except (requests.RequestException, IOError) as e:
+                LOG.warning('Unable to download image %(image)s from '
+                            '%(host)s: %(error)s',
+                            {'image': image_id, 'host': host_ip, 'error': e})
+
+        raise exception.ImageDownloadModuleError(
+            module=str(self),
+            reason=_('Image %s was not found on any peer.') % image_id)
+
+
+def get_download_handler(**kwargs):
+    return PeerTransfer()
+
+
+def get_schemes():
+    return [SCHEME]
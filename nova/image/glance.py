@@ -46,6 +46,7 @@ import six.moves.urllib.parse as urlparse
 import nova.conf
 from nova import exception
 import nova.image.download as image_xfers
+from nova.image.download import peer as peer_xfer
 from nova import objects
 from nova.objects import fields
 from nova import profiler
@@ -239,6 +240,10 @@ class GlanceImageServiceV2(object):
                           'following error occurred: %(ex)s',
                           {'module_str': str(mod), 'ex': ex})
 
+        if CONF.image_cache.peer_transfer:
+            self._download_handlers[peer_xfer.SCHEME] = (
+                peer_xfer.get_download_handler())
+
     def show(self, context, image_id, include_locations=False,
              show_deleted=True):
         """Returns a dict with image data for the given opaque image id.
@@ -318,8 +323,12 @@ class GlanceImageServiceV2(object):
             os.fsync(fileno)
 
     def download(self, context, image_id, data=None, dst_path=None,
-                 trusted_certs=None):
-        """Calls out to Glance for data and writes data."""
+                 trusted_certs=None, sync=True):
+        """Calls out to Glance for data and writes data.
+
+        When the data is written to dst_path, the file is flushed to
+        persistent storage before returning unless sync is False.
+        """
         if CONF.glance.allowed_direct_url_schemes and dst_path is not None:
             image = self.show(context, image_id, include_locations=True)
             for entry in image.get('locations', []):
@@ -335,6 +344,26 @@ class GlanceImageServiceV2(object):
                     except Exception:
                         LOG.exception("Download image error")
 
+        # NOTE: Images downloaded from other compute hosts are verified
+        # against their checksum but not their signature, so only look for
+        # images without a signature to verify there.
+        if (CONF.image_cache.peer_transfer and dst_path is not None and
+                not trusted_certs and
+                not CONF.glance.verify_glance_signatures):
+            peer_mod = self._get_transfer_module(peer_xfer.SCHEME)
+            if peer_mod:
+                image = self.show(context, image_id)
+                try:
+                    peer_mod.download(
+                        context, urlparse.urlparse('%s://%s' % (
+                            peer_xfer.SCHEME, image_id)), dst_path, image,
+                        sync=sync)
+                    return
+                except exception.ImageDownloadModuleError as e:
+                    LOG.debug('Falling back to the image service: %s', e)
+                except Exception:
+                    LOG.exception("Download image error")
+
         try:
             image_chunks = self._client.call(
                 context, 2, 'data', args=(image_id,))
@@ -398,7 +427,8 @@ class GlanceImageServiceV2(object):
                     # subsequent host crash we don't have running instances
                     # using a corrupt backing file.
                     data.flush()
-                    self._safe_fsync(data)
+                    if sync:
+                        self._safe_fsync(data)
                     data.close()
 
     def _get_verifier(self, context, image_id, trusted_certs):
@@ -1148,7 +1178,7 @@ class API(object):
         return session.delete(context, image_id)
 
     def download(self, context, id_or_uri, data=None, dest_path=None,
-                 trusted_certs=None):
+                 trusted_certs=None, sync=True):
         """Transfer image bits from Glance or a known source location to the
         supplied destination filepath.
 
@@ -1161,6 +1191,8 @@ class API(object):
         :param trusted_certs: A 'nova.objects.trusted_certs.TrustedCerts'
                               object with a list of trusted image certificate
                               IDs.
+        :param sync: Whether to flush the image bits written to dest_path to
+                     persistent storage before returning.
 
         Note that because of the poor design of the
         `glance.ImageService.download` method, the function returns different
@@ -1191,4 +1223,4 @@ class API(object):
         session, image_id = self._get_session_and_image_id(context, id_or_uri)
         return session.download(context, image_id, data=data,
                                 dst_path=dest_path,
-                                trusted_certs=trusted_certs)
+                                trusted_certs=trusted_certs, sync=sync)
@@ -20,17 +20,93 @@ import functools
 import traceback
 
 import netaddr
+from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_utils import versionutils
 from oslo_versionedobjects import base as ovoo_base
 from oslo_versionedobjects import exception as ovoo_exc
+from oslo_versionedobjects import fields as ovoo_fields
 import six
 
+import nova.conf
 from nova import objects
 from nova.objects import fields as obj_fields
 from nova import utils
 
 
+CONF = nova.conf.CONF
+LOG = logging.getLogger(__name__)
+
+# NOTE: Keys used by the compact primitive format produced by
+# obj_to_compact_primitive(). See that function for details.
+COMPACT_PRIMITIVE_KEY = 'nova_object.compact'
+_COMPACT_OBJECT_KEY = 'nova_object.c'
+# NOTE: The services which receive objects over RPC, in requests or in
+# replies, and the minimum service version of those which understands the
+# compact primitive format.
+_COMPACT_SERIALIZATION_BINARIES = ['nova-compute', 'nova-conductor',
+                                   'nova-scheduler', 'nova-osapi_compute',
+                                   'nova-metadata', 'nova-network']
+COMPACT_SERIALIZATION_MIN_SERVICE_VERSION = 50
+# Cached result of _compact_serialization_supported(), or None if the
+# minimum service version has not been checked yet.
+_COMPACT_SERIALIZATION_SUPPORTED = None
+
+
+def reset_globals():
+    global _COMPACT_SERIALIZATION_SUPPORTED
+
+    _COMPACT_SERIALIZATION_SUPPORTED = None
+
+
+def _compact_serialization_supported():
+    """Determine whether all services understand compact primitives.
+
+    The result is cached once the minimum service version is known, the same
+    way the compute RPC API caches its automatic version cap, and is reset
+    along with the service version cache when the service is reset.
+    """
+    global _COMPACT_SERIALIZATION_SUPPORTED
+    if _COMPACT_SERIALIZATION_SUPPORTED is not None:
+        return _COMPACT_SERIALIZATION_SUPPORTED
+
+    # NOTE: Imported here to avoid circular imports, since both modules
+    # depend on this one.
+    from nova import context as nova_context
+    from nova.objects import service as service_obj
+
+    ctxt = nova_context.get_admin_context()
+    try:
+        # NOTE: As with the compute RPC version cap, only look at other cells
+        # if we are allowed to access the API database.
+        if CONF.api_database.connection:
+            service_version = service_obj.get_minimum_version_all_cells(
+                ctxt, _COMPACT_SERIALIZATION_BINARIES)
+        else:
+            service_version = objects.Service.get_minimum_version_multi(
+                ctxt, _COMPACT_SERIALIZATION_BINARIES)
+    except Exception:
+        LOG.warning('Unable to determine the minimum service version, '
+                    'sending objects over RPC in the regular primitive '
+                    'format.', exc_info=True)
+        return False
+
+    if service_version == 0:
+        # NOTE: Do not cache this, we will get a better answer once the
+        # services have started.
+        return False
+
+    _COMPACT_SERIALIZATION_SUPPORTED = (
+        service_version >= COMPACT_SERIALIZATION_MIN_SERVICE_VERSION)
+    if not _COMPACT_SERIALIZATION_SUPPORTED:
+        LOG.info('Not sending objects over RPC in the compact primitive '
+                 'format because the minimum service version %(service)i is '
+                 'older than %(required)i.',
+                 {'service': service_version,
+                  'required': COMPACT_SERIALIZATION_MIN_SERVICE_VERSION})
+    return _COMPACT_SERIALIZATION_SUPPORTED
+
+
 def all_things_equal(obj_a, obj_b):
     if obj_b is None:
         return False
@@ -55,6 +131,55 @@ def get_attrname(name):
     return '_obj_' + name
 
 
+# NOTE: Field types whose coerce() returns the value unchanged when it
+# already has exactly the given python type.
+_TRUSTED_COERCE_TYPES = {
+    ovoo_fields.Boolean: bool,
+    ovoo_fields.Float: float,
+    ovoo_fields.Integer: int,
+    ovoo_fields.String: six.text_type,
+}
+# Map of object class to a dict, keyed by field name, of
+# (attrname, python type, nullable) for the fields which can be set
+# without coercion by obj_set_trusted_attr().
+_TRUSTED_SETTERS = {}
+
+
+def _get_trusted_setters(cls):
+    try:
+        return _TRUSTED_SETTERS[cls]
+    except KeyError:
+        pass
+    setters = {}
+    for name, field in cls.fields.items():
+        if (field.read_only or
+                type(field).coerce is not ovoo_fields.Field.coerce):
+            continue
+        py_type = _TRUSTED_COERCE_TYPES.get(type(field._type))
+        if py_type is not None:
+            setters[name] = (get_attrname(name), py_type, field.nullable)
+    _TRUSTED_SETTERS[cls] = setters
+    return setters
+
+
+def obj_set_trusted_attr(obj, name, value):
+    """Set a field on an object from a trusted source, such as a DB row.
+
+    This is equivalent to setattr(obj, name, value), but skips the field
+    coercion when it would be a no-op, which is the case for most of the
+    columns of a DB row. The fields eligible for this, and their types, are
+    computed once per object class.
+    """
+    setter = _get_trusted_setters(obj.__class__).get(name)
+    if setter is not None:
+        attrname, py_type, nullable = setter
+        if type(value) is py_type or (value is None and nullable):
+            obj._changed_fields.add(name)
+            setattr(obj, attrname, value)
+            return
+    setattr(obj, name, value)
+
+
 class NovaObjectRegistry(ovoo_base.VersionedObjectRegistry):
     notification_classes = []
 
@@ -270,9 +395,16 @@ class NovaObjectSerializer(messaging.NoOpSerializer):
         elif (hasattr(entity, 'obj_to_primitive') and
               callable(entity.obj_to_primitive)):
             entity = entity.obj_to_primitive()
+            if (CONF.rpc_compact_object_serialization and
+                    _compact_serialization_supported()):
+                entity = obj_to_compact_primitive(entity)
         return entity
 
     def deserialize_entity(self, context, entity):
+        if isinstance(entity, dict) and COMPACT_PRIMITIVE_KEY in entity:
+            # NOTE: Compact primitives are always accepted, regardless of
+            # whether this service is configured to send them.
+            entity = obj_from_compact_primitive(entity)
         if isinstance(entity, dict) and 'nova_object.name' in entity:
             entity = self._process_object(context, entity)
         elif isinstance(entity, (tuple, list, set, dict)):
@@ -281,6 +413,88 @@ class NovaObjectSerializer(messaging.NoOpSerializer):
         return entity
 
 
+def _compact_value(value, schemas, schema_index):
+    if isinstance(value, dict):
+        if 'nova_object.name' in value and 'nova_object.data' in value:
+            data = value['nova_object.data']
+            field_names = tuple(sorted(data))
+            key = (value['nova_object.name'],
+                   value.get('nova_object.namespace'),
+                   value.get('nova_object.version'),
+                   field_names)
+            if key not in schema_index:
+                schema_index[key] = len(schemas)
+                schemas.append(list(key[:3]) + [list(field_names)])
+            encoded = [schema_index[key],
+                       [_compact_value(data[name], schemas, schema_index)
+                        for name in field_names]]
+            if 'nova_object.changes' in value:
+                encoded.append([field_names.index(name)
+                                for name in value['nova_object.changes']
+                                if name in data])
+            return {_COMPACT_OBJECT_KEY: encoded}
+        return {k: _compact_value(v, schemas, schema_index)
+                for k, v in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [_compact_value(v, schemas, schema_index) for v in value]
+    return value
+
+
+def _expand_value(value, schemas):
+    if isinstance(value, dict):
+        if len(value) == 1 and _COMPACT_OBJECT_KEY in value:
+            encoded = value[_COMPACT_OBJECT_KEY]
+            name, namespace, version, field_names = schemas[encoded[0]]
+            primitive = {
+                'nova_object.name': name,
+                'nova_object.namespace': namespace,
+                'nova_object.version': version,
+                'nova_object.data': {
+                    field: _expand_value(v, schemas)
+                    for field, v in zip(field_names, encoded[1])},
+            }
+            if len(encoded) > 2:
+                primitive['nova_object.changes'] = [
+                    field_names[idx] for idx in encoded[2]]
+            return primitive
+        return {k: _expand_value(v, schemas) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_expand_value(v, schemas) for v in value]
+    return value
+
+
+def obj_to_compact_primitive(primitive):
+    """Convert an object primitive to the compact primitive format.
+
+    The regular object primitive repeats the name, namespace, version and
+    field names of every object, which dominates the size of messages that
+    carry lists of objects such as an InstanceList. The compact format
+    stores each distinct (name, namespace, version, set fields) schema once
+    in a per-message table and encodes each object as a list of the schema
+    index, the field values in schema order and, optionally, the indexes of
+    the changed fields.
+
+    The result is still a JSON-serializable primitive and is converted back
+    by obj_from_compact_primitive().
+
+    :param primitive: The result of calling obj_to_primitive() on an object
+    :returns: A dict containing the compact primitive
+    """
+    schemas = []
+    root = _compact_value(primitive, schemas, {})
+    return {COMPACT_PRIMITIVE_KEY: {'schemas': schemas, 'root': root}}
+
+
+def obj_from_compact_primitive(compact):
+    """Convert a compact primitive back to the regular object primitive.
+
+    :param compact: The result of calling obj_to_compact_primitive()
+    :returns: The original object primitive
+    """
+    compact = compact[COMPACT_PRIMITIVE_KEY]
+    return _expand_value(compact['root'], compact['schemas'])
+
+
 def obj_to_primitive(obj):
     """Recursively turn an object into a python primitive.
 
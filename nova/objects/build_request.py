@@ -279,6 +279,29 @@ class BuildRequestList(base.ObjectListBase, base.NovaObject):
         return base.obj_make_list(context, cls(context), objects.BuildRequest,
                                   db_build_reqs)
 
+    @staticmethod
+    @db.api_context_manager.reader
+    def _get_instance_uuids_from_db(context, instance_uuids):
+        query = (context.session.query(api_models.BuildRequest.instance_uuid)
+                 .filter(api_models.BuildRequest.instance_uuid.in_(
+                     instance_uuids)))
+        return set(row.instance_uuid for row in query.all())
+
+    @classmethod
+    def get_instance_uuids(cls, context, instance_uuids):
+        """Get the subset of instance UUIDs which still have a build request.
+
+        This is used to check, in a single query, which of the instances of
+        a multi-create request have not been deleted by the user while they
+        were being scheduled.
+
+        :param instance_uuids: List of instance UUIDs on which to filter
+        :returns: A set of the instance UUIDs which have a build request
+        """
+        if not instance_uuids:
+            return set()
+        return cls._get_instance_uuids_from_db(context, instance_uuids)
+
     @staticmethod
     def _pass_exact_filters(instance, filters):
         for filter_key, filter_val in filters.items():
@@ -212,7 +212,7 @@ class ComputeNode(base.NovaPersistentObject, base.NovaObject):
             elif key == 'mapped':
                 value = 0 if value is None else value
 
-            setattr(compute, key, value)
+            base.obj_set_trusted_attr(compute, key, value)
 
         if online_updates:
             db.compute_node_update(context, compute.id, online_updates)
@@ -402,7 +402,8 @@ class ComputeNodeList(base.ObjectListBase, base.NovaObject):
     # Version 1.15 Added get_by_pagination()
     # Version 1.16: Added get_all_by_uuids()
     # Version 1.17: Added get_all_by_not_mapped()
-    VERSION = '1.17'
+    # Version 1.18: Added get_all_by_hosts()
+    VERSION = '1.18'
     fields = {
         'objects': fields.ListOfObjectsField('ComputeNode'),
         }
@@ -461,6 +462,18 @@ class ComputeNodeList(base.ObjectListBase, base.NovaObject):
         return base.obj_make_list(context, cls(context), objects.ComputeNode,
                                   db_computes)
 
+    @staticmethod
+    @db.select_db_reader_mode
+    def _db_compute_node_get_all_by_hosts(context, hosts):
+        return sa_api.model_query(context, models.ComputeNode).filter(
+            models.ComputeNode.host.in_(hosts)).all()
+
+    @base.remotable_classmethod
+    def get_all_by_hosts(cls, context, hosts):
+        db_computes = cls._db_compute_node_get_all_by_hosts(context, hosts)
+        return base.obj_make_list(context, cls(context), objects.ComputeNode,
+                                  db_computes)
+
     @staticmethod
     @db.select_db_reader_mode
     def _db_compute_node_get_all_by_uuids(context, compute_uuids):
@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import contextlib
 
 from oslo_config import cfg
@@ -62,6 +63,13 @@ _INSTANCE_EXTRA_FIELDS = ['numa_topology', 'pci_requests',
 _MIGRATION_CONTEXT_ATTRS = ['numa_topology', 'pci_requests',
                             'pci_devices', 'resources']
 
+# These are fields whose hydration from a DB row can be deferred until
+# first access when building large instance lists
+_INSTANCE_DEFERRABLE_FIELDS = ['flavor', 'info_cache', 'numa_topology',
+                               'pci_requests']
+# Fields which are all loaded together with the deferred 'flavor' data
+_FLAVOR_FIELDS = ('flavor', 'old_flavor', 'new_flavor')
+
 # These are fields that can be specified as expected_attrs
 INSTANCE_OPTIONAL_ATTRS = (_INSTANCE_OPTIONAL_JOINED_FIELDS +
                            _INSTANCE_OPTIONAL_NON_COLUMN_FIELDS +
@@ -73,6 +81,11 @@ INSTANCE_DEFAULT_FIELDS = ['metadata', 'system_metadata',
 # Maximum count of tags to one instance
 MAX_TAG_COUNT = 50
 
+# Number of times each Instance attribute was lazy-loaded from the database
+# by this process. A steadily growing count for an attribute usually points
+# to a list caller missing it from expected_attrs, i.e. an N+1 query pattern.
+LAZY_LOAD_COUNTS = collections.Counter()
+
 
 def _expected_cols(expected_attrs):
     """Return expected_attrs that are columns needing joining.
@@ -243,6 +256,9 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             del primitive['services']
 
     def __init__(self, *args, **kwargs):
+        # NOTE: Mapping of field name to the raw DB data it should be
+        # hydrated from on first access. See _from_db_object(defer_attrs).
+        self._deferred_db_attrs = {}
         super(Instance, self).__init__(*args, **kwargs)
         self._reset_metadata_tracking()
 
@@ -276,8 +292,30 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
                                                 recursive=recursive)
         self._reset_metadata_tracking(fields=fields)
 
+    def _deferred_key(self, attrname):
+        if attrname in _FLAVOR_FIELDS:
+            attrname = 'flavor'
+        if attrname in self._deferred_db_attrs:
+            return attrname
+
+    def obj_attr_is_set(self, attrname):
+        # NOTE: A deferred attribute is considered set, it just has not
+        # been converted from its DB representation yet. Accessing it will
+        # hydrate it through obj_load_attr() without going to the database.
+        if self._deferred_key(attrname):
+            return True
+        return super(Instance, self).obj_attr_is_set(attrname)
+
     def obj_what_changed(self):
-        changes = super(Instance, self).obj_what_changed()
+        # NOTE: Deferred attributes cannot have changed since they have not
+        # been hydrated yet, so hide them from the base implementation which
+        # would otherwise load every object field to check it for changes.
+        deferred = self._deferred_db_attrs
+        self._deferred_db_attrs = {}
+        try:
+            changes = super(Instance, self).obj_what_changed()
+        finally:
+            self._deferred_db_attrs = deferred
         if 'metadata' in self and self.metadata != self._orig_metadata:
             changes.add('metadata')
         if 'system_metadata' in self and (self.system_metadata !=
@@ -368,14 +406,20 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
         self.obj_reset_changes(['flavor', 'old_flavor', 'new_flavor'])
 
     @staticmethod
-    def _from_db_object(context, instance, db_inst, expected_attrs=None):
+    def _from_db_object(context, instance, db_inst, expected_attrs=None,
+                        defer_attrs=None):
         """Method to help with migration to objects.
 
         Converts a database entity to a formal object.
+
+        :param defer_attrs: Optional list of expected_attrs, from
+            _INSTANCE_DEFERRABLE_FIELDS, whose conversion from the DB row is
+            postponed until they are first accessed.
         """
         instance._context = context
         if expected_attrs is None:
             expected_attrs = []
+        defer_attrs = set(defer_attrs or []) & set(expected_attrs)
         # Most of the field names match right now, so be quick
         for field in instance.fields:
             if field in INSTANCE_OPTIONAL_ATTRS:
@@ -385,7 +429,7 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             elif field == 'cleaned':
                 instance.cleaned = db_inst['cleaned'] == 1
             else:
-                instance[field] = db_inst[field]
+                base.obj_set_trusted_attr(instance, field, db_inst[field])
 
         if 'metadata' in expected_attrs:
             instance['metadata'] = utils.instance_meta(db_inst)
@@ -400,6 +444,9 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
         if 'info_cache' in expected_attrs:
             if db_inst.get('info_cache') is None:
                 instance.info_cache = None
+            elif 'info_cache' in defer_attrs:
+                instance._deferred_db_attrs['info_cache'] = (
+                    db_inst['info_cache'])
             elif not instance.obj_attr_is_set('info_cache'):
                 # TODO(danms): If this ever happens on a backlevel instance
                 # passed to us by a backlevel service, things will break
@@ -438,18 +485,22 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             instance['services'] = services
 
         instance._extra_attributes_from_db_object(instance, db_inst,
-                                                  expected_attrs)
+                                                  expected_attrs,
+                                                  defer_attrs=defer_attrs)
 
         instance.obj_reset_changes()
         return instance
 
     @staticmethod
     def _extra_attributes_from_db_object(instance, db_inst,
-                                         expected_attrs=None):
+                                         expected_attrs=None,
+                                         defer_attrs=None):
         """Method to help with migration of extra attributes to objects.
         """
         if expected_attrs is None:
             expected_attrs = []
+        if defer_attrs is None:
+            defer_attrs = set()
         # NOTE(danms): We can be called with a dict instead of a
         # SQLAlchemy object, so we have to be careful here
         if hasattr(db_inst, '__dict__'):
@@ -458,13 +509,19 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             have_extra = 'extra' in db_inst and db_inst['extra']
 
         if 'numa_topology' in expected_attrs:
-            if have_extra:
+            if have_extra and 'numa_topology' in defer_attrs:
+                instance._deferred_db_attrs['numa_topology'] = (
+                    db_inst['extra'].get('numa_topology'))
+            elif have_extra:
                 instance._load_numa_topology(
                     db_inst['extra'].get('numa_topology'))
             else:
                 instance.numa_topology = None
         if 'pci_requests' in expected_attrs:
-            if have_extra:
+            if have_extra and 'pci_requests' in defer_attrs:
+                instance._deferred_db_attrs['pci_requests'] = (
+                    db_inst['extra'].get('pci_requests'))
+            elif have_extra:
                 instance._load_pci_requests(
                     db_inst['extra'].get('pci_requests'))
             else:
@@ -506,7 +563,11 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
                                               'old_flavor',
                                               'new_flavor')]):
             if have_extra and db_inst['extra'].get('flavor'):
-                instance._flavor_from_db(db_inst['extra']['flavor'])
+                if 'flavor' in defer_attrs:
+                    instance._deferred_db_attrs['flavor'] = (
+                        db_inst['extra']['flavor'])
+                else:
+                    instance._flavor_from_db(db_inst['extra']['flavor'])
 
     @staticmethod
     @db.select_db_reader_mode
@@ -1084,6 +1145,13 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             self.numa_topology = numa_topology.clear_host_pinning()
 
     def obj_load_attr(self, attrname):
+        deferred_key = self._deferred_key(attrname)
+        if deferred_key:
+            # NOTE: The data was already fetched along with the instance, so
+            # there is no need to go back to the database for it.
+            self._load_deferred_attr(deferred_key)
+            return
+
         # NOTE(danms): We can't lazy-load anything without a context and a uuid
         if not self._context:
             raise exception.OrphanedObjectError(method='obj_load_attr',
@@ -1093,10 +1161,13 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
                 action='obj_load_attr',
                 reason=_('attribute %s not lazy-loadable') % attrname)
 
-        LOG.debug("Lazy-loading '%(attr)s' on %(name)s uuid %(uuid)s",
+        LAZY_LOAD_COUNTS[attrname] += 1
+        LOG.debug("Lazy-loading '%(attr)s' on %(name)s uuid %(uuid)s "
+                  "(%(count)d lazy-loads of this attribute so far)",
                   {'attr': attrname,
                    'name': self.obj_name(),
                    'uuid': self.uuid,
+                   'count': LAZY_LOAD_COUNTS[attrname],
                    })
 
         with utils.temporary_mutation(self._context, read_deleted='yes'):
@@ -1175,6 +1246,30 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
 
         self.obj_reset_changes([attrname])
 
+    def _load_deferred_attr(self, attrname):
+        """Hydrate a deferred attribute from the DB data saved for it."""
+        db_data = self._deferred_db_attrs.pop(attrname)
+        if attrname == 'flavor':
+            # NOTE: Do not clobber any of the flavors which were assigned
+            # after the instance was loaded.
+            assigned = {field: getattr(self, field)
+                        for field in _FLAVOR_FIELDS
+                        if super(Instance, self).obj_attr_is_set(field)}
+            self._flavor_from_db(db_data)
+            for field, value in assigned.items():
+                setattr(self, field, value)
+        elif attrname == 'info_cache':
+            self.info_cache = objects.InstanceInfoCache._from_db_object(
+                self._context, objects.InstanceInfoCache(self._context),
+                db_data)
+            self.obj_reset_changes([attrname])
+        elif attrname == 'numa_topology':
+            self._load_numa_topology(db_data)
+            self.obj_reset_changes([attrname])
+        elif attrname == 'pci_requests':
+            self._load_pci_requests(db_data)
+            self.obj_reset_changes([attrname])
+
     def get_flavor(self, namespace=None):
         prefix = ('%s_' % namespace) if namespace is not None else ''
         attr = '%sflavor' % prefix
@@ -1216,7 +1311,14 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             self._context, self.uuid)
 
 
-def _make_instance_list(context, inst_list, db_inst_list, expected_attrs):
+def _make_instance_list(context, inst_list, db_inst_list, expected_attrs,
+                        defer_attrs=None):
+    """Build the objects of inst_list from db_inst_list.
+
+    :param defer_attrs: Optional list of attributes from
+        _INSTANCE_DEFERRABLE_FIELDS which are kept in their DB form and only
+        converted to objects when first accessed on each instance.
+    """
     get_fault = expected_attrs and 'fault' in expected_attrs
     inst_faults = {}
     if get_fault:
@@ -1235,7 +1337,7 @@ def _make_instance_list(context, inst_list, db_inst_list, expected_attrs):
     for db_inst in db_inst_list:
         inst_obj = inst_cls._from_db_object(
                 context, inst_cls(context), db_inst,
-                expected_attrs=expected_attrs)
+                expected_attrs=expected_attrs, defer_attrs=defer_attrs)
         if get_fault:
             inst_obj.fault = inst_faults.get(inst_obj.uuid, None)
         inst_list.objects.append(inst_obj)
@@ -18,7 +18,9 @@ import six
 from sqlalchemy.orm import joinedload
 from sqlalchemy.sql import false
 from sqlalchemy.sql import func
+from sqlalchemy.sql import null
 from sqlalchemy.sql import or_
+from sqlalchemy.sql import true
 
 from nova import context as nova_context
 from nova.db.sqlalchemy import api as db_api
@@ -166,6 +168,40 @@ class InstanceMapping(base.NovaTimestampObject, base.NovaObject):
         self._from_db_object(self._context, self, db_mapping)
         self.obj_reset_changes()
 
+    @staticmethod
+    @db_api.api_context_manager.writer
+    def _set_queued_for_delete_in_db(context, instance_uuid, queued):
+        model = api_models.InstanceMapping
+        query = context.session.query(model).filter_by(
+                instance_uuid=instance_uuid)
+        if queued:
+            # NOTE: A NULL queued_for_delete has not been migrated yet and
+            # means that the instance is not queued for deletion.
+            query = query.filter(or_(model.queued_for_delete == false(),
+                                     model.queued_for_delete == null()))
+        else:
+            query = query.filter(model.queued_for_delete == true())
+        return query.update({'queued_for_delete': queued},
+                            synchronize_session=False)
+
+    def set_queued_for_delete(self, queued):
+        """Atomically set the queued_for_delete flag of the mapping.
+
+        Unlike setting queued_for_delete and calling save(), the mapping is
+        only updated if the flag in the database differs from the given value,
+        treating None as False, so that only one of several concurrent callers
+        sees that it changed the flag.
+
+        :param queued: Whether the instance is queued for deletion
+        :returns: True if the flag was changed, False if it already had the
+                  given value
+        """
+        changed = self._set_queued_for_delete_in_db(
+            self._context, self.instance_uuid, queued) == 1
+        self.queued_for_delete = queued
+        self.obj_reset_changes(['queued_for_delete'])
+        return changed
+
     @staticmethod
     @db_api.api_context_manager.writer
     def _destroy_in_db(context, instance_uuid):
@@ -355,6 +391,30 @@ class InstanceMappingList(base.ObjectListBase, base.NovaObject):
     def destroy_bulk(cls, context, instance_uuids):
         return cls._destroy_bulk_in_db(context, instance_uuids)
 
+    @staticmethod
+    @db_api.api_context_manager.writer
+    def _update_cell_bulk_in_db(context, instance_uuids, cell_mapping_id):
+        return context.session.query(api_models.InstanceMapping).filter(
+                api_models.InstanceMapping.instance_uuid.in_(instance_uuids)).\
+                update({'cell_id': cell_mapping_id},
+                       synchronize_session=False)
+
+    @classmethod
+    def update_cell_bulk(cls, context, instance_uuids, cell_mapping):
+        """Point the instance mappings for the given UUIDs at a cell.
+
+        This is the bulk version of setting InstanceMapping.cell_mapping and
+        saving each mapping, issuing a single UPDATE for all of the instances.
+
+        :param instance_uuids: List of instance UUIDs whose mappings to update
+        :param cell_mapping: CellMapping object to map the instances to
+        :returns: The number of instance mappings updated
+        """
+        if not instance_uuids:
+            return 0
+        return cls._update_cell_bulk_in_db(context, instance_uuids,
+                                           cell_mapping.id)
+
     @staticmethod
     @db_api.api_context_manager.reader
     def _get_not_deleted_by_cell_and_project_from_db(context, cell_uuid,
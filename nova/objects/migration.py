@@ -82,7 +82,7 @@ class Migration(base.NovaPersistentObject, base.NovaObject,
                 value = determine_migration_type(db_migration)
             elif key == 'uuid' and value is None:
                 continue
-            migration[key] = value
+            base.obj_set_trusted_attr(migration, key, value)
 
         migration._context = context
         migration.obj_reset_changes()
@@ -31,7 +31,7 @@ LOG = logging.getLogger(__name__)
 
 
 # NOTE(danms): This is the global service version counter
-SERVICE_VERSION = 49
+SERVICE_VERSION = 50
 
 
 # NOTE(danms): This is our SERVICE_VERSION history. The idea is that any
@@ -180,6 +180,9 @@ SERVICE_VERSION_HISTORY = (
     {'compute_rpc': '5.10'},
     # Version 49: Compute now support server move operations with qos ports
     {'compute_rpc': '5.10'},
+    # Version 50: Services accept objects over RPC in the compact primitive
+    # format
+    {'compute_rpc': '5.10'},
 )
 
 
@@ -32,6 +32,15 @@ def readfile(path):
         return f.read()
 
 
+@nova.privsep.sys_admin_pctxt.entrypoint
+def readchunk(path, offset, length):
+    if not os.path.exists(path):
+        raise exception.FileNotFound(file_path=path)
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
+
+
 @nova.privsep.sys_admin_pctxt.entrypoint
 def writefile(path, mode, content):
     if not os.path.exists(os.path.dirname(path)):
@@ -17,10 +17,13 @@
 """Quotas for resources per project."""
 
 import copy
+import datetime
 
 from oslo_log import log as logging
 from oslo_utils import importutils
+from oslo_utils import timeutils
 from sqlalchemy.sql import and_
+from sqlalchemy.sql import case
 from sqlalchemy.sql import false
 from sqlalchemy.sql import null
 from sqlalchemy.sql import or_
@@ -47,6 +50,9 @@ UID_QFD_POPULATED_CACHE_BY_PROJECT = set()
 # user_id and queued_for_delete are populated for all projects, cache the
 # result to avoid doing unnecessary EXISTS database queries.
 UID_QFD_POPULATED_CACHE_ALL = False
+# The resources whose usage is kept in usage counters in the API database when
+# [quota]count_usage_from_counters is enabled.
+USAGE_COUNTER_RESOURCES = ('instances', 'cores', 'ram')
 
 
 class DbQuotaDriver(object):
@@ -1233,6 +1239,224 @@ def _instances_cores_ram_count_api_db_placement(context, project_id,
     return total_counts
 
 
+@db_api.api_context_manager.reader
+def _get_usage_counters(context, project_id, user_id=None):
+    """Get the usage counters of a project, and of a user if specified.
+
+    :returns: A dict containing the project-scoped counters and user-scoped
+              counters if user_id is specified, mapping resource names to
+              (in_use, created_at) tuples. For example:
+
+                {'project': {'instances': (2, <datetime>), ...},
+                 'user': {'instances': (1, <datetime>), ...}}
+    """
+    model = api_models.QuotaUsage
+    user_filter = model.user_id == null()
+    if user_id:
+        user_filter = or_(user_filter, model.user_id == user_id)
+    rows = context.session.query(
+        model.user_id, model.resource, model.in_use, model.created_at).\
+        filter_by(project_id=project_id).\
+        filter(model.resource.in_(USAGE_COUNTER_RESOURCES)).\
+        filter(user_filter).\
+        all()
+    counters = {'project': {}}
+    if user_id:
+        counters['user'] = {}
+    duplicates = set()
+    for row in rows:
+        scope = 'project' if row.user_id is None else 'user'
+        if row.resource in counters[scope]:
+            duplicates.add((scope, row.resource))
+        counters[scope][row.resource] = (row.in_use, row.created_at)
+    # NOTE: The quota_usages table has no unique constraint, so the first
+    # reconciliations of a project which race can each create its counters.
+    # Duplicated counters are treated as missing, so that they are
+    # reconciled again and replaced with a single counter.
+    for scope, resource in duplicates:
+        del counters[scope][resource]
+    return counters
+
+
+@db_api.api_context_manager.writer
+def _reset_usage_counters(context, project_id, user_id, counts):
+    """Replace the usage counters of a project and user with counts.
+
+    The created_at column of the counters records when they were last
+    reconciled.
+    """
+    model = api_models.QuotaUsage
+    user_filter = model.user_id == null()
+    if user_id:
+        user_filter = or_(user_filter, model.user_id == user_id)
+    query = context.session.query(model).\
+        filter_by(project_id=project_id).\
+        filter(model.resource.in_(USAGE_COUNTER_RESOURCES)).\
+        filter(user_filter)
+    # NOTE: Lock the existing counters first, so that a concurrent
+    # reconciliation of the same counters waits for this one to commit and
+    # then replaces the counters written by it, rather than adding to them.
+    query.with_entities(model.id).with_for_update().all()
+    query.delete(synchronize_session=False)
+    for scope, scope_counts in counts.items():
+        for resource, in_use in scope_counts.items():
+            counter = model(project_id=project_id, resource=resource,
+                            in_use=in_use, reserved=0)
+            if scope == 'user':
+                counter.user_id = user_id
+            context.session.add(counter)
+
+
+@db_api.api_context_manager.writer
+def _update_usage_counters(context, project_id, user_id, deltas):
+    # NOTE: The counters are incremented in the database rather than read,
+    # modified and written so that concurrent updates are not lost.
+    model = api_models.QuotaUsage
+    context.session.query(model).\
+        filter_by(project_id=project_id).\
+        filter(model.resource.in_(list(deltas))).\
+        filter(or_(model.user_id == null(), model.user_id == user_id)).\
+        update({model.in_use: model.in_use + case(deltas,
+                                                  value=model.resource,
+                                                  else_=0)},
+               synchronize_session=False)
+
+
+@db_api.api_context_manager.writer
+def _destroy_usage_counters(context, project_id):
+    context.session.query(api_models.QuotaUsage).\
+        filter_by(project_id=project_id).\
+        filter(api_models.QuotaUsage.resource.in_(USAGE_COUNTER_RESOURCES)).\
+        delete(synchronize_session=False)
+
+
+def update_usage_counters(context, project_id, user_id, deltas):
+    """Apply changes in resource usage to the usage counters.
+
+    This does nothing unless [quota]count_usage_from_counters is enabled.
+    Counters which do not exist yet are not created, they are counted the next
+    time they are read instead.
+
+    :param context: The request context for database access
+    :param project_id: The project_id whose usage changed
+    :param user_id: The user_id whose usage changed
+    :param deltas: A dict of {resource_name: delta, ...} to add to the counters
+    """
+    if not CONF.quota.count_usage_from_counters:
+        return
+    deltas = {resource: delta for resource, delta in deltas.items()
+              if resource in USAGE_COUNTER_RESOURCES and delta}
+    if not deltas:
+        return
+    try:
+        _update_usage_counters(context, project_id, user_id, deltas)
+    except Exception:
+        # NOTE: Do not fail the operation because of the counters, they are
+        # reconciled with the actual usage once they are old enough anyway.
+        LOG.exception('Failed to update the quota usage counters of project '
+                      '%s', project_id)
+
+
+def update_instance_usage_counters(context, instance, count=1):
+    """Add the usage of instances to the usage counters.
+
+    :param context: The request context for database access
+    :param instance: The Instance whose usage, or the usage of count
+                     instances of the same project, user and flavor, to add
+    :param count: The number of instances, negative to remove their usage
+    """
+    if not CONF.quota.count_usage_from_counters:
+        return
+    try:
+        flavor = instance.flavor
+    except exception.InstanceNotFound:
+        # The instance was destroyed before its flavor was loaded, so the
+        # usage to remove is unknown and the project has to be recounted.
+        invalidate_usage_counters(context, instance.project_id)
+        return
+    # NOTE: The counters are not lowered until a resize is confirmed or
+    # reverted, so they hold the largest of the flavors of a resizing
+    # instance.
+    flavors = [flavor] + [getattr(instance, attr)
+                          for attr in ('old_flavor', 'new_flavor')
+                          if instance.obj_attr_is_set(attr) and
+                          getattr(instance, attr) is not None]
+    deltas = {'instances': count,
+              'cores': count * max(f.vcpus for f in flavors),
+              'ram': count * max(f.memory_mb for f in flavors)}
+    update_usage_counters(context, instance.project_id, instance.user_id,
+                          deltas)
+
+
+def invalidate_usage_counters(context, project_id):
+    """Discard the usage counters of a project.
+
+    The usage of the project is counted again the next time it is read. This
+    does nothing unless [quota]count_usage_from_counters is enabled.
+    """
+    if not CONF.quota.count_usage_from_counters:
+        return
+    try:
+        _destroy_usage_counters(context, project_id)
+    except Exception:
+        LOG.exception('Failed to invalidate the quota usage counters of '
+                      'project %s', project_id)
+
+
+def _instances_cores_ram_count_counters(context, project_id, user_id=None):
+    """Get the counts of instances, cores, and ram from the usage counters.
+
+    Counters which are missing or older than [quota]usage_counters_max_age are
+    first reconciled with the usage counted from the cell databases or from
+    placement.
+    """
+    try:
+        counters = _get_usage_counters(context, project_id, user_id=user_id)
+    except Exception:
+        LOG.exception('Failed to read the quota usage counters of project '
+                      '%s, falling back to counting usage', project_id)
+        return _instances_cores_ram_count_uncached(context, project_id,
+                                                   user_id=user_id)
+
+    max_age = CONF.quota.usage_counters_max_age
+    expired = timeutils.utcnow() - datetime.timedelta(seconds=max_age)
+
+    def _is_current(counter):
+        if counter is None:
+            return False
+        created_at = counter[1]
+        return not max_age or (created_at is not None and
+                               created_at >= expired)
+
+    if all(_is_current(scope_counters.get(resource))
+           for scope_counters in counters.values()
+           for resource in USAGE_COUNTER_RESOURCES):
+        return {scope: {resource: scope_counters[resource][0]
+                        for resource in USAGE_COUNTER_RESOURCES}
+                for scope, scope_counters in counters.items()}
+
+    counts = _instances_cores_ram_count_uncached(context, project_id,
+                                                 user_id=user_id)
+    # Report how far the counters drifted from the actual usage, which tells
+    # whether [quota]usage_counters_max_age is short enough.
+    drift = {}
+    for scope, scope_counters in counters.items():
+        for resource, (in_use, _created_at) in scope_counters.items():
+            if in_use != counts[scope][resource]:
+                drift.setdefault(scope, {})[resource] = (
+                    in_use - counts[scope][resource])
+    if drift:
+        LOG.info('Quota usage counters of project %(project_id)s drifted '
+                 'from the actual usage by %(drift)s',
+                 {'project_id': project_id, 'drift': drift})
+    try:
+        _reset_usage_counters(context, project_id, user_id, counts)
+    except Exception:
+        LOG.exception('Failed to reset the quota usage counters of project '
+                      '%s', project_id)
+    return counts
+
+
 def _instances_cores_ram_count(context, project_id, user_id=None):
     """Get the counts of instances, cores, and ram.
 
@@ -1249,6 +1473,15 @@ def _instances_cores_ram_count(context, project_id, user_id=None):
                           'cores': <count across user>,
                           'ram': <count across user>}}
     """
+    if CONF.quota.count_usage_from_counters:
+        return _instances_cores_ram_count_counters(context, project_id,
+                                                   user_id=user_id)
+    return _instances_cores_ram_count_uncached(context, project_id,
+                                               user_id=user_id)
+
+
+def _instances_cores_ram_count_uncached(context, project_id, user_id=None):
+    """Count instances, cores, and ram from cell databases or placement."""
     global UID_QFD_POPULATED_CACHE_BY_PROJECT
     if CONF.quota.count_usage_from_placement:
         # If a project has all user_id and queued_for_delete data populated,
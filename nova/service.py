@@ -315,6 +315,7 @@ class Service(service.Service):
     def reset(self):
         """reset the service."""
         self.manager.reset()
+        objects_base.reset_globals()
 
 
 class WSGIService(service.Service):
@@ -27,7 +27,8 @@ LOG = logging.getLogger(__name__)
 #目前提供了两个选项来支持servicegroup,默认是db
 _driver_name_class_mapping = {
     'db': 'nova.servicegroup.drivers.db.DbDriver',
-    'mc': 'nova.servicegroup.drivers.mc.MemcachedDriver'
+    'mc': 'nova.servicegroup.drivers.mc.MemcachedDriver',
+    'batch': 'nova.servicegroup.drivers.batch.BatchDriver',
 }
 
 CONF = nova.conf.CONF
@@ -84,6 +85,26 @@ class API(object):
 
         return self._driver.is_up(member)
 
+    def services_are_up(self, members):
+        """Check whether each of the given members is up.
+
+        This is the bulk version of service_is_up, which allows drivers to
+        check all of the members at once.
+
+        :param members: List of members to check
+        :returns: List of booleans, one for each member in the same order
+        """
+        result = [False] * len(members)
+        # NOTE(johngarbutt) no logging in this method,
+        # so this doesn't slow down the scheduler
+        indexes = [i for i, member in enumerate(members)
+                   if not member.get('forced_down')]
+        if indexes:
+            are_up = self._driver.are_up([members[i] for i in indexes])
+            for i, is_up in zip(indexes, are_up):
+                result[i] = is_up
+        return result
+
     def get_updated_time(self, member):
         """Get the updated time from drivers except db"""
         return self._driver.updated_time(member)
@@ -28,6 +28,16 @@ class Driver(object):
         """Check whether the given member is up."""
         raise NotImplementedError()
 
+    def are_up(self, members):
+        """Check whether each of the given members is up.
+
+        Drivers should override this if they can check multiple members more
+        efficiently than one at a time.
+
+        :returns: List of booleans, one for each member in the same order
+        """
+        return [self.is_up(member) for member in members]
+
     def updated_time(self, service_ref):
         """Get the updated time"""
         raise NotImplementedError()
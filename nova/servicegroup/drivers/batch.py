@@ -0,0 +1,136 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Service heartbeat driver which writes state reports to the DB in bulk."""
+
+from oslo_log import log as logging
+from oslo_utils import timeutils
+
+from nova.conductor import rpcapi as conductor_rpcapi
+import nova.conf
+from nova import context as nova_context
+from nova.servicegroup.drivers import db
+from nova.servicegroup import heartbeat
+
+
+CONF = nova.conf.CONF
+
+LOG = logging.getLogger(__name__)
+
+CONDUCTOR_BINARY = 'nova-conductor'
+
+
+class BatchDriver(db.DbDriver):
+    """ServiceGroup driver collecting state reports in memory.
+
+    Rather than each service updating its own services table record every
+    report_interval, state reports are recorded in an in-memory table, either
+    in nova-conductor or in the reporting process itself depending on
+    [DEFAULT]/servicegroup_heartbeat_backend, which is written to the database
+    with a single update every [DEFAULT]/servicegroup_flush_interval. Whether a
+    service is up is answered from the in-memory table when it has a recent
+    enough report for the service, and from the database otherwise.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(BatchDriver, self).__init__(*args, **kwargs)
+        self._conductor_rpcapi = None
+        self._flush_timer_started = False
+
+    @property
+    def conductor_rpcapi(self):
+        if self._conductor_rpcapi is None:
+            self._conductor_rpcapi = conductor_rpcapi.ConductorAPI()
+        return self._conductor_rpcapi
+
+    def _collects_heartbeats(self, service):
+        """Whether state reports are collected in this process."""
+        return (CONF.servicegroup_heartbeat_backend == 'local' or
+                service.binary == CONDUCTOR_BINARY)
+
+    def join(self, member, group, service=None):
+        super(BatchDriver, self).join(member, group, service=service)
+        if (self._collects_heartbeats(service) and
+                not self._flush_timer_started):
+            # NOTE: The table of state reports is shared by all services in
+            # the process, so only flush it once.
+            self._flush_timer_started = True
+            service.tg.add_timer_args(
+                CONF.servicegroup_flush_interval, self._flush,
+                initial_delay=CONF.servicegroup_flush_interval)
+
+    def is_up(self, service_ref):
+        last_seen = heartbeat.HEARTBEATS.last_seen(service_ref.get('id'))
+        if last_seen is not None:
+            elapsed = timeutils.delta_seconds(last_seen, timeutils.utcnow())
+            if abs(elapsed) <= self.service_down_time:
+                return True
+        # The state reports of this service are not collected by this
+        # process, or have not been received for a while, so fall back to
+        # the last state report written to the database.
+        return super(BatchDriver, self).is_up(service_ref)
+
+    def are_up(self, service_refs):
+        result = [False] * len(service_refs)
+        now = timeutils.utcnow()
+        # The indexes of the services whose state is checked in the database.
+        indexes = []
+        for i, service_ref in enumerate(service_refs):
+            last_seen = heartbeat.HEARTBEATS.last_seen(service_ref.get('id'))
+            if (last_seen is not None and abs(timeutils.delta_seconds(
+                    last_seen, now)) <= self.service_down_time):
+                result[i] = True
+            else:
+                indexes.append(i)
+        if indexes:
+            are_up = super(BatchDriver, self).are_up(
+                [service_refs[i] for i in indexes])
+            for i, is_up in zip(indexes, are_up):
+                result[i] = is_up
+        return result
+
+    def _flush(self):
+        try:
+            heartbeat.HEARTBEATS.flush(nova_context.get_admin_context())
+        except Exception:
+            # NOTE: Do not let the timer stop on unexpected errors.
+            LOG.exception('Unexpected error while writing service state '
+                          'reports')
+
+    def _report_state(self, service):
+        """Record the state of this service in the heartbeat table.
+
+        Unlike with the db driver, the report_count of the service record is
+        not incremented here: each recorded state report is added to it in
+        the database when the heartbeat table is flushed.
+        """
+        if self._collects_heartbeats(service):
+            heartbeat.HEARTBEATS.record(service.service_ref.id)
+            return
+        if not self.conductor_rpcapi.can_send_service_heartbeat():
+            # NOTE: nova-conductor is too old to collect state reports, so
+            # update the services table record ourselves.
+            return super(BatchDriver, self)._report_state(service)
+        try:
+            self.conductor_rpcapi.service_heartbeat(
+                nova_context.get_admin_context(), service.service_ref.id)
+
+            if getattr(service, 'model_disconnected', False):
+                service.model_disconnected = False
+                LOG.info('Recovered from being unable to report status.')
+        except Exception:
+            # NOTE: Casts do not wait for a reply, so this is most likely a
+            # failure to connect to the message queue.
+            if not getattr(service, 'model_disconnected', False):
+                service.model_disconnected = True
+                LOG.warning('Lost connection to nova-conductor '
+                            'for reporting service status.')
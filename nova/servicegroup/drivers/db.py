@@ -61,6 +61,14 @@ class DbDriver(base.Driver):
         """Moved from nova.utils
         Check whether a service is up based on last heartbeat.
         """
+        return self._is_up(service_ref, timeutils.utcnow())
+
+    def are_up(self, service_refs):
+        """Check whether each service is up based on its last heartbeat."""
+        now = timeutils.utcnow()
+        return [self._is_up(service_ref, now) for service_ref in service_refs]
+
+    def _is_up(self, service_ref, now):
         last_heartbeat = (service_ref.get('last_seen_up') or
             service_ref['created_at'])
         if isinstance(last_heartbeat, six.string_types):
@@ -73,7 +81,7 @@ class DbDriver(base.Driver):
             # below does not (and will fail)
             last_heartbeat = last_heartbeat.replace(tzinfo=None)
         # Timestamps in DB are UTC.
-        elapsed = timeutils.delta_seconds(last_heartbeat, timeutils.utcnow())
+        elapsed = timeutils.delta_seconds(last_heartbeat, now)
         is_up = abs(elapsed) <= self.service_down_time
         if not is_up:
             LOG.debug('Seems service %(binary)s on host %(host)s is down. '
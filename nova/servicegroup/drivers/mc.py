@@ -69,6 +69,21 @@ class MemcachedDriver(base.Driver):
 
         return is_up
 
+    def are_up(self, service_refs):
+        """Check whether each service is up based on its last heartbeat.
+
+        All of the heartbeats are fetched from memcache in a single request.
+        """
+        keys = [str("%(topic)s:%(host)s" % service_ref)
+                for service_ref in service_refs]
+        if not keys:
+            return []
+        are_up = [value is not None for value in self.mc.get_multi(keys)]
+        for key, is_up in zip(keys, are_up):
+            if not is_up:
+                LOG.debug('Seems service %s is down', key)
+        return are_up
+
     def updated_time(self, service_ref):
         """Get the updated time from memcache"""
         key = "%(topic)s:%(host)s" % service_ref
@@ -0,0 +1,93 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""In-memory collection of service state reports for the batch driver."""
+
+import datetime
+
+from oslo_log import log as logging
+from oslo_utils import timeutils
+
+import nova.conf
+from nova.db import api as db
+
+CONF = nova.conf.CONF
+
+LOG = logging.getLogger(__name__)
+
+
+class HeartbeatTable(object):
+    """Table of the last state report of each service.
+
+    State reports are recorded in memory and written to the database in bulk
+    by flush().
+    """
+
+    def __init__(self):
+        # Map of service id to (number of reports, time of the last report)
+        # for the reports which have not been written to the database yet.
+        self._pending = {}
+        # Map of service id to the time of its last report.
+        self._last_seen = {}
+
+    def record(self, service_id, timestamp=None):
+        """Record a state report from a service.
+
+        :param service_id: The id of the services table record
+        :param timestamp: The time of the report, defaults to now
+        """
+        timestamp = timestamp or timeutils.utcnow()
+        count = self._pending.get(service_id, (0, None))[0]
+        self._pending[service_id] = (count + 1, timestamp)
+        self._last_seen[service_id] = timestamp
+
+    def last_seen(self, service_id):
+        """Get the time of the last state report recorded for a service.
+
+        :returns: A naive UTC datetime, or None if no report was recorded
+        """
+        return self._last_seen.get(service_id)
+
+    def flush(self, context):
+        """Write the pending state reports to the database.
+
+        :param context: A nova RequestContext with access to the database
+        :returns: The number of services whose state reports were written
+        """
+        # NOTE: Swap out the pending reports before writing them so that
+        # reports recorded during the update are kept for the next flush.
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            db.service_update_heartbeats(context, pending)
+        except Exception:
+            LOG.exception('Failed to write the state reports of %d services '
+                          'to the database.', len(pending))
+            for service_id, (count, timestamp) in pending.items():
+                newer_count, newer_timestamp = self._pending.get(
+                    service_id, (0, timestamp))
+                self._pending[service_id] = (count + newer_count,
+                                             newer_timestamp)
+            return 0
+        # Forget about the services which stopped reporting, for example
+        # because they have been deleted.
+        expired = timeutils.utcnow() - datetime.timedelta(
+            seconds=CONF.service_down_time)
+        for service_id, timestamp in list(self._last_seen.items()):
+            if timestamp < expired and service_id not in self._pending:
+                del self._last_seen[service_id]
+        return len(pending)
+
+
+# The table of state reports recorded in this process.
+HEARTBEATS = HeartbeatTable()
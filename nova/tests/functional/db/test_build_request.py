@@ -539,3 +539,19 @@ class BuildRequestListTestCase(test.NoDBTestCase):
 
         self.assertIsInstance(req_list, objects.BuildRequestList)
         self.assertEqual(0, len(req_list))
+
+    def test_get_instance_uuids(self):
+        reqs = [self._create_req(), self._create_req(project_id='other')]
+        # Create a third that we won't include
+        self._create_req()
+        uuids = [req.instance_uuid for req in reqs]
+
+        found = build_request.BuildRequestList.get_instance_uuids(
+            self.context, uuids + [uuidutils.generate_uuid()])
+
+        self.assertEqual(set(uuids), found)
+
+    def test_get_instance_uuids_empty(self):
+        self._create_req()
+        self.assertEqual(set(), build_request.BuildRequestList.
+                         get_instance_uuids(self.context, []))
@@ -151,6 +151,30 @@ class ComputeNodeTestCase(test.TestCase):
                                                         cn3.uuid])
         self.assertEqual(2, len(cns))
 
+    def test_get_all_by_hosts(self):
+        cn1 = fake_compute_obj.obj_clone()
+        cn1._context = self.context
+        cn1.create()
+        cn2 = fake_compute_obj.obj_clone()
+        cn2._context = self.context
+        cn2.host = _HOSTNAME + '2'
+        cn2.create()
+        # A deleted compute node
+        cn3 = fake_compute_obj.obj_clone()
+        cn3._context = self.context
+        cn3.host = _HOSTNAME + '3'
+        cn3.create()
+        cn3.destroy()
+
+        cns = objects.ComputeNodeList.get_all_by_hosts(self.context,
+                                                       [cn2.host])
+        self.assertEqual([cn2.uuid], [cn.uuid for cn in cns])
+
+        cns = objects.ComputeNodeList.get_all_by_hosts(
+            self.context, [cn1.host, cn2.host, cn3.host, 'noexists'])
+        self.assertEqual(sorted([cn1.uuid, cn2.uuid]),
+                         sorted(cn.uuid for cn in cns))
+
     def test_get_by_hypervisor_type(self):
         cn1 = fake_compute_obj.obj_clone()
         cn1._context = self.context
@@ -101,6 +101,32 @@ class InstanceMappingTestCase(test.NoDBTestCase):
                 self.mapping_obj._get_by_instance_uuid_from_db, self.context,
                 mapping['instance_uuid'])
 
+    def test_set_queued_for_delete(self):
+        for initial in (False, None):
+            mapping = create_mapping(queued_for_delete=initial)
+            inst_mapping = instance_mapping.InstanceMapping.\
+                get_by_instance_uuid(self.context, mapping['instance_uuid'])
+            # Only the first of two deletes changes the flag, None being
+            # treated as not queued for deletion.
+            self.assertTrue(inst_mapping.set_queued_for_delete(True))
+            self.assertFalse(inst_mapping.set_queued_for_delete(True))
+            self.assertTrue(inst_mapping.queued_for_delete)
+            self.assertTrue(self.mapping_obj._get_by_instance_uuid_from_db(
+                self.context, mapping['instance_uuid'])['queued_for_delete'])
+            # Likewise for restores.
+            self.assertTrue(inst_mapping.set_queued_for_delete(False))
+            self.assertFalse(inst_mapping.set_queued_for_delete(False))
+            self.assertFalse(inst_mapping.queued_for_delete)
+            self.assertFalse(self.mapping_obj._get_by_instance_uuid_from_db(
+                self.context, mapping['instance_uuid'])['queued_for_delete'])
+
+    def test_set_queued_for_delete_none(self):
+        # Restoring an instance whose flag is not set does not change it.
+        mapping = create_mapping(queued_for_delete=None)
+        inst_mapping = instance_mapping.InstanceMapping.get_by_instance_uuid(
+            self.context, mapping['instance_uuid'])
+        self.assertFalse(inst_mapping.set_queued_for_delete(False))
+
     def test_cell_id_nullable(self):
         # Just ensure this doesn't raise
         create_mapping(cell_id=None)
@@ -458,6 +484,29 @@ class InstanceMappingListTestCase(test.NoDBTestCase):
         self.assertEqual(sorted(uuids),
                          sorted([m.instance_uuid for m in mappings]))
 
+    def test_update_cell_bulk(self):
+        cell = cell_mapping.CellMapping._from_db_object(
+            self.context, cell_mapping.CellMapping(),
+            create_cell_mapping(id=4))
+        db_inst_mapping1 = create_mapping(cell_id=None)
+        db_inst_mapping2 = create_mapping(cell_id=None)
+        # Create a third that we won't update
+        db_inst_mapping3 = create_mapping(cell_id=None)
+        uuids = [db_inst_mapping1.instance_uuid,
+                 db_inst_mapping2.instance_uuid]
+
+        updated = instance_mapping.InstanceMappingList.update_cell_bulk(
+            self.context, uuids, cell)
+
+        self.assertEqual(2, updated)
+        for uuid in uuids:
+            mapping = instance_mapping.InstanceMapping.get_by_instance_uuid(
+                self.context, uuid)
+            self.assertEqual(cell.uuid, mapping.cell_mapping.uuid)
+        mapping = instance_mapping.InstanceMapping.get_by_instance_uuid(
+            self.context, db_inst_mapping3.instance_uuid)
+        self.assertIsNone(mapping.cell_mapping)
+
     def test_get_not_deleted_by_cell_and_project(self):
         cells = []
         # Create two cells
@@ -14,7 +14,10 @@ import ddt
 import mock
 from oslo_utils import uuidutils
 
+from nova.compute import api as compute_api
 from nova import context
+from nova.db.sqlalchemy import api as db_api
+from nova.db.sqlalchemy import api_models
 from nova import objects
 from nova import quota
 from nova import test
@@ -257,3 +260,111 @@ class QuotaTestCase(test.NoDBTestCase):
         self.assertTrue(
             quota._user_id_queued_for_delete_populated(
                 ctxt, project_id='other-project'))
+
+    def test_usage_counters(self):
+        ctxt = context.RequestContext('fake-user', 'fake-project')
+        counts = {'project': {'instances': 3, 'cores': 10, 'ram': 2560},
+                  'user': {'instances': 2, 'cores': 6, 'ram': 1536}}
+        quota._reset_usage_counters(ctxt, 'fake-project', 'fake-user',
+                                    counts)
+        # Counters of another user of the project.
+        quota._reset_usage_counters(
+            ctxt, 'fake-project', 'other-fake-user',
+            {'project': counts['project'],
+             'user': {'instances': 1, 'cores': 4, 'ram': 1024}})
+
+        def _get_counts(user_id=None):
+            counters = quota._get_usage_counters(ctxt, 'fake-project',
+                                                 user_id=user_id)
+            return {scope: {resource: in_use
+                            for resource, (in_use, _created_at)
+                            in scope_counters.items()}
+                    for scope, scope_counters in counters.items()}
+
+        self.assertEqual(counts, _get_counts(user_id='fake-user'))
+        self.assertEqual({'project': counts['project']}, _get_counts())
+
+        # Updates apply to the project counters and to those of the user.
+        quota._update_usage_counters(ctxt, 'fake-project', 'fake-user',
+                                     {'instances': -1, 'ram': -512})
+        expected = {'project': {'instances': 2, 'cores': 10, 'ram': 2048},
+                    'user': {'instances': 1, 'cores': 6, 'ram': 1024}}
+        self.assertEqual(expected, _get_counts(user_id='fake-user'))
+        self.assertEqual({'instances': 1, 'cores': 4, 'ram': 1024},
+                         _get_counts(user_id='other-fake-user')['user'])
+
+        quota._destroy_usage_counters(ctxt, 'fake-project')
+        self.assertEqual({'project': {}, 'user': {}},
+                         _get_counts(user_id='fake-user'))
+
+    def test_usage_counters_duplicates(self):
+        ctxt = context.RequestContext('fake-user', 'fake-project')
+        counts = {'project': {'instances': 3, 'cores': 10, 'ram': 2560},
+                  'user': {'instances': 2, 'cores': 6, 'ram': 1536}}
+        quota._reset_usage_counters(ctxt, 'fake-project', 'fake-user',
+                                    counts)
+        # Add a duplicate of the project instances counter, as created when
+        # the first reconciliations of a project race.
+        with db_api.api_context_manager.writer.using(ctxt):
+            ctxt.session.add(api_models.QuotaUsage(
+                project_id='fake-project', resource='instances', in_use=3,
+                reserved=0))
+
+        counters = quota._get_usage_counters(ctxt, 'fake-project',
+                                             user_id='fake-user')
+        # The duplicated counter is treated as missing.
+        self.assertNotIn('instances', counters['project'])
+        self.assertEqual({'cores', 'ram'}, set(counters['project']))
+        self.assertEqual({'instances', 'cores', 'ram'},
+                         set(counters['user']))
+
+        # Reconciling the counters replaces the duplicates.
+        quota._reset_usage_counters(ctxt, 'fake-project', 'fake-user',
+                                    counts)
+        counters = quota._get_usage_counters(ctxt, 'fake-project',
+                                             user_id='fake-user')
+        self.assertEqual(3, counters['project']['instances'][0])
+
+    def _test_usage_counters_resize_revert(self, old_flavor, new_flavor):
+        self.flags(count_usage_from_counters=True, group='quota')
+        ctxt = context.RequestContext('fake-user', 'fake-project')
+        counts = {'project': {'instances': 1, 'cores': 2, 'ram': 2048},
+                  'user': {'instances': 1, 'cores': 2, 'ram': 2048}}
+        quota._reset_usage_counters(ctxt, 'fake-project', 'fake-user',
+                                    counts)
+        instance = objects.Instance(project_id='fake-project',
+                                    user_id='fake-user', flavor=old_flavor)
+
+        # The resize is requested.
+        compute_api.API._check_quota_for_upsize(ctxt, instance, old_flavor,
+                                                new_flavor)
+        # The compute service switches the flavor of the instance.
+        instance.flavor = new_flavor
+        instance.old_flavor = old_flavor
+        # The resize is reverted, as done by API.revert_resize.
+        compute_api.API._check_quota_for_upsize(
+            ctxt, instance, instance.flavor, instance.old_flavor,
+            revert=True)
+        compute_api.API._revert_usage_counters_for_upsize(ctxt, instance)
+
+        counters = quota._get_usage_counters(ctxt, 'fake-project',
+                                             user_id='fake-user')
+        self.assertEqual(
+            counts,
+            {scope: {resource: in_use
+                     for resource, (in_use, _created_at)
+                     in scope_counters.items()}
+             for scope, scope_counters in counters.items()})
+
+    def test_usage_counters_upsize_revert(self):
+        self._test_usage_counters_resize_revert(
+            objects.Flavor(vcpus=2, memory_mb=2048),
+            objects.Flavor(vcpus=4, memory_mb=4096))
+
+    def test_usage_counters_downsize_revert(self):
+        # The counters are at the quota limit of cores, which must not
+        # prevent reverting a downsize.
+        self.flags(cores=2, group='quota')
+        self._test_usage_counters_resize_revert(
+            objects.Flavor(vcpus=2, memory_mb=2048),
+            objects.Flavor(vcpus=1, memory_mb=1024))
@@ -91,8 +91,8 @@ class AvailabilityZoneApiTestV21(test.NoDBTestCase):
         fakes.stub_out_nw_api(self)
         self.stub_out('nova.availability_zones.set_availability_zones',
                       lambda c, services: services)
-        self.stub_out('nova.servicegroup.API.service_is_up',
-                      lambda s, service: True)
+        self.stub_out('nova.servicegroup.API.services_are_up',
+                      lambda s, services: [True] * len(services))
         self.controller = self.availability_zone.AvailabilityZoneController()
         self.mock_service_get_all = mock.patch.object(
             self.controller.host_api, 'service_get_all',
@@ -90,14 +90,15 @@ class ExtendedHypervisorsTestV21(test.NoDBTestCase):
             mock.patch.object(self.controller.host_api, 'compute_node_get_all',
                               side_effect=fake_compute_node_get_all),
             mock.patch.object(self.controller.servicegroup_api,
-                              'service_is_up', return_value=True),
-        ) as (mock_node_get_all, mock_service_is_up):
+                              'services_are_up', return_value=[True, True]),
+        ) as (mock_node_get_all, mock_services_are_up):
             req = self._get_request()
             result = self.controller.detail(req)
 
             self.assertEqual(dict(hypervisors=self.DETAIL_HYPERS_DICTS),
                              result)
-            self.assertTrue(mock_service_is_up.called)
+            mock_services_are_up.assert_called_once_with(
+                [test.MatchType(objects.Service)] * 2)
             self.assertTrue(mock_get_by_host.called)
             self.assertTrue(mock_node_get_all.called)
 
@@ -223,6 +223,8 @@ class HypervisorsTestV21(test.NoDBTestCase):
         self.controller = hypervisors_v21.HypervisorsController()
         self.controller.servicegroup_api.service_is_up = mock.MagicMock(
             return_value=True)
+        self.controller.servicegroup_api.services_are_up = mock.MagicMock(
+            side_effect=lambda services: [True] * len(services))
 
     def _get_hyper_id(self):
         """Helper function to get the proper hypervisor id for a request
@@ -306,6 +308,20 @@ class HypervisorsTestV21(test.NoDBTestCase):
 
         self.assertEqual(dict(hypervisors=self.INDEX_HYPER_DICTS), result)
 
+    def test_index_services_are_up(self):
+        # The state of all of the services is checked with a single call.
+        self.controller.servicegroup_api.services_are_up.side_effect = None
+        self.controller.servicegroup_api.services_are_up.return_value = [
+            False, True]
+        req = self._get_request(True)
+        result = self.controller.index(req)
+
+        self.assertEqual(['down', 'up'],
+                         [hyp['state'] for hyp in result['hypervisors']])
+        self.controller.servicegroup_api.services_are_up.\
+            assert_called_once_with(TEST_SERVICES)
+        self.controller.servicegroup_api.service_is_up.assert_not_called()
+
     def test_index_non_admin(self):
         req = self._get_request(False)
         self.assertRaises(exception.PolicyNotAuthorized,
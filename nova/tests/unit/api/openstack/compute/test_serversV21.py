@@ -7086,6 +7086,55 @@ class ServersViewBuilderTest(test.TestCase):
                                                False)
         self.assertEqual(result, expected)
 
+    def test_get_flavor_bookmark_memoized_per_request(self):
+        with mock.patch.object(self.view_builder._flavor_builder,
+                               '_get_bookmark_link',
+                               return_value='fake-link') as mock_link:
+            for i in range(3):
+                result = self.view_builder._get_flavor(
+                    self.request, self.instance, False)
+                self.assertEqual('fake-link', result['links'][0]['href'])
+        mock_link.assert_called_once_with(self.request, '1', 'flavors')
+
+    def test_get_image_bookmark_memoized_per_request(self):
+        with mock.patch.object(self.view_builder._image_builder,
+                               '_get_bookmark_link',
+                               return_value='fake-link') as mock_link:
+            for i in range(3):
+                result = self.view_builder._get_image(self.request,
+                                                      self.instance)
+                self.assertEqual('fake-link', result['links'][0]['href'])
+        mock_link.assert_called_once_with(self.request, '5', 'images')
+
+    def test_get_links_memoized_per_request(self):
+        with mock.patch.object(self.view_builder, '_get_href_link',
+                               wraps=self.view_builder._get_href_link
+                               ) as mock_href:
+            links = self.view_builder._get_links(self.request, self.uuid,
+                                                 'servers')
+            other_links = self.view_builder._get_links(self.request,
+                                                       uuids.other, 'servers')
+        self.assertEqual(self.self_link, links[0]['href'])
+        self.assertEqual(self.bookmark_link, links[1]['href'])
+        self.assertEqual(self.self_link.replace(self.uuid, uuids.other),
+                         other_links[0]['href'])
+        mock_href.assert_called_once_with(self.request, '', 'servers')
+
+    @mock.patch('nova.availability_zones.get_instance_availability_zone',
+                return_value='az1')
+    def test_get_availability_zone_memoized_per_host(self, mock_get_az):
+        other = self.instance.obj_clone()
+        other.uuid = uuids.other
+        elsewhere = self.instance.obj_clone()
+        elsewhere.host = 'other_host'
+        ctxt = self.request.environ['nova.context']
+        for instance in (self.instance, other, elsewhere):
+            self.assertEqual('az1', self.view_builder._get_availability_zone(
+                self.request, ctxt, instance))
+        mock_get_az.assert_has_calls([mock.call(ctxt, self.instance),
+                                      mock.call(ctxt, elsewhere)])
+        self.assertEqual(2, mock_get_az.call_count)
+
     @mock.patch('nova.context.scatter_gather_cells')
     def test_get_volumes_attached_with_faily_cells(self, mock_sg):
         bdms = fake_bdms_get_all_by_instance_uuids()
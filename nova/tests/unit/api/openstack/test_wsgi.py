@@ -10,6 +10,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import datetime
+
 import mock
 from oslo_serialization import jsonutils
 import six
@@ -194,6 +197,24 @@ class JSONDictSerializerTest(test.NoDBTestCase):
         result = result.replace('\n', '').replace(' ', '')
         self.assertEqual(result, expected_json)
 
+    @mock.patch.object(wsgi.JSONDictSerializer, '_ITER_BATCH_SIZE', new=2)
+    def test_serialize_iter(self):
+        input_dict = collections.OrderedDict([
+            ('servers', [{'id': i, 'created': datetime.datetime(2019, 1, i)}
+                         for i in range(1, 6)]),
+            ('servers_links', [{'rel': 'next'}]),
+            ('empty', {})])
+        serializer = wsgi.JSONDictSerializer()
+        chunks = list(serializer.serialize_iter(input_dict, 3))
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual(serializer.serialize(input_dict), ''.join(chunks))
+
+    def test_serialize_iter_nothing_to_stream(self):
+        serializer = wsgi.JSONDictSerializer()
+        self.assertIsNone(serializer.serialize_iter({'servers': [1, 2]}, 3))
+        self.assertIsNone(serializer.serialize_iter([1, 2, 3], 3))
+        self.assertIsNone(serializer.serialize_iter({1: [1, 2, 3]}, 3))
+
 
 class JSONDeserializerTest(test.NoDBTestCase):
     def test_json(self):
@@ -824,6 +845,23 @@ class ResponseObjectTest(test.NoDBTestCase):
         hdrs['hEADER'] = 'bar'
         self.assertEqual(robj['hEADER'], 'foo')
 
+    def test_serialize(self):
+        body = {'servers': [{'id': 1}, {'id': 2}]}
+        robj = wsgi.ResponseObject(body)
+        response = robj.serialize(None, 'application/json')
+        self.assertEqual(body, jsonutils.loads(response.body))
+        self.assertIsNotNone(response.content_length)
+
+    def test_serialize_streaming(self):
+        self.flags(response_streaming_min_items=2, group='api')
+        body = {'servers': [{'id': 1}, {'id': 2}]}
+        robj = wsgi.ResponseObject(body)
+        response = robj.serialize(None, 'application/json')
+        self.assertIsNone(response.content_length)
+        self.assertEqual(
+            robj.serializer.serialize(body).encode('utf-8'), response.body)
+        self.assertEqual('application/json', response.headers['Content-Type'])
+
 
 class ValidBodyTest(test.NoDBTestCase):
 
@@ -926,6 +964,38 @@ class TestController(test.NoDBTestCase):
                                                                  func_list)
         self.assertTrue(result)
 
+    def test_versioned_method_dispatch_memoized(self):
+        class Controller(wsgi.Controller):
+            @wsgi.Controller.api_version('2.1', '2.4')
+            def index(self, req):
+                return 'old'
+
+            @wsgi.Controller.api_version('2.5')  # noqa
+            def index(self, req):
+                return 'new'
+
+        controller = Controller()
+
+        def _req(version):
+            return mock.Mock(
+                api_version_request=api_version.APIVersionRequest(version))
+
+        with mock.patch.object(api_version.APIVersionRequest, 'matches',
+                               autospec=True,
+                               side_effect=api_version.APIVersionRequest.
+                               matches) as mock_matches:
+            self.assertEqual('old', controller.index(_req('2.3')))
+            self.assertEqual('new', controller.index(_req('2.6')))
+            calls = mock_matches.call_count
+            self.assertEqual('old', controller.index(_req('2.3')))
+            self.assertEqual('new', controller.index(req=_req('2.6')))
+            # The second round only used the dispatch table
+            self.assertEqual(calls, mock_matches.call_count)
+        self.assertRaises(exception.VersionNotFoundForAPIMethod,
+                          controller.index, _req('2.0'))
+        self.assertRaises(exception.VersionNotFoundForAPIMethod,
+                          controller.index, _req('2.0'))
+
 
 class ExpectedErrorTestCase(test.NoDBTestCase):
 
@@ -52,6 +52,11 @@ class TestNovaKeystoneContextMiddleware(test.NoDBTestCase):
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(self.context.user_id, 'testuserid')
 
+    def test_policy_cache_enabled(self):
+        self.request.headers['X_USER_ID'] = 'testuserid'
+        self.request.get_response(self.middleware)
+        self.assertEqual({}, self.context._policy_cache)
+
     def test_invalid_service_catalog(self):
         self.request.headers['X_USER_ID'] = 'testuser'
         self.request.headers['X_SERVICE_CATALOG'] = "bad json"
@@ -5564,6 +5564,49 @@ class _ComputeAPIUnitTestMixIn(object):
         mock_get.assert_called_once_with(self.context, inst.uuid)
         mock_save.assert_called_once_with()
 
+    @mock.patch('nova.quota.update_instance_usage_counters')
+    @mock.patch.object(objects.InstanceMapping, 'save')
+    @mock.patch.object(objects.InstanceMapping, 'set_queued_for_delete')
+    @mock.patch.object(objects.InstanceMapping, 'get_by_instance_uuid')
+    def test_update_queued_for_deletion_usage_counters(self, mock_get,
+                                                       mock_set_qfd,
+                                                       mock_save,
+                                                       mock_update):
+        self.flags(count_usage_from_counters=True, group='quota')
+        inst = objects.Instance(uuid=uuids.inst)
+        im = objects.InstanceMapping(instance_uuid=uuids.inst,
+                                     queued_for_delete=False,
+                                     cell_mapping=objects.CellMapping())
+        mock_get.return_value = im
+
+        mock_set_qfd.return_value = True
+        self.compute_api._update_queued_for_deletion(self.context, inst, True)
+        mock_set_qfd.assert_called_once_with(True)
+        mock_update.assert_called_once_with(self.context, inst, count=-1)
+
+        # Deleting again, or concurrently, does not remove the usage twice.
+        mock_update.reset_mock()
+        mock_set_qfd.return_value = False
+        self.compute_api._update_queued_for_deletion(self.context, inst, True)
+        mock_update.assert_not_called()
+
+        # Restoring adds the usage back.
+        mock_set_qfd.return_value = True
+        self.compute_api._update_queued_for_deletion(self.context, inst, False)
+        mock_set_qfd.assert_called_with(False)
+        mock_update.assert_called_once_with(self.context, inst, count=1)
+        mock_save.assert_not_called()
+
+        # Instances which were not created in a cell are not counted.
+        mock_update.reset_mock()
+        mock_set_qfd.reset_mock()
+        im.cell_mapping = None
+        self.compute_api._update_queued_for_deletion(self.context, inst, True)
+        mock_update.assert_not_called()
+        mock_set_qfd.assert_not_called()
+        mock_save.assert_called_once_with()
+        self.assertTrue(im.queued_for_delete)
+
     @mock.patch.object(objects.InstanceMappingList,
                        'get_not_deleted_by_cell_and_project')
     def test_generate_minimal_construct_for_down_cells(self, mock_get_ims):
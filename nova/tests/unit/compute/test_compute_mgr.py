@@ -21,6 +21,7 @@ from cinderclient import exceptions as cinder_exception
 from cursive import exception as cursive_exception
 import ddt
 from eventlet import event as eventlet_event
+from eventlet import greenthread
 from eventlet import timeout as eventlet_timeout
 from keystoneauth1 import exceptions as keystone_exception
 import mock
@@ -869,6 +870,27 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
             self.assertEqual(2, mock_migration_pool.shutdown.call_count)
             self.assertEqual({}, self.compute._waiting_live_migrations)
 
+    def test_cleanup_live_migrations_in_pool_waiting_for_memory_budget(self):
+        fake_future = mock.MagicMock()
+        fake_future.cancel.return_value = False
+        fake_migration = objects.Migration(
+            uuid=uuids.migration, instance_uuid=uuids.instance)
+        fake_migration.save = mock.MagicMock()
+        self.compute._waiting_live_migrations[uuids.instance] = (
+            fake_migration, fake_future)
+
+        with test.nested(
+            mock.patch.object(self.compute, '_live_migration_executor'),
+            mock.patch.object(self.compute._live_migration_memory_budget,
+                              'cancel', return_value=True),
+        ) as (mock_migration_pool, mock_cancel):
+            self.compute._cleanup_live_migrations_in_pool()
+
+        mock_migration_pool.shutdown.assert_called_once_with(wait=False)
+        mock_cancel.assert_called_once_with(uuids.instance)
+        self.assertEqual('cancelled', fake_migration.status)
+        self.assertEqual({}, self.compute._waiting_live_migrations)
+
     def test_init_virt_events_disabled(self):
         self.flags(handle_virt_lifecycle_events=False, group='workarounds')
         with mock.patch.object(self.compute.driver,
@@ -5907,6 +5929,36 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase,
             self.assertEqual({'one-image': 'cached',
                               'two-image': 'existing'}, r)
 
+    def test_cache_images_duplicates(self):
+        with mock.patch.object(self.compute.driver, 'cache_image') as c:
+            c.return_value = True
+            r = self.compute.cache_images(self.context, ['one-image',
+                                                         'one-image'])
+            self.assertEqual({'one-image': 'cached'}, r)
+            c.assert_called_once_with(self.context, 'one-image')
+
+    def test_cache_images_concurrency(self):
+        self.flags(precache_host_concurrency=2, group='image_cache')
+        started = []
+        release = eventlet_event.Event()
+
+        def fake_cache_image(context, image_id):
+            started.append(image_id)
+            if image_id == 'one-image':
+                # Only returns once the second image started downloading.
+                release.wait()
+            else:
+                release.send()
+            return True
+
+        with mock.patch.object(self.compute.driver, 'cache_image',
+                               side_effect=fake_cache_image):
+            r = self.compute.cache_images(self.context, ['one-image',
+                                                         'two-image'])
+        self.assertEqual(['one-image', 'two-image'], started)
+        self.assertEqual({'one-image': 'cached',
+                          'two-image': 'cached'}, r)
+
 
 class ComputeManagerBuildInstanceTestCase(test.NoDBTestCase):
     def setUp(self):
@@ -8518,6 +8570,51 @@ class ComputeManagerMigrationTestCase(test.NoDBTestCase,
         self.flags(max_concurrent_live_migrations=0)
         self._test_max_concurrent_live()
 
+    @mock.patch('nova.compute.manager.ComputeManager._do_live_migration')
+    def test_do_live_migration_in_memory_budget(self, mock_lm):
+        self.flags(max_concurrent_live_migration_memory_mb=4096)
+        compute = manager.ComputeManager()
+        instance = objects.Instance(uuid=uuids.fake,
+                                    flavor=objects.Flavor(memory_mb=2048))
+        migration = objects.Migration(uuid=uuids.migration)
+
+        def fake_do_live_migration(*args):
+            self.assertEqual(
+                2048, compute._live_migration_memory_budget.used_mb)
+        mock_lm.side_effect = fake_do_live_migration
+
+        compute._do_live_migration_in_memory_budget(
+            self.context, mock.sentinel.dest, instance,
+            mock.sentinel.block_migration, migration,
+            mock.sentinel.migrate_data)
+
+        mock_lm.assert_called_once_with(
+            self.context, mock.sentinel.dest, instance,
+            mock.sentinel.block_migration, migration,
+            mock.sentinel.migrate_data)
+        self.assertEqual(0, compute._live_migration_memory_budget.used_mb)
+
+    @mock.patch('nova.compute.manager.ComputeManager._do_live_migration')
+    def test_do_live_migration_in_memory_budget_cancelled(self, mock_lm):
+        self.flags(max_concurrent_live_migration_memory_mb=4096)
+        compute = manager.ComputeManager()
+        budget = compute._live_migration_memory_budget
+        instance = objects.Instance(uuid=uuids.fake,
+                                    flavor=objects.Flavor(memory_mb=2048))
+        migration = objects.Migration(uuid=uuids.migration)
+
+        with budget.reserve(4096):
+            waiting = greenthread.spawn(
+                compute._do_live_migration_in_memory_budget, self.context,
+                mock.sentinel.dest, instance, mock.sentinel.block_migration,
+                migration, mock.sentinel.migrate_data)
+            greenthread.sleep(0)
+            self.assertTrue(budget.cancel(instance.uuid))
+            waiting.wait()
+
+        mock_lm.assert_not_called()
+        self.assertEqual(0, budget.used_mb)
+
     @mock.patch('futurist.GreenThreadPoolExecutor')
     def test_max_concurrent_live_semaphore_limited(self, mock_executor):
         self.flags(max_concurrent_live_migrations=123)
@@ -8740,6 +8837,123 @@ class ComputeManagerMigrationTestCase(test.NoDBTestCase,
                 self.assertGreater(len(m.mock_calls), 0)
         _test()
 
+    def _get_pre_live_migration_volume_bdms(self, instance, count):
+        bdms = []
+        for i in range(count):
+            bdm = fake_block_device.fake_bdm_object(
+                self.context,
+                {'source_type': 'volume', 'destination_type': 'volume',
+                 'volume_id': getattr(uuids, 'vol%d' % i),
+                 'device_name': '/dev/vd%s' % 'bcd'[i],
+                 'instance_uuid': instance.uuid,
+                 'connection_info': '{"test": "test"}'})
+            bdm.attachment_id = getattr(uuids, 'vol%d_attach_orig' % i)
+            bdms.append(bdm)
+        return bdms
+
+    @mock.patch.object(manager, 'compute_utils', autospec=True)
+    @mock.patch.object(objects.BlockDeviceMapping, 'save')
+    @mock.patch.object(objects.BlockDeviceMappingList, 'get_by_instance_uuid')
+    def test_pre_live_migration_volume_attach_concurrency(
+            self, mock_bdms_get, mock_bdm_save, mock_compute_utils):
+        self.flags(live_migration_volume_attach_concurrency=3,
+                   group='compute')
+        compute = manager.ComputeManager()
+        instance = fake_instance.fake_instance_obj(self.context,
+                                                   uuid=uuids.instance)
+        bdms = self._get_pre_live_migration_volume_bdms(instance, 3)
+        mock_bdms_get.return_value = bdms
+        migrate_data = migrate_data_obj.LiveMigrateData()
+        new_attachment_ids = {uuids.vol0: uuids.vol0_attach_new,
+                              uuids.vol1: uuids.vol1_attach_new,
+                              uuids.vol2: uuids.vol2_attach_new}
+
+        # All the attachments are created before any of them returns.
+        started = []
+
+        def fake_attachment_create(context, volume_id, instance_uuid,
+                                   connector=None, mountpoint=None):
+            started.append(volume_id)
+            while len(started) < len(bdms):
+                greenthread.sleep(0)
+            return {'id': new_attachment_ids[volume_id]}
+
+        with test.nested(
+            mock.patch.object(compute, 'network_api', autospec=True),
+            mock.patch.object(compute, 'volume_api', autospec=True),
+            mock.patch.object(compute, '_get_instance_block_device_info'),
+            mock.patch.object(compute.driver, 'pre_live_migration',
+                              return_value=migrate_data),
+        ) as (mock_net_api, mock_vol_api, mock_get_bdi, mock_plm):
+            mock_vol_api.attachment_create.side_effect = (
+                fake_attachment_create)
+            compute.pre_live_migration(self.context, instance, False, {},
+                                       migrate_data)
+
+        self.assertEqual([uuids.vol0, uuids.vol1, uuids.vol2], started)
+        self.assertEqual([uuids.vol0_attach_new, uuids.vol1_attach_new,
+                          uuids.vol2_attach_new],
+                         [bdm.attachment_id for bdm in bdms])
+        self.assertEqual({uuids.vol0: uuids.vol0_attach_orig,
+                          uuids.vol1: uuids.vol1_attach_orig,
+                          uuids.vol2: uuids.vol2_attach_orig},
+                         migrate_data.old_vol_attachment_ids)
+        self.assertEqual(3, mock_bdm_save.call_count)
+        mock_vol_api.attachment_complete.assert_has_calls(
+            [mock.call(self.context, uuids.vol0_attach_new),
+             mock.call(self.context, uuids.vol1_attach_new),
+             mock.call(self.context, uuids.vol2_attach_new)], any_order=True)
+
+    @mock.patch.object(manager, 'compute_utils', autospec=True)
+    @mock.patch.object(objects.BlockDeviceMapping, 'save')
+    @mock.patch.object(objects.BlockDeviceMappingList, 'get_by_instance_uuid')
+    def test_pre_live_migration_volume_attach_concurrency_fails(
+            self, mock_bdms_get, mock_bdm_save, mock_compute_utils):
+        self.flags(live_migration_volume_attach_concurrency=3,
+                   group='compute')
+        compute = manager.ComputeManager()
+        instance = fake_instance.fake_instance_obj(self.context,
+                                                   uuid=uuids.instance)
+        bdms = self._get_pre_live_migration_volume_bdms(instance, 3)
+        mock_bdms_get.return_value = bdms
+        migrate_data = migrate_data_obj.LiveMigrateData()
+        new_attachment_ids = {uuids.vol0: uuids.vol0_attach_new,
+                              uuids.vol1: uuids.vol1_attach_new,
+                              uuids.vol2: uuids.vol2_attach_new}
+
+        def fake_attachment_create(context, volume_id, instance_uuid,
+                                   connector=None, mountpoint=None):
+            if volume_id == uuids.vol0:
+                # Fail once the other attachments have been created.
+                greenthread.sleep(0)
+                raise test.TestingException()
+            return {'id': new_attachment_ids[volume_id]}
+
+        with test.nested(
+            mock.patch.object(compute, 'network_api', autospec=True),
+            mock.patch.object(compute, 'volume_api', autospec=True),
+            mock.patch.object(compute.driver, 'pre_live_migration'),
+        ) as (mock_net_api, mock_vol_api, mock_plm):
+            mock_vol_api.attachment_create.side_effect = (
+                fake_attachment_create)
+            self.assertRaises(test.TestingException,
+                              compute.pre_live_migration,
+                              self.context, instance, False, {},
+                              migrate_data)
+
+        # The attachments created in parallel with the failed one are
+        # deleted and the original attachments are restored.
+        self.assertEqual(3, mock_vol_api.attachment_create.call_count)
+        mock_vol_api.attachment_delete.assert_has_calls(
+            [mock.call(self.context, uuids.vol1_attach_new),
+             mock.call(self.context, uuids.vol2_attach_new)], any_order=True)
+        self.assertEqual(2, mock_vol_api.attachment_delete.call_count)
+        self.assertEqual([uuids.vol0_attach_orig, uuids.vol1_attach_orig,
+                          uuids.vol2_attach_orig],
+                         [bdm.attachment_id for bdm in bdms])
+        mock_plm.assert_not_called()
+        mock_vol_api.attachment_complete.assert_not_called()
+
     def test_get_neutron_events_for_live_migration_empty(self):
         """Tests the various ways that _get_neutron_events_for_live_migration
         will return an empty list.
@@ -9757,6 +9971,29 @@ class ComputeManagerMigrationTestCase(test.NoDBTestCase,
         self.assertEqual('cancelled', migration.status)
         fake_future.cancel.assert_called_once_with()
 
+    @mock.patch.object(manager.ComputeManager, '_notify_about_instance_usage')
+    @mock.patch('nova.compute.utils.notify_about_instance_action')
+    def test_live_migration_abort_waiting_for_memory_budget(
+            self, mock_notify_action, mock_notify):
+        instance = objects.Instance(id=123, uuid=uuids.instance)
+        migration = self._get_migration(10, 'queued', 'live-migration')
+        migration.save = mock.MagicMock()
+        # The migration is running in the executor, waiting for the memory
+        # budget, so the future cannot be cancelled.
+        fake_future = mock.MagicMock()
+        fake_future.cancel.return_value = False
+        self.compute._waiting_live_migrations[instance.uuid] = (
+            migration, fake_future)
+        with mock.patch.object(self.compute._live_migration_memory_budget,
+                               'cancel', return_value=True) as mock_cancel:
+            self.compute.live_migration_abort(self.context, instance,
+                                              migration.id)
+        mock_cancel.assert_called_once_with(instance.uuid)
+        self.assertEqual('cancelled', migration.status)
+        self.assertEqual({}, self.compute._waiting_live_migrations)
+        mock_notify.assert_called_with(
+            self.context, instance, 'live.migration.abort.end')
+
     @mock.patch.object(compute_utils, 'add_instance_fault_from_exc')
     @mock.patch.object(manager.ComputeManager, '_notify_about_instance_usage')
     @mock.patch.object(objects.Migration, 'get_by_id')
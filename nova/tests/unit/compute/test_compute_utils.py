@@ -21,6 +21,7 @@ import datetime
 import string
 import traceback
 
+import eventlet
 import mock
 from oslo_serialization import jsonutils
 from oslo_utils.fixture import uuidsentinel as uuids
@@ -1645,3 +1646,116 @@ class PciRequestUpdateTestCase(test.NoDBTestCase):
         self.assertEqual(
             'enp0s31f6',
             instance.pci_requests.requests[0].spec[0]['parent_ifname'])
+
+
+class MemoryBudgetTestCase(test.NoDBTestCase):
+
+    def _reserve(self, budget, name, memory_mb, started, release=None,
+                 key=None):
+        with budget.reserve(memory_mb, key=key):
+            started.append(name)
+            if release is not None:
+                release.wait()
+
+    def test_reserve_unlimited(self):
+        budget = compute_utils.MemoryBudget(0)
+        with budget.reserve(1024):
+            with budget.reserve(4096):
+                self.assertEqual(0, budget.used_mb)
+
+    def test_reserve(self):
+        budget = compute_utils.MemoryBudget(4096)
+        with budget.reserve(1024):
+            with budget.reserve(2048):
+                self.assertEqual(3072, budget.used_mb)
+        self.assertEqual(0, budget.used_mb)
+
+    def test_reserve_smallest_first(self):
+        budget = compute_utils.MemoryBudget(4096)
+        started = []
+        release = eventlet.event.Event()
+        first = eventlet.spawn(self._reserve, budget, 'first', 3072,
+                               started, release)
+        eventlet.sleep(0)
+        waiters = [
+            eventlet.spawn(self._reserve, budget, name, memory_mb, started,
+                           release)
+            for name, memory_mb in (('large', 2048), ('small', 512),
+                                    ('medium', 1024))]
+        eventlet.sleep(0)
+        # Only the small instance fits next to the first one.
+        self.assertEqual(['first', 'small'], started)
+
+        release.send()
+        first.wait()
+        for waiter in waiters:
+            waiter.wait()
+        self.assertEqual(['first', 'small', 'medium', 'large'], started)
+        self.assertEqual(0, budget.used_mb)
+
+    def test_reserve_more_than_budget(self):
+        budget = compute_utils.MemoryBudget(4096)
+        started = []
+        release = eventlet.event.Event()
+        first = eventlet.spawn(self._reserve, budget, 'first', 1024,
+                               started, release)
+        eventlet.sleep(0)
+        huge = eventlet.spawn(self._reserve, budget, 'huge', 8192, started)
+        eventlet.sleep(0)
+        self.assertEqual(['first'], started)
+
+        release.send()
+        first.wait()
+        huge.wait()
+        self.assertEqual(['first', 'huge'], started)
+        self.assertEqual(0, budget.used_mb)
+
+    def test_reserve_killed_while_waiting(self):
+        budget = compute_utils.MemoryBudget(4096)
+        started = []
+        release = eventlet.event.Event()
+        first = eventlet.spawn(self._reserve, budget, 'first', 4096,
+                               started, release)
+        eventlet.sleep(0)
+        killed = eventlet.spawn(self._reserve, budget, 'killed', 1024,
+                                started)
+        eventlet.sleep(0)
+        killed.kill()
+
+        release.send()
+        first.wait()
+        self.assertEqual(['first'], started)
+        self.assertEqual(0, budget.used_mb)
+        self.assertEqual([], budget._waiters)
+
+    def test_cancel(self):
+        budget = compute_utils.MemoryBudget(4096)
+        started = []
+        release = eventlet.event.Event()
+        first = eventlet.spawn(self._reserve, budget, 'first', 4096,
+                               started, release)
+        eventlet.sleep(0)
+        cancelled = eventlet.spawn(self._reserve, budget, 'cancelled', 1024,
+                                   started, key=uuids.cancelled)
+        other = eventlet.spawn(self._reserve, budget, 'other', 1024,
+                               started, key=uuids.other)
+        eventlet.sleep(0)
+
+        self.assertTrue(budget.cancel(uuids.cancelled))
+        self.assertRaises(exception.MemoryBudgetReservationCancelled,
+                          cancelled.wait)
+        # Only waiting reservations are cancelled.
+        self.assertFalse(budget.cancel(uuids.cancelled))
+        self.assertFalse(budget.cancel(uuids.first))
+
+        release.send()
+        first.wait()
+        other.wait()
+        self.assertEqual(['first', 'other'], started)
+        self.assertEqual(0, budget.used_mb)
+        self.assertEqual([], budget._waiters)
+
+    def test_cancel_unlimited(self):
+        budget = compute_utils.MemoryBudget(0)
+        with budget.reserve(1024, key=uuids.instance):
+            self.assertFalse(budget.cancel(uuids.instance))
@@ -320,6 +320,22 @@ class LiveMigrationTaskTestCase(test.NoDBTestCase):
             self.destination, self.block_migration, self.disk_over_commit,
             self.task.migration, fake_limits1)
 
+    @mock.patch.object(objects.ComputeNode,
+                       'get_first_node_by_host_for_old_compat')
+    def test_get_compute_info(self, mock_get_first):
+        mock_get_first.side_effect = [mock.sentinel.source_node,
+                                      mock.sentinel.dest_node]
+
+        self.assertEqual(mock.sentinel.source_node,
+                         self.task._get_compute_info(self.instance_host))
+        self.assertEqual(mock.sentinel.dest_node,
+                         self.task._get_compute_info(self.destination))
+        self.assertEqual(mock.sentinel.source_node,
+                         self.task._get_compute_info(self.instance_host))
+        self.assertEqual([mock.call(self.context, self.instance_host),
+                          mock.call(self.context, self.destination)],
+                         mock_get_first.call_args_list)
+
     def test_check_requested_destination_fails_with_same_dest(self):
         self.task.destination = "same"
         self.task.source = "same"
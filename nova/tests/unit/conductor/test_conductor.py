@@ -17,6 +17,7 @@
 
 import copy
 
+import eventlet
 import mock
 from oslo_db import exception as db_exc
 import oslo_messaging as messaging
@@ -291,6 +292,97 @@ class ConductorTestCase(_BaseTestCase, test.TestCase):
                 self.context, TestObject.obj_name(), 'foo', versions,
                 tuple(), {})
 
+    def _register_coalesce_test_object(self, calls):
+        @obj_base.NovaObjectRegistry.register
+        class TestObject(obj_base.NovaObject):
+            @classmethod
+            def foo(cls, context, arg, raise_exception=False):
+                calls.append(arg)
+                # Yield so that identical calls can be coalesced.
+                eventlet.sleep(0)
+                if raise_exception:
+                    raise Exception('test')
+                return '%s-%d' % (arg, len(calls))
+
+        return TestObject
+
+    def _spawn_class_actions(self, arglists, kwargs=None):
+        versions = {'TestObject': '1.0'}
+        threads = [
+            eventlet.spawn(self.conductor.object_class_action_versions,
+                           self.context, 'TestObject', 'foo', versions,
+                           args, kwargs or {})
+            for args in arglists]
+        return threads
+
+    def test_object_class_action_coalesced(self):
+        self.flags(coalesced_object_class_actions=['TestObject.foo'],
+                   object_action_stats_interval=60, group='conductor')
+        calls = []
+        self._register_coalesce_test_object(calls)
+        threads = self._spawn_class_actions([['a'], ['a'], ['b']])
+        results = [thread.wait() for thread in threads]
+        self.assertEqual(['a-2', 'a-2', 'b-2'], results)
+        self.assertEqual(['a', 'b'], calls)
+        self.assertEqual(3, self.conductor._object_action_stats[
+            'TestObject.foo'][0])
+        self.assertEqual(1, self.conductor._object_action_stats[
+            'TestObject.foo'][1])
+        self.assertEqual({}, self.conductor._object_class_actions_in_progress)
+
+    def test_object_class_action_coalesced_raises(self):
+        self.flags(coalesced_object_class_actions=['TestObject.foo'],
+                   group='conductor')
+        calls = []
+        self._register_coalesce_test_object(calls)
+        threads = self._spawn_class_actions(
+            [['a'], ['a']], {'raise_exception': True})
+        for thread in threads:
+            self.assertRaises(messaging.ExpectedException, thread.wait)
+        self.assertEqual(['a'], calls)
+
+    def test_object_class_action_not_coalesced(self):
+        # Actions are only coalesced when they are configured to be.
+        calls = []
+        self._register_coalesce_test_object(calls)
+        threads = self._spawn_class_actions([['a'], ['a']])
+        results = [thread.wait() for thread in threads]
+        self.assertEqual(['a-2', 'a-2'], sorted(results))
+        self.assertEqual(['a', 'a'], calls)
+
+    def test_get_coalesce_key_unserializable_args(self):
+        self.flags(coalesced_object_class_actions=['TestObject.foo'],
+                   group='conductor')
+        self.assertIsNone(self.conductor._get_coalesce_key(
+            self.context, 'TestObject', 'foo', {'TestObject': '1.0'},
+            [object()], {}))
+        self.assertIsNotNone(self.conductor._get_coalesce_key(
+            self.context, 'TestObject', 'foo', {'TestObject': '1.0'},
+            ['a'], {}))
+
+    def test_object_action_stats_disabled(self):
+        self._test_object_action(False, False)
+        self.assertEqual({}, self.conductor._object_action_stats)
+
+    @mock.patch.object(conductor_manager.LOG, 'info')
+    def test_log_object_action_stats(self, mock_log):
+        self.flags(object_action_stats_interval=60, group='conductor')
+        self._test_object_action(False, False)
+        self._test_object_action(True, False)
+        self._test_object_action(True, False)
+        self.assertEqual(
+            {'TestObject.foo': 1, 'TestObject.bar': 2},
+            {action: stats[0] for action, stats in
+             self.conductor._object_action_stats.items()})
+        self.conductor._log_object_action_stats(self.context)
+        self.assertEqual(2, mock_log.call_count)
+        self.assertEqual({}, self.conductor._object_action_stats)
+
+    @mock.patch('nova.servicegroup.heartbeat.HEARTBEATS')
+    def test_service_heartbeat(self, mock_heartbeats):
+        self.conductor.service_heartbeat(self.context, 1)
+        mock_heartbeats.record.assert_called_once_with(1)
+
     def test_reset(self):
         with mock.patch.object(objects.Service, 'clear_min_version_cache'
                                ) as mock_clear_cache:
@@ -1951,6 +2043,13 @@ class ConductorTaskTestCase(_BaseTaskTestCase, test_compute.BaseTestCase):
                 else:
                     self.assertEqual(0, len(actions))
 
+    @mock.patch('nova.quota.update_instance_usage_counters')
+    def test_schedule_and_build_instances_usage_counters(self, mock_update):
+        instance_uuid = self._do_schedule_and_build_instances_test(
+            self.params)
+        mock_update.assert_called_once_with(mock.ANY, mock.ANY, count=1)
+        self.assertEqual(instance_uuid, mock_update.call_args[0][1].uuid)
+
     def test_schedule_and_build_instances_no_tags_provided(self):
         params = copy.deepcopy(self.params)
         del params['tags']
@@ -2083,6 +2182,72 @@ class ConductorTaskTestCase(_BaseTaskTestCase, test_compute.BaseTestCase):
         self.assertEqual(2, build_and_run_instance.call_count)
         self.assertEqual(2, len(instance_cells))
 
+    @mock.patch('nova.compute.rpcapi.ComputeAPI.build_and_run_instance')
+    @mock.patch('nova.scheduler.rpcapi.SchedulerAPI.select_destinations')
+    @mock.patch('nova.objects.HostMapping.get_by_host')
+    @mock.patch('nova.objects.BuildRequest.get_by_instance_uuid')
+    @mock.patch('nova.objects.InstanceMapping.save')
+    def test_schedule_and_build_multiple_cells_batch_db_updates(
+            self, im_save, br_get_by_inst, get_hostmapping,
+            select_destinations, build_and_run_instance):
+        """Test that creates three instances in separate cells with the
+        build request checks and instance mapping updates batched.
+        """
+        self.flags(batch_multi_create_db_updates=True, group='conductor')
+        select_destinations.return_value = [[fake_selection1],
+                [fake_selection2], [fake_selection1]]
+
+        params = self.params
+
+        # The cells are created in the base TestCase setup.
+        self.start_service('compute', host='host1', cell='cell1')
+        self.start_service('compute', host='host2', cell='cell2')
+
+        get_hostmapping.side_effect = self.host_mappings.values()
+
+        # create two additional build requests and request specs
+        for x in range(2):
+            build_request = fake_build_request.fake_req_obj(self.ctxt)
+            del build_request.instance.id
+            build_request.create()
+            params['build_requests'].objects.append(build_request)
+            im2 = objects.InstanceMapping(
+                self.ctxt, instance_uuid=build_request.instance.uuid,
+                cell_mapping=None, project_id=self.ctxt.project_id)
+            im2.create()
+            params['request_specs'].append(objects.RequestSpec(
+                instance_uuid=build_request.instance_uuid,
+                instance_group=None))
+
+        # Delete the second build request so that the bulk check skips it.
+        deleted_build_request = params['build_requests'][1]
+        deleted_build_request.destroy()
+
+        instance_cells = {}
+
+        def _build_and_run_instance(ctxt, *args, **kwargs):
+            instance = kwargs['instance']
+            self.assertNotEqual(deleted_build_request.instance_uuid,
+                                instance.uuid)
+            inst_mapping = objects.InstanceMapping.get_by_instance_uuid(
+                ctxt, instance.uuid)
+            instance_cells[instance.uuid] = inst_mapping.cell_mapping.name
+
+        build_and_run_instance.side_effect = _build_and_run_instance
+        self.conductor.schedule_and_build_instances(**params)
+        self.assertEqual(2, build_and_run_instance.call_count)
+        self.assertEqual(
+            {params['build_requests'][0].instance_uuid: 'cell1',
+             params['build_requests'][2].instance_uuid: 'cell1'},
+            instance_cells)
+        # The build requests and instance mappings were handled in bulk.
+        br_get_by_inst.assert_not_called()
+        im_save.assert_not_called()
+        # The instance mapping for the deleted build request was removed.
+        self.assertRaises(exc.InstanceMappingNotFound,
+                          objects.InstanceMapping.get_by_instance_uuid,
+                          self.ctxt, deleted_build_request.instance_uuid)
+
     @mock.patch('nova.compute.utils.notify_about_compute_task_error')
     @mock.patch('nova.scheduler.rpcapi.SchedulerAPI.select_destinations')
     def test_schedule_and_build_scheduler_failure(self, select_destinations,
@@ -2420,6 +2585,24 @@ class ConductorTaskTestCase(_BaseTaskTestCase, test_compute.BaseTestCase):
         self.assertIn('During scheduling instance is already mapped to '
                       'another cell', self.stdlog.logger.output)
 
+    def test_map_instances_to_cells_already_mapped(self):
+        """Tests a scenario where an instance is already mapped to a cell
+        during scheduling with the bulk instance mapping update.
+        """
+        build_request = self.params['build_requests'][0]
+        instance = build_request.get_new_instance(self.ctxt)
+        inst_mapping = objects.InstanceMapping.get_by_instance_uuid(
+            self.ctxt, instance.uuid)
+        inst_mapping.cell_mapping = self.cell_mappings['cell0']
+        inst_mapping.save()
+        cell1 = self.cell_mappings['cell1']
+        self.conductor._map_instances_to_cells(self.ctxt, [(instance, cell1)])
+        inst_mapping = objects.InstanceMapping.get_by_instance_uuid(
+            self.ctxt, instance.uuid)
+        self.assertEqual(cell1.uuid, inst_mapping.cell_mapping.uuid)
+        self.assertIn('During scheduling instance is already mapped to '
+                      'another cell', self.stdlog.logger.output)
+
     @mock.patch('nova.objects.InstanceMapping.get_by_instance_uuid')
     def test_cleanup_build_artifacts(self, inst_map_get):
         """Simple test to ensure the order of operations in the cleanup method
@@ -4023,3 +4206,24 @@ class ConductorTaskAPITestCase(_BaseTaskTestCase, test_compute.BaseTestCase):
             logtext)
         self.assertIn('host3\' because it is not up', logtext)
         self.assertIn('image1 failed 1 times', logtext)
+
+    def test_get_precache_concurrency(self):
+        self.flags(precache_concurrency=3, group='image_cache')
+        agg = objects.Aggregate(uuid=uuids.agg)
+        self.assertEqual(
+            3, self.conductor_manager._get_precache_concurrency(agg))
+
+        agg.metadata = {}
+        self.assertEqual(
+            3, self.conductor_manager._get_precache_concurrency(agg))
+
+        agg.metadata = {'precache_concurrency': '10'}
+        self.assertEqual(
+            10, self.conductor_manager._get_precache_concurrency(agg))
+
+        for value in ('0', 'many'):
+            agg.metadata = {'precache_concurrency': value}
+            self.assertEqual(
+                3, self.conductor_manager._get_precache_concurrency(agg))
+        self.assertIn('Ignoring invalid precache_concurrency metadata',
+                      self.stdlog.logger.output)
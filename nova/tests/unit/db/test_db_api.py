@@ -654,6 +654,15 @@ class SqlAlchemyDbApiNoDbTestCase(test.NoDBTestCase):
         self.assertEqual(['test'], columns_to_join2)
         self.assertEqual(['system_metadata', 'test'], columns_to_join)
 
+    def test_manual_join_columns_extra_and_tags(self):
+        columns_to_join = ['info_cache', 'tags', 'extra', 'extra.flavor',
+                           'extra.pci_requests']
+        manual_joins, columns_to_join2 = (
+            sqlalchemy_api._manual_join_columns(columns_to_join))
+        self.assertEqual(['tags', 'extra.flavor', 'extra.pci_requests'],
+                         manual_joins)
+        self.assertEqual(['info_cache'], columns_to_join2)
+
     def test_convert_objects_related_datetimes(self):
 
         t1 = timeutils.utcnow()
@@ -1753,28 +1762,74 @@ class InstanceTestCase(test.TestCase, ModelsObjectComparatorMixin):
         instances = db.instance_get_all_by_filters_sort(self.ctxt, filters)
         self.assertEqual([], instances)
 
+    @mock.patch('nova.db.sqlalchemy.api._instances_fill_metadata')
     @mock.patch('nova.db.sqlalchemy.api.undefer')
     @mock.patch('nova.db.sqlalchemy.api.joinedload')
     def test_instance_get_all_by_filters_extra_columns(self,
                                                        mock_joinedload,
-                                                       mock_undefer):
+                                                       mock_undefer,
+                                                       mock_fill):
         db.instance_get_all_by_filters_sort(
             self.ctxt, {},
-            columns_to_join=['info_cache', 'extra.pci_requests'])
+            columns_to_join=['info_cache', 'extra', 'extra.pci_requests'])
         mock_joinedload.assert_called_once_with('info_cache')
-        mock_undefer.assert_called_once_with('extra.pci_requests')
+        mock_undefer.assert_not_called()
+        self.assertEqual(['extra.pci_requests'], mock_fill.call_args[0][2])
 
+    @mock.patch('nova.db.sqlalchemy.api._instances_fill_metadata')
     @mock.patch('nova.db.sqlalchemy.api.undefer')
     @mock.patch('nova.db.sqlalchemy.api.joinedload')
     def test_instance_get_active_by_window_extra_columns(self,
                                                          mock_joinedload,
-                                                         mock_undefer):
+                                                         mock_undefer,
+                                                         mock_fill):
         now = datetime.datetime(2013, 10, 10, 17, 16, 37, 156701)
         db.instance_get_active_by_window_joined(
             self.ctxt, now,
-            columns_to_join=['info_cache', 'extra.pci_requests'])
+            columns_to_join=['info_cache', 'extra', 'extra.pci_requests'])
         mock_joinedload.assert_called_once_with('info_cache')
-        mock_undefer.assert_called_once_with('extra.pci_requests')
+        mock_undefer.assert_not_called()
+        self.assertEqual(['extra.pci_requests'], mock_fill.call_args[0][2])
+
+    def test_instance_get_all_by_filters_manual_join_extra_and_tags(self):
+        inst1 = self.create_instance_with_args()
+        inst2 = self.create_instance_with_args()
+        db.instance_extra_update_by_uuid(self.ctxt, inst1['uuid'],
+                                         {'numa_topology': 'numa1',
+                                          'flavor': 'flavor1'})
+        db.instance_tag_set(self.ctxt, inst1['uuid'], ['t1', 't2'])
+
+        result = db.instance_get_all_by_filters_sort(
+            self.ctxt, {}, sort_keys=['id'], sort_dirs=['asc'],
+            columns_to_join=['tags', 'extra', 'extra.numa_topology',
+                             'extra.flavor'])
+
+        self.assertEqual([inst1['uuid'], inst2['uuid']],
+                         [inst['uuid'] for inst in result])
+        self.assertEqual({'numa_topology': 'numa1', 'flavor': 'flavor1'},
+                         result[0]['extra'])
+        self.assertEqual({'numa_topology': None, 'flavor': None},
+                         result[1]['extra'])
+        self.assertEqual(['t1', 't2'],
+                         sorted(tag['tag'] for tag in result[0]['tags']))
+        self.assertEqual([], result[1]['tags'])
+
+    @mock.patch.object(sqlalchemy_api, '_MANUAL_JOIN_CHUNK_SIZE', new=2)
+    @mock.patch.object(sqlalchemy_api, '_instance_metadata_get_multi',
+                       wraps=sqlalchemy_api._instance_metadata_get_multi)
+    def test_instance_get_all_by_filters_manual_join_chunked(self,
+                                                             mock_get_meta):
+        for i in range(5):
+            self.create_instance_with_args()
+
+        result = db.instance_get_all_by_filters_sort(
+            self.ctxt, {}, columns_to_join=['metadata'])
+
+        self.assertEqual(5, len(result))
+        self.assertEqual(3, mock_get_meta.call_count)
+        for inst in result:
+            meta = utils.metadata_to_dict(inst['metadata'])
+            self.assertEqual(meta, self.sample_data['metadata'])
 
     def test_instance_get_all_by_filters_with_meta(self):
         self.create_instance_with_args()
@@ -2993,6 +3048,31 @@ class ServiceTestCase(test.TestCase, ModelsObjectComparatorMixin):
         self.assertRaises(exception.ServiceNotFound,
                           db.service_update, self.ctxt, 100500, {})
 
+    def test_service_update_heartbeats(self):
+        service1 = self._create_service({})
+        service2 = self._create_service({'host': 'fake_host2'})
+        service3 = self._create_service({'host': 'fake_host3'})
+        seen1 = datetime.datetime(2020, 1, 1, 0, 0, 10)
+        seen2 = datetime.datetime(2020, 1, 1, 0, 0, 20)
+        updated = db.service_update_heartbeats(
+            self.ctxt, {service1['id']: (1, seen1),
+                        service2['id']: (2, seen2),
+                        100500: (1, seen1)})
+        self.assertEqual(2, updated)
+        service1 = db.service_get(self.ctxt, service1['id'])
+        self.assertEqual(4, service1['report_count'])
+        self.assertEqual(seen1, service1['last_seen_up'])
+        service2 = db.service_get(self.ctxt, service2['id'])
+        self.assertEqual(5, service2['report_count'])
+        self.assertEqual(seen2, service2['last_seen_up'])
+        # The services without heartbeats are not updated.
+        service3 = db.service_get(self.ctxt, service3['id'])
+        self.assertEqual(3, service3['report_count'])
+        self.assertIsNone(service3['last_seen_up'])
+
+    def test_service_update_heartbeats_empty(self):
+        self.assertEqual(0, db.service_update_heartbeats(self.ctxt, {}))
+
     def test_service_update_with_set_forced_down(self):
         service = self._create_service({})
         db.service_update(self.ctxt, service['id'], {'forced_down': True})
@@ -202,7 +202,7 @@ class _FakeImageService(object):
         return copy.deepcopy(list(self.images.values()))
 
     def download(self, context, image_id, data=None, dst_path=None,
-                 trusted_certs=None):
+                 trusted_certs=None, sync=True):
         self.show(context, image_id)
         if data:
             data.write(self._imagedata.get(image_id, b''))
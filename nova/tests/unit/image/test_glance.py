@@ -623,6 +623,27 @@ class TestDownloadNoDirectUri(test.NoDBTestCase):
         )
         writer.close.assert_called_once_with()
 
+    @mock.patch.object(six.moves.builtins, 'open')
+    @mock.patch('nova.image.glance.GlanceImageServiceV2.show')
+    @mock.patch('nova.image.glance.GlanceImageServiceV2._safe_fsync')
+    def test_download_no_data_dest_path_no_sync_v2(self, fsync_mock,
+                                                   show_mock, open_mock):
+        client = mock.MagicMock()
+        client.call.return_value = fake_glance_response([1, 2, 3])
+        writer = mock.MagicMock()
+        open_mock.return_value = writer
+        service = glance.GlanceImageServiceV2(client)
+        res = service.download(mock.sentinel.ctx, mock.sentinel.image_id,
+                               dst_path=mock.sentinel.dst_path, sync=False)
+
+        self.assertIsNone(res)
+        open_mock.assert_called_once_with(mock.sentinel.dst_path, 'wb')
+        writer.write.assert_has_calls(
+            [mock.call(1), mock.call(2), mock.call(3)])
+        writer.flush.assert_called_once_with()
+        fsync_mock.assert_not_called()
+        writer.close.assert_called_once_with()
+
     @mock.patch.object(six.moves.builtins, 'open')
     @mock.patch('nova.image.glance.GlanceImageServiceV2.show')
     def test_download_data_dest_path_v2(self, show_mock, open_mock):
@@ -822,6 +843,81 @@ class TestDownloadNoDirectUri(test.NoDBTestCase):
         )
         writer.close.assert_called_once_with()
 
+    @mock.patch('nova.image.glance.GlanceImageServiceV2._get_transfer_module')
+    @mock.patch('nova.image.glance.GlanceImageServiceV2.show')
+    def test_download_peer_v2(self, show_mock, get_tran_mock):
+        self.flags(peer_transfer=True, group='image_cache')
+        tran_mod = mock.MagicMock()
+        get_tran_mock.return_value = tran_mod
+        client = mock.MagicMock()
+        ctx = mock.sentinel.ctx
+        service = glance.GlanceImageServiceV2(client)
+        res = service.download(ctx, uuids.image_id,
+                               dst_path=mock.sentinel.dst_path, sync=False)
+
+        self.assertIsNone(res)
+        self.assertFalse(client.call.called)
+        show_mock.assert_called_once_with(ctx, uuids.image_id)
+        get_tran_mock.assert_called_once_with('peer')
+        tran_mod.download.assert_called_once_with(
+            ctx, mock.ANY, mock.sentinel.dst_path, show_mock.return_value,
+            sync=False)
+        self.assertEqual(uuids.image_id,
+                         tran_mod.download.call_args[0][1].netloc)
+
+    @mock.patch('nova.image.glance.GlanceImageServiceV2._get_transfer_module')
+    @mock.patch('nova.image.glance.GlanceImageServiceV2.show')
+    @mock.patch('nova.image.glance.GlanceImageServiceV2._safe_fsync')
+    def test_download_peer_fallback_v2(self, fsync_mock, show_mock,
+                                       get_tran_mock):
+        self.flags(peer_transfer=True, group='image_cache')
+        tran_mod = mock.MagicMock()
+        tran_mod.download.side_effect = exception.ImageDownloadModuleError(
+            module='peer', reason='not found')
+        get_tran_mock.return_value = tran_mod
+        client = mock.MagicMock()
+        client.call.return_value = fake_glance_response([1, 2, 3])
+        ctx = mock.sentinel.ctx
+        writer = mock.MagicMock()
+
+        with mock.patch.object(six.moves.builtins, 'open') as open_mock:
+            open_mock.return_value = writer
+            service = glance.GlanceImageServiceV2(client)
+            res = service.download(ctx, uuids.image_id,
+                                   dst_path=mock.sentinel.dst_path)
+
+        self.assertIsNone(res)
+        tran_mod.download.assert_called_once_with(
+            ctx, mock.ANY, mock.sentinel.dst_path, show_mock.return_value,
+            sync=True)
+        client.call.assert_called_once_with(
+            ctx, 2, 'data', args=(uuids.image_id,))
+        open_mock.assert_called_with(mock.sentinel.dst_path, 'wb')
+        writer.write.assert_has_calls(
+            [mock.call(1), mock.call(2), mock.call(3)])
+
+    @mock.patch('nova.image.glance.GlanceImageServiceV2._get_transfer_module')
+    @mock.patch('nova.image.glance.GlanceImageServiceV2.show')
+    @mock.patch('nova.image.glance.GlanceImageServiceV2._safe_fsync')
+    def test_download_peer_skipped_with_trusted_certs_v2(
+            self, fsync_mock, show_mock, get_tran_mock):
+        self.flags(peer_transfer=True, group='image_cache')
+        client = mock.MagicMock()
+        client.call.return_value = fake_glance_response([1, 2, 3])
+        service = glance.GlanceImageServiceV2(client)
+
+        with test.nested(
+            mock.patch.object(six.moves.builtins, 'open'),
+            mock.patch.object(service, '_get_verifier', return_value=None),
+        ):
+            service.download(mock.sentinel.ctx, uuids.image_id,
+                             dst_path=mock.sentinel.dst_path,
+                             trusted_certs=mock.sentinel.trusted_certs)
+
+        get_tran_mock.assert_not_called()
+        client.call.assert_called_once_with(
+            mock.sentinel.ctx, 2, 'data', args=(uuids.image_id,))
+
 
 class TestDownloadSignatureVerification(test.NoDBTestCase):
 
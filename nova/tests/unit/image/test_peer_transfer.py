@@ -0,0 +1,207 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+import os
+
+import fixtures
+import mock
+from oslo_utils.fixture import uuidsentinel as uuids
+import requests
+import six.moves.urllib.parse as urlparse
+
+from nova import context
+from nova import exception
+from nova.image.download import peer
+from nova import objects
+from nova import test
+
+DATA = b'image data'
+CHECKSUM = hashlib.md5(DATA).hexdigest()
+
+
+class PeerTransferTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(PeerTransferTestCase, self).setUp()
+        self.flags(host='host1')
+        self.flags(peer_transfer_token='secret', group='image_cache')
+        self.context = context.get_admin_context()
+        self.handler = peer.get_download_handler()
+        self.url_parts = urlparse.urlparse('peer://%s' % uuids.image_id)
+        self.metadata = {'size': len(DATA), 'checksum': CHECKSUM}
+        self.dst_file = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'image')
+
+    def _get_response(self, status_code=200, data=DATA, size=None):
+        resp = mock.Mock(status_code=status_code)
+        resp.headers = {'Content-Length': str(
+            len(data) if size is None else size)}
+        resp.iter_content.return_value = [data[:5], data[5:]]
+        return resp
+
+    @mock.patch.object(objects.ComputeNodeList, 'get_all_by_hosts')
+    @mock.patch.object(objects.AggregateList, 'get_by_host')
+    def test_get_peers(self, mock_get_aggs, mock_get_nodes):
+        mock_get_aggs.return_value = [
+            objects.Aggregate(hosts=['host1', 'host2', 'host3']),
+            objects.Aggregate(hosts=['host1', 'host3', 'host4'])]
+        # host4 has no compute node.
+        mock_get_nodes.return_value = [
+            objects.ComputeNode(host=host, host_ip='192.168.1.%s' % host[-1])
+            for host in ('host2', 'host3')]
+
+        peers = self.handler._get_peers(self.context)
+
+        self.assertEqual(['192.168.1.2', '192.168.1.3'],
+                         sorted(str(ip) for ip in peers))
+        mock_get_aggs.assert_called_once_with(self.context, 'host1')
+        # The addresses of the peers are looked up with a single call.
+        mock_get_nodes.assert_called_once_with(self.context, mock.ANY)
+        self.assertEqual(['host2', 'host3', 'host4'],
+                         sorted(mock_get_nodes.call_args[0][1]))
+
+    @mock.patch.object(objects.ComputeNodeList, 'get_all_by_hosts')
+    @mock.patch.object(objects.AggregateList, 'get_by_host')
+    def test_get_peers_max_peers(self, mock_get_aggs, mock_get_nodes):
+        self.flags(peer_transfer_max_peers=2, group='image_cache')
+        hosts = ['host%d' % i for i in range(1, 10)]
+        mock_get_aggs.return_value = [objects.Aggregate(hosts=hosts)]
+        mock_get_nodes.side_effect = lambda ctxt, hosts: [
+            objects.ComputeNode(host=host, host_ip='192.168.1.%s' % host[-1])
+            for host in hosts]
+
+        peers = self.handler._get_peers(self.context)
+
+        self.assertEqual(2, len(peers))
+        self.assertNotIn('192.168.1.1', [str(ip) for ip in peers])
+        self.assertEqual(2, len(mock_get_nodes.call_args[0][1]))
+
+    @mock.patch.object(objects.ComputeNodeList, 'get_all_by_hosts')
+    @mock.patch.object(objects.AggregateList, 'get_by_host')
+    def test_get_peers_no_peers(self, mock_get_aggs, mock_get_nodes):
+        mock_get_aggs.return_value = [objects.Aggregate(hosts=['host1'])]
+
+        self.assertEqual([], self.handler._get_peers(self.context))
+        mock_get_nodes.assert_not_called()
+
+    def test_get_url(self):
+        self.flags(peer_transfer_port=1234, group='image_cache')
+        self.assertEqual('http://[fe80::1]:1234/images/%s' % uuids.image_id,
+                         self.handler._get_url('fe80::1', uuids.image_id))
+
+    @mock.patch('requests.get')
+    @mock.patch('requests.head')
+    @mock.patch.object(peer.PeerTransfer, '_get_peers',
+                       return_value=['192.168.1.2', '192.168.1.3'])
+    def test_download(self, mock_get_peers, mock_head, mock_get):
+        mock_head.side_effect = [
+            requests.ConnectionError(), self._get_response()]
+        mock_get.return_value = self._get_response()
+
+        self.handler.download(self.context, self.url_parts, self.dst_file,
+                              self.metadata, sync=False)
+
+        self.assertEqual(2, mock_head.call_count)
+        mock_get.assert_called_once_with(
+            'http://192.168.1.3:8797/images/%s' % uuids.image_id,
+            headers={'X-Image-Cache-Token': 'secret'}, stream=True,
+            timeout=10)
+        with open(self.dst_file, 'rb') as f:
+            self.assertEqual(DATA, f.read())
+
+    @mock.patch('requests.get')
+    @mock.patch('requests.head')
+    @mock.patch.object(peer.PeerTransfer, '_get_peers',
+                       return_value=['192.168.1.2', '192.168.1.3'])
+    def test_download_size_mismatch(self, mock_get_peers, mock_head,
+                                    mock_get):
+        # The first peer has the image converted to raw.
+        mock_head.side_effect = [
+            self._get_response(size=1024), self._get_response()]
+        mock_get.return_value = self._get_response()
+
+        self.handler.download(self.context, self.url_parts, self.dst_file,
+                              self.metadata)
+
+        mock_get.assert_called_once_with(
+            'http://192.168.1.3:8797/images/%s' % uuids.image_id,
+            headers={'X-Image-Cache-Token': 'secret'}, stream=True,
+            timeout=10)
+
+    @mock.patch('requests.get')
+    @mock.patch('requests.head')
+    @mock.patch.object(peer.PeerTransfer, '_get_peers',
+                       return_value=['192.168.1.2', '192.168.1.3'])
+    def test_download_checksum_mismatch(self, mock_get_peers, mock_head,
+                                        mock_get):
+        mock_head.side_effect = [self._get_response(), self._get_response()]
+        mock_get.side_effect = [
+            self._get_response(data=b'imageXdata'), self._get_response()]
+
+        self.handler.download(self.context, self.url_parts, self.dst_file,
+                              self.metadata)
+
+        self.assertEqual(2, mock_get.call_count)
+        with open(self.dst_file, 'rb') as f:
+            self.assertEqual(DATA, f.read())
+
+    @mock.patch('requests.get')
+    @mock.patch('requests.head')
+    @mock.patch.object(peer.PeerTransfer, '_get_peers',
+                       return_value=['192.168.1.2'])
+    def test_download_not_found(self, mock_get_peers, mock_head, mock_get):
+        mock_head.return_value = self._get_response(status_code=404)
+
+        self.assertRaises(exception.ImageDownloadModuleError,
+                          self.handler.download, self.context,
+                          self.url_parts, self.dst_file, self.metadata)
+        mock_get.assert_not_called()
+
+    @mock.patch('requests.get')
+    @mock.patch('requests.head')
+    @mock.patch.object(peer.PeerTransfer, '_get_peers',
+                       return_value=['192.168.1.2', '192.168.1.3'])
+    def test_download_timeout_budget(self, mock_get_peers, mock_head,
+                                     mock_get):
+        # The first peer uses up the time allowed to look up the image.
+        mock_head.side_effect = requests.Timeout()
+
+        with mock.patch('oslo_utils.timeutils.StopWatch.expired',
+                        side_effect=[False, True]):
+            self.assertRaises(exception.ImageDownloadModuleError,
+                              self.handler.download, self.context,
+                              self.url_parts, self.dst_file, self.metadata)
+
+        mock_head.assert_called_once_with(
+            'http://192.168.1.2:8797/images/%s' % uuids.image_id,
+            headers={'X-Image-Cache-Token': 'secret'}, timeout=mock.ANY)
+        self.assertLessEqual(mock_head.call_args[1]['timeout'], 10)
+        mock_get.assert_not_called()
+
+    @mock.patch.object(peer.PeerTransfer, '_get_peers')
+    def test_download_no_token(self, mock_get_peers):
+        self.flags(peer_transfer_token=None, group='image_cache')
+
+        self.assertRaises(exception.ImageDownloadModuleError,
+                          self.handler.download, self.context,
+                          self.url_parts, self.dst_file, self.metadata)
+        mock_get_peers.assert_not_called()
+
+    @mock.patch.object(peer.PeerTransfer, '_get_peers')
+    def test_download_no_checksum(self, mock_get_peers):
+        self.metadata['checksum'] = None
+
+        self.assertRaises(exception.ImageDownloadModuleError,
+                          self.handler.download, self.context,
+                          self.url_parts, self.dst_file, self.metadata)
+        mock_get_peers.assert_not_called()
@@ -468,6 +468,19 @@ class _TestComputeNodeObject(object):
                          subs=self.subs(),
                          comparators=self.comparators())
 
+    @mock.patch.object(compute_node.ComputeNodeList,
+                       '_db_compute_node_get_all_by_hosts')
+    def test_get_all_by_hosts(self, mock_get_all_by_hosts):
+        mock_get_all_by_hosts.return_value = [fake_compute_node]
+        computes = compute_node.ComputeNodeList.get_all_by_hosts(
+            self.context, ['fake', 'other'])
+        self.assertEqual(1, len(computes))
+        self.compare_obj(computes[0], fake_compute_node,
+                         subs=self.subs(),
+                         comparators=self.comparators())
+        mock_get_all_by_hosts.assert_called_once_with(
+            self.context, ['fake', 'other'])
+
     def test_compat_numa_topology(self):
         compute = compute_node.ComputeNode(numa_topology='fake-numa-topology')
         versions = ovo_base.obj_tree_get_versions('ComputeNode')
@@ -1963,6 +1963,79 @@ class _TestInstanceListObject(object):
         self.assertEqual(fake_instances, actual_uuids)
         mock_get_all.assert_called_once_with(self.context, ['a', 'b'])
 
+    def _fake_deferrable_instance(self, id):
+        fake_flavor = jsonutils.dumps(
+            {'cur': objects.Flavor(name='cur').obj_to_primitive(),
+             'old': None,
+             'new': objects.Flavor(name='new').obj_to_primitive()})
+        return self.fake_instance(id, updates={
+            'extra': {'flavor': fake_flavor,
+                      'numa_topology': None,
+                      'pci_requests': None}})
+
+    @mock.patch.object(instance.Instance, '_flavor_from_db')
+    @mock.patch.object(instance_info_cache.InstanceInfoCache,
+                       '_from_db_object')
+    def test_make_instance_list_defer_attrs(self, mock_ic_from_db,
+                                            mock_flavor_from_db):
+        fakes = [self._fake_deferrable_instance(1),
+                 self._fake_deferrable_instance(2)]
+        inst_list = instance._make_instance_list(
+            self.context, objects.InstanceList(), fakes,
+            ['flavor', 'info_cache', 'numa_topology', 'pci_requests'],
+            defer_attrs=instance._INSTANCE_DEFERRABLE_FIELDS)
+
+        # Nothing is hydrated, but everything looks loaded and unchanged.
+        mock_ic_from_db.assert_not_called()
+        mock_flavor_from_db.assert_not_called()
+        for inst in inst_list:
+            for attr in ('flavor', 'old_flavor', 'new_flavor', 'info_cache',
+                         'numa_topology', 'pci_requests'):
+                self.assertIn(attr, inst)
+            self.assertEqual(set(), inst.obj_what_changed())
+
+    @mock.patch.object(db, 'instance_get_by_uuid')
+    def test_make_instance_list_defer_attrs_hydrate(self, mock_get):
+        fakes = [self._fake_deferrable_instance(1)]
+        inst_list = instance._make_instance_list(
+            self.context, objects.InstanceList(), fakes,
+            ['flavor', 'info_cache', 'numa_topology', 'pci_requests'],
+            defer_attrs=instance._INSTANCE_DEFERRABLE_FIELDS)
+        inst = inst_list[0]
+
+        self.assertEqual('new', inst.new_flavor.name)
+        self.assertEqual('cur', inst.flavor.name)
+        self.assertIsNone(inst.old_flavor)
+        self.assertIsNone(inst.numa_topology)
+        self.assertEqual(fakes[0]['info_cache']['network_info'],
+                         inst.info_cache.network_info.json())
+        self.assertEqual({}, inst._deferred_db_attrs)
+        self.assertEqual(set(), inst.obj_what_changed())
+        # Hydration never goes back to the database
+        mock_get.assert_not_called()
+
+    def test_make_instance_list_defer_attrs_keeps_assigned(self):
+        fakes = [self._fake_deferrable_instance(1)]
+        inst = instance._make_instance_list(
+            self.context, objects.InstanceList(), fakes, ['flavor'],
+            defer_attrs=['flavor'])[0]
+        inst.new_flavor = None
+
+        self.assertEqual('cur', inst.flavor.name)
+        self.assertIsNone(inst.new_flavor)
+        self.assertIn('new_flavor', inst.obj_what_changed())
+
+    def test_make_instance_list_defer_attrs_to_primitive(self):
+        fakes = [self._fake_deferrable_instance(1)]
+        inst = instance._make_instance_list(
+            self.context, objects.InstanceList(), fakes, ['flavor'],
+            defer_attrs=['flavor'])[0]
+
+        primitive = inst.obj_to_primitive()['nova_object.data']
+        self.assertEqual('cur',
+                         primitive['flavor']['nova_object.data']['name'])
+        self.assertIsNone(primitive['old_flavor'])
+
 
 class TestInstanceListObject(test_objects._LocalTest,
                              _TestInstanceListObject):
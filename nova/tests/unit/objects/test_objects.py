@@ -21,6 +21,7 @@ import pprint
 
 import fixtures
 import mock
+from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 from oslo_versionedobjects import base as ovo_base
 from oslo_versionedobjects import exception as ovo_exc
@@ -858,6 +859,148 @@ class TestObjectSerializer(_BaseTestCase):
         # .0 of the object.
         self.assertEqual('1.6', obj.VERSION)
 
+    def _get_compact_test_obj(self):
+        obj = MyObj(foo=1, bar='bar')
+        obj.rel_objects = [MyOwnedObject(baz=i) for i in range(3)]
+        obj.rel_objects[1].obj_reset_changes()
+        return obj
+
+    def test_compact_primitive_round_trip(self):
+        primitive = self._get_compact_test_obj().obj_to_primitive()
+        compact = base.obj_to_compact_primitive(primitive)
+        # The schema of the owned objects is only stored once.
+        schemas = compact[base.COMPACT_PRIMITIVE_KEY]['schemas']
+        self.assertEqual(['MyObj', 'MyOwnedObject'],
+                         sorted(schema[0] for schema in schemas))
+        # The compact primitive must survive the JSON encoding done by
+        # oslo.messaging.
+        compact = jsonutils.loads(jsonutils.dumps(compact))
+        expanded = base.obj_from_compact_primitive(compact)
+        self.assertEqual(jsonutils.loads(jsonutils.dumps(primitive)),
+                         expanded)
+        self.assertNotIn('nova_object.changes',
+                         expanded['nova_object.data']['rel_objects'][1])
+
+    def test_compact_primitive_smaller(self):
+        primitive = self._get_compact_test_obj().obj_to_primitive()
+        compact = base.obj_to_compact_primitive(primitive)
+        self.assertLess(len(jsonutils.dumps(compact)),
+                        len(jsonutils.dumps(primitive)))
+
+    @mock.patch('nova.objects.base._compact_serialization_supported',
+                return_value=True)
+    def test_serialize_entity_compact(self, mock_supported):
+        self.flags(rpc_compact_object_serialization=True)
+        ser = base.NovaObjectSerializer()
+        obj = self._get_compact_test_obj()
+        primitive = ser.serialize_entity(self.context, obj)
+        self.assertIn(base.COMPACT_PRIMITIVE_KEY, primitive)
+        obj2 = ser.deserialize_entity(self.context, primitive)
+        self.assertIsInstance(obj2, MyObj)
+        self.assertEqual('bar', obj2.bar)
+        self.assertEqual([0, 1, 2], [o.baz for o in obj2.rel_objects])
+        self.assertEqual(obj.obj_what_changed(), obj2.obj_what_changed())
+
+    def test_deserialize_entity_compact_when_disabled(self):
+        # Compact primitives are accepted even when not sending them.
+        self.flags(rpc_compact_object_serialization=False)
+        ser = base.NovaObjectSerializer()
+        obj = self._get_compact_test_obj()
+        self.assertNotIn(base.COMPACT_PRIMITIVE_KEY,
+                         ser.serialize_entity(self.context, obj))
+        compact = base.obj_to_compact_primitive(obj.obj_to_primitive())
+        obj2 = ser.deserialize_entity(self.context, [compact])[0]
+        self.assertIsInstance(obj2, MyObj)
+        self.assertEqual(1, obj2.foo)
+
+    @mock.patch('nova.objects.base._compact_serialization_supported',
+                return_value=False)
+    def test_serialize_entity_compact_old_services(self, mock_supported):
+        self.flags(rpc_compact_object_serialization=True)
+        ser = base.NovaObjectSerializer()
+        primitive = ser.serialize_entity(self.context,
+                                         self._get_compact_test_obj())
+        self.assertNotIn(base.COMPACT_PRIMITIVE_KEY, primitive)
+        mock_supported.assert_called_once_with()
+
+    @mock.patch('nova.objects.Service.get_minimum_version_multi')
+    def test_compact_serialization_supported(self, mock_get_min):
+        self.flags(connection=None, group='api_database')
+        self.addCleanup(base.reset_globals)
+        base.reset_globals()
+        # No services have reported a version yet, so this is not cached.
+        mock_get_min.return_value = 0
+        self.assertFalse(base._compact_serialization_supported())
+        mock_get_min.return_value = (
+            base.COMPACT_SERIALIZATION_MIN_SERVICE_VERSION)
+        self.assertTrue(base._compact_serialization_supported())
+        self.assertTrue(base._compact_serialization_supported())
+        self.assertEqual(2, mock_get_min.call_count)
+        mock_get_min.assert_called_with(
+            test.MatchType(context.RequestContext),
+            ['nova-compute', 'nova-conductor', 'nova-scheduler',
+             'nova-osapi_compute', 'nova-metadata', 'nova-network'])
+
+    @mock.patch('nova.objects.Service.get_minimum_version_multi')
+    def test_compact_serialization_supported_old_service(self, mock_get_min):
+        self.flags(connection=None, group='api_database')
+        self.addCleanup(base.reset_globals)
+        base.reset_globals()
+        mock_get_min.return_value = (
+            base.COMPACT_SERIALIZATION_MIN_SERVICE_VERSION - 1)
+        self.assertFalse(base._compact_serialization_supported())
+        self.assertFalse(base._compact_serialization_supported())
+        mock_get_min.assert_called_once_with(
+            test.MatchType(context.RequestContext),
+            ['nova-compute', 'nova-conductor', 'nova-scheduler',
+             'nova-osapi_compute', 'nova-metadata', 'nova-network'])
+        # Once reset, the minimum version is checked again.
+        base.reset_globals()
+        mock_get_min.return_value = (
+            base.COMPACT_SERIALIZATION_MIN_SERVICE_VERSION)
+        self.assertTrue(base._compact_serialization_supported())
+
+    @mock.patch('nova.objects.Service.get_minimum_version_multi')
+    def test_compact_serialization_supported_old_api_service(self,
+                                                             mock_get_min):
+        # The API services decode the objects in the RPC replies, so an API
+        # service which is not upgraded yet prevents the compact format.
+        self.flags(connection=None, group='api_database')
+        self.addCleanup(base.reset_globals)
+        base.reset_globals()
+        versions = {
+            'nova-compute': base.COMPACT_SERIALIZATION_MIN_SERVICE_VERSION,
+            'nova-conductor': base.COMPACT_SERIALIZATION_MIN_SERVICE_VERSION,
+            'nova-scheduler': base.COMPACT_SERIALIZATION_MIN_SERVICE_VERSION,
+            'nova-osapi_compute': (
+                base.COMPACT_SERIALIZATION_MIN_SERVICE_VERSION - 1)}
+        mock_get_min.side_effect = lambda ctxt, binaries: min(
+            versions[binary] for binary in binaries if binary in versions)
+        self.assertFalse(base._compact_serialization_supported())
+
+    @mock.patch('nova.objects.service.get_minimum_version_all_cells',
+                return_value=base.COMPACT_SERIALIZATION_MIN_SERVICE_VERSION)
+    def test_compact_serialization_supported_all_cells(self, mock_get_min):
+        self.flags(connection='sqlite://', group='api_database')
+        self.addCleanup(base.reset_globals)
+        base.reset_globals()
+        self.assertTrue(base._compact_serialization_supported())
+        mock_get_min.assert_called_once_with(
+            test.MatchType(context.RequestContext),
+            ['nova-compute', 'nova-conductor', 'nova-scheduler',
+             'nova-osapi_compute', 'nova-metadata', 'nova-network'])
+
+    @mock.patch('nova.objects.Service.get_minimum_version_multi',
+                side_effect=exception.DBNotAllowed(binary='nova-compute'))
+    def test_compact_serialization_supported_error(self, mock_get_min):
+        self.flags(connection=None, group='api_database')
+        self.addCleanup(base.reset_globals)
+        base.reset_globals()
+        self.assertFalse(base._compact_serialization_supported())
+        self.assertFalse(base._compact_serialization_supported())
+        # Errors are not cached.
+        self.assertEqual(2, mock_get_min.call_count)
+
     @mock.patch('oslo_versionedobjects.base.obj_tree_get_versions')
     def test_object_tree_backport(self, mock_get_versions):
         # Test the full client backport path all the way from the serializer
@@ -1058,7 +1201,7 @@ object_data = {
     'CellMapping': '1.1-5d652928000a5bc369d79d5bde7e497d',
     'CellMappingList': '1.1-496ef79bb2ab41041fff8bcb57996352',
     'ComputeNode': '1.19-af6bd29a6c3b225da436a0d8487096f2',
-    'ComputeNodeList': '1.17-52f3b0962b1c86b98590144463ebb192',
+    'ComputeNodeList': '1.18-80a30abe64024b597c26d22a3ae79921',
     'ConsoleAuthToken': '1.1-8da320fb065080eb4d3c2e5c59f8bf52',
     'CpuDiagnostics': '1.0-d256f2e442d1b837735fd17dfe8e3d47',
     'Destination': '1.4-3b440d29459e2c98987ad5b25ad1cb2c',
@@ -1330,6 +1473,57 @@ class TestObjMethodOverrides(test.NoDBTestCase):
                 utils.getargspec(obj_class.obj_reset_changes))
 
 
+class TestObjSetTrustedAttr(test.NoDBTestCase):
+    def _set(self, objcls, name, value, set_fn):
+        obj = objcls()
+        obj.obj_reset_changes()
+        try:
+            set_fn(obj, name, value)
+        except Exception as e:
+            return type(e), None
+        attr = getattr(obj, base.get_attrname(name))
+        return (type(attr), attr), obj.obj_what_changed()
+
+    def test_parity_with_setattr(self):
+        """Makes sure that obj_set_trusted_attr() sets the same value, of
+        the same type, as setting the attribute on every registered object.
+        """
+        samples = [u'foo', u'', u'1', b'foo', 1, 0, -1, True, False, 1.5,
+                   0.0, None, datetime.datetime(2020, 1, 1), [], {}]
+        all_objects = get_nova_objects()
+        checked = 0
+        for name, objclasses in all_objects.items():
+            for objcls in objclasses:
+                for field in base._get_trusted_setters(objcls):
+                    for value in samples:
+                        expected = self._set(objcls, field, value, setattr)
+                        actual = self._set(objcls, field, value,
+                                           base.obj_set_trusted_attr)
+                        self.assertEqual(
+                            expected, actual,
+                            '%s.%s = %r' % (name, field, value))
+                    checked += 1
+        self.assertGreater(checked, 0)
+
+    def test_fields_not_eligible(self):
+        setters = base._get_trusted_setters(MyObj)
+        self.assertIn('foo', setters)
+        self.assertIn('bar', setters)
+        # Read-only fields and fields of other types are always coerced.
+        self.assertNotIn('readonly', setters)
+        self.assertNotIn('rel_object', setters)
+        self.assertNotIn('created_at', setters)
+
+    def test_falls_back_to_setattr(self):
+        obj = MyObj()
+        base.obj_set_trusted_attr(obj, 'foo', '2')
+        self.assertEqual(2, obj.foo)
+        base.obj_set_trusted_attr(obj, 'created_at',
+                                  datetime.datetime(2020, 1, 1))
+        self.assertIsNotNone(obj.created_at.tzinfo)
+        self.assertEqual(set(['foo', 'created_at']), obj.obj_what_changed())
+
+
 class TestObjectsDefaultingOnInit(test.NoDBTestCase):
     def test_init_behavior_policy(self):
         all_objects = get_nova_objects()
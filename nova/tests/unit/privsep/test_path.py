@@ -46,6 +46,18 @@ class FileTestCase(test.NoDBTestCase):
                           nova.privsep.path.readfile,
                           '/fake/path')
 
+    @mock.patch('os.path.exists', return_value=True)
+    def test_readchunk(self, mock_exists):
+        mock_open = mock.mock_open(read_data=b'hello world')
+        with mock.patch.object(six.moves.builtins, 'open',
+                               new=mock_open):
+            nova.privsep.path.readchunk('/fake/path', 6, 5)
+
+        handle = mock_open()
+        mock_open.assert_any_call('/fake/path', 'rb')
+        handle.seek.assert_called_once_with(6)
+        handle.read.assert_called_once_with(5)
+
     @mock.patch('os.path.exists', return_value=True)
     def test_write(self, mock_exists):
         mock_open = mock.mock_open()
@@ -0,0 +1,192 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import mock
+from oslo_utils import fixture as utils_fixture
+from oslo_utils import timeutils
+
+from nova import objects
+from nova import servicegroup
+from nova.servicegroup import heartbeat
+from nova import test
+
+
+class HeartbeatTableTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(HeartbeatTableTestCase, self).setUp()
+        self.flags(service_down_time=15)
+        self.table = heartbeat.HeartbeatTable()
+        self.now = timeutils.utcnow()
+        self.time_fixture = self.useFixture(utils_fixture.TimeFixture(
+            self.now))
+
+    @mock.patch('nova.db.api.service_update_heartbeats')
+    def test_flush(self, mock_update):
+        self.table.record(1)
+        self.time_fixture.advance_time_seconds(1)
+        self.table.record(1)
+        self.table.record(2)
+        later = self.now + datetime.timedelta(seconds=1)
+        self.assertEqual(later, self.table.last_seen(1))
+        self.assertIsNone(self.table.last_seen(3))
+
+        self.assertEqual(2, self.table.flush(mock.sentinel.ctxt))
+        mock_update.assert_called_once_with(
+            mock.sentinel.ctxt, {1: (2, later), 2: (1, later)})
+
+        # Nothing is pending after a flush.
+        mock_update.reset_mock()
+        self.assertEqual(0, self.table.flush(mock.sentinel.ctxt))
+        mock_update.assert_not_called()
+        self.assertEqual(later, self.table.last_seen(1))
+
+    @mock.patch('nova.db.api.service_update_heartbeats')
+    def test_flush_failure_keeps_pending(self, mock_update):
+        mock_update.side_effect = [Exception('boom'), 2]
+        self.table.record(1)
+        self.assertEqual(0, self.table.flush(mock.sentinel.ctxt))
+        self.time_fixture.advance_time_seconds(1)
+        self.table.record(1)
+        self.assertEqual(1, self.table.flush(mock.sentinel.ctxt))
+        later = self.now + datetime.timedelta(seconds=1)
+        mock_update.assert_called_with(mock.sentinel.ctxt, {1: (2, later)})
+
+    @mock.patch('nova.db.api.service_update_heartbeats')
+    def test_flush_forgets_expired(self, mock_update):
+        self.table.record(1)
+        self.table.flush(mock.sentinel.ctxt)
+        self.time_fixture.advance_time_seconds(16)
+        self.table.record(2)
+        self.table.flush(mock.sentinel.ctxt)
+        self.assertIsNone(self.table.last_seen(1))
+        self.assertIsNotNone(self.table.last_seen(2))
+
+
+class BatchServiceGroupTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(BatchServiceGroupTestCase, self).setUp()
+        self.down_time = 15
+        self.flags(service_down_time=self.down_time,
+                   servicegroup_driver='batch',
+                   servicegroup_flush_interval=5)
+        self.table = heartbeat.HeartbeatTable()
+        self.stub_out('nova.servicegroup.heartbeat.HEARTBEATS', self.table)
+        self.servicegroup_api = servicegroup.API()
+        self.driver = self.servicegroup_api._driver
+        self.now = timeutils.utcnow()
+        self.time_fixture = self.useFixture(utils_fixture.TimeFixture(
+            self.now))
+
+    def _get_service(self, binary='nova-compute'):
+        service = mock.MagicMock(report_interval=1, binary=binary)
+        service.service_ref = objects.Service(id=1, report_count=0)
+        return service
+
+    def test_is_up_from_heartbeat_table(self):
+        long_ago = self.now - datetime.timedelta(seconds=60)
+        service = objects.Service(
+            id=1, host='fake-host', topic='compute', binary='nova-compute',
+            created_at=long_ago, updated_at=long_ago, last_seen_up=long_ago,
+            forced_down=False)
+        # Down according to the database.
+        self.assertFalse(self.servicegroup_api.service_is_up(service))
+
+        self.table.record(1)
+        self.time_fixture.advance_time_seconds(self.down_time)
+        self.assertTrue(self.servicegroup_api.service_is_up(service))
+
+        self.time_fixture.advance_time_seconds(1)
+        self.assertFalse(self.servicegroup_api.service_is_up(service))
+
+    def test_services_are_up(self):
+        long_ago = self.now - datetime.timedelta(seconds=60)
+        services = [objects.Service(
+            id=i, host='fake-host%d' % i, topic='compute',
+            binary='nova-compute', created_at=long_ago, updated_at=long_ago,
+            last_seen_up=long_ago, forced_down=False) for i in range(1, 4)]
+        # Only the last service is up according to the database.
+        services[2].last_seen_up = self.now
+        self.table.record(1)
+
+        with mock.patch('nova.servicegroup.drivers.db.DbDriver.are_up',
+                        return_value=[False, True]) as mock_are_up:
+            self.assertEqual([True, False, True],
+                             self.servicegroup_api.services_are_up(services))
+        mock_are_up.assert_called_once_with(services[1:])
+
+    def test_join_conductor_starts_flush(self):
+        service = self._get_service(binary='nova-conductor')
+        self.servicegroup_api.join('fake-host', 'fake-topic', service)
+        service.tg.add_timer_args.assert_has_calls([
+            mock.call(1, self.driver._report_state, args=[service],
+                      initial_delay=5),
+            mock.call(5, self.driver._flush, initial_delay=5)])
+
+        # The flush timer is only started once per process.
+        service.tg.add_timer_args.reset_mock()
+        self.servicegroup_api.join('fake-host', 'fake-topic', service)
+        self.assertEqual(1, service.tg.add_timer_args.call_count)
+
+    def test_join_compute_does_not_flush(self):
+        service = self._get_service()
+        self.servicegroup_api.join('fake-host', 'fake-topic', service)
+        service.tg.add_timer_args.assert_called_once_with(
+            1, self.driver._report_state, args=[service], initial_delay=5)
+
+    @mock.patch('nova.conductor.rpcapi.ConductorAPI.service_heartbeat')
+    @mock.patch('nova.conductor.rpcapi.ConductorAPI.'
+                'can_send_service_heartbeat', return_value=True)
+    def test_report_state_to_conductor(self, mock_can_send, mock_heartbeat):
+        service = self._get_service()
+        self.driver._report_state(service)
+        mock_heartbeat.assert_called_once_with(mock.ANY, 1)
+        # The report is counted in the database by nova-conductor.
+        self.assertEqual(0, service.service_ref.report_count)
+        self.assertIsNone(self.table.last_seen(1))
+
+    @mock.patch.object(objects.Service, 'save')
+    @mock.patch('nova.conductor.rpcapi.ConductorAPI.service_heartbeat')
+    @mock.patch('nova.conductor.rpcapi.ConductorAPI.'
+                'can_send_service_heartbeat', return_value=False)
+    def test_report_state_old_conductor(self, mock_can_send, mock_heartbeat,
+                                        mock_save):
+        service = self._get_service()
+        self.driver._report_state(service)
+        mock_heartbeat.assert_not_called()
+        mock_save.assert_called_once_with()
+
+    @mock.patch('nova.db.api.service_update_heartbeats')
+    @mock.patch('nova.conductor.rpcapi.ConductorAPI.service_heartbeat')
+    def test_report_state_local(self, mock_heartbeat, mock_update):
+        self.flags(servicegroup_heartbeat_backend='local')
+        service = self._get_service()
+        self.driver._report_state(service)
+        self.driver._report_state(service)
+        mock_heartbeat.assert_not_called()
+        self.assertEqual(self.now, self.table.last_seen(1))
+        self.assertEqual(0, service.service_ref.report_count)
+
+        # Both reports are added to the report_count in the database.
+        self.driver._flush()
+        mock_update.assert_called_once_with(mock.ANY,
+                                            {1: (2, self.now)})
+
+    @mock.patch('nova.db.api.service_update_heartbeats')
+    def test_flush(self, mock_update):
+        self.table.record(1)
+        self.driver._flush()
+        mock_update.assert_called_once_with(mock.ANY,
+                                            {1: (1, self.now)})
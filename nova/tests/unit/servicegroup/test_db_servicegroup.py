@@ -72,6 +72,24 @@ class DBServiceGroupTestCase(test.NoDBTestCase):
         result = self.servicegroup_api.service_is_up(service)
         self.assertTrue(result)
 
+    def test_services_are_up(self):
+        now = timeutils.utcnow()
+        time_fixture = self.useFixture(utils_fixture.TimeFixture(now))
+        services = [objects.Service(
+            host='fake-host%d' % i, topic='compute', binary='nova-compute',
+            created_at=now, updated_at=now, last_seen_up=now,
+            forced_down=False) for i in range(3)]
+        services[1].forced_down = True
+        time_fixture.advance_time_seconds(self.down_time)
+        services[2].last_seen_up = timeutils.utcnow()
+
+        self.assertEqual([True, False, True],
+                         self.servicegroup_api.services_are_up(services))
+
+        time_fixture.advance_time_seconds(1)
+        self.assertEqual([False, False, True],
+                         self.servicegroup_api.services_are_up(services))
+
     def test_join(self):
         service = mock.MagicMock(report_interval=1)
 
@@ -238,6 +238,60 @@ class ContextTestCase(test.NoDBTestCase):
         mock_authorize.assert_called_once_with(ctxt, mock.sentinel.rule,
                                                mock.sentinel.target)
 
+    @mock.patch.object(context.policy, 'authorize')
+    def test_can_not_cached_by_default(self, mock_authorize):
+        ctxt = context.RequestContext('111', '222')
+
+        ctxt.can(mock.sentinel.rule)
+        ctxt.can(mock.sentinel.rule)
+
+        self.assertEqual(2, mock_authorize.call_count)
+
+    @mock.patch.object(context.policy, 'authorize')
+    def test_can_cached(self, mock_authorize):
+        mock_authorize.return_value = True
+        ctxt = context.RequestContext('111', '222')
+        ctxt.enable_policy_cache()
+
+        for i in range(3):
+            self.assertTrue(ctxt.can(mock.sentinel.rule))
+            self.assertTrue(ctxt.can(mock.sentinel.rule,
+                                     {'project_id': '222'}))
+        # A different target shape is a different check
+        self.assertTrue(ctxt.can(mock.sentinel.rule, {'project_id': '333'}))
+        # An elevated copy shares the cache but not the results
+        self.assertTrue(ctxt.elevated().can(mock.sentinel.rule))
+
+        mock_authorize.assert_has_calls([
+            mock.call(ctxt, mock.sentinel.rule, None),
+            mock.call(ctxt, mock.sentinel.rule, {'project_id': '222'}),
+            mock.call(ctxt, mock.sentinel.rule, {'project_id': '333'})])
+        self.assertEqual(4, mock_authorize.call_count)
+
+    @mock.patch.object(context.policy, 'authorize')
+    def test_can_cached_failure(self, mock_authorize):
+        mock_authorize.side_effect = exception.Forbidden
+        ctxt = context.RequestContext('111', '222')
+        ctxt.enable_policy_cache()
+
+        self.assertFalse(ctxt.can(mock.sentinel.rule, fatal=False))
+        self.assertFalse(ctxt.can(mock.sentinel.rule, fatal=False))
+        self.assertEqual(1, mock_authorize.call_count)
+        # Fatal checks still raise the exception from the policy check
+        self.assertRaises(exception.Forbidden, ctxt.can, mock.sentinel.rule)
+        self.assertEqual(2, mock_authorize.call_count)
+
+    @mock.patch.object(context.policy, 'authorize')
+    def test_can_cached_unhashable_target(self, mock_authorize):
+        ctxt = context.RequestContext('111', '222')
+        ctxt.enable_policy_cache()
+        target = {'project_id': '222', 'tags': ['a']}
+
+        ctxt.can(mock.sentinel.rule, target)
+        ctxt.can(mock.sentinel.rule, target)
+
+        self.assertEqual(2, mock_authorize.call_count)
+
     @mock.patch('nova.rpc.create_transport')
     @mock.patch('nova.db.api.create_context_manager')
     def test_target_cell(self, mock_create_ctxt_mgr, mock_rpc):
@@ -14,9 +14,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
 import ddt
 import mock
 from oslo_db.sqlalchemy import enginefacade
+from oslo_utils import fixture as utils_fixture
+from oslo_utils.fixture import uuidsentinel as uuids
+from oslo_utils import timeutils
 from six.moves import range
 
 from nova.compute import api as compute
@@ -2065,3 +2070,191 @@ class QuotaCountTestCase(test.NoDBTestCase):
         quota._instances_cores_ram_count(mock.sentinel.context,
                                          mock.sentinel.project_id)
         mock_uid_qfd_populated.assert_not_called()
+
+
+class QuotaUsageCountersTestCase(test.NoDBTestCase):
+
+    def setUp(self):
+        super(QuotaUsageCountersTestCase, self).setUp()
+        self.flags(count_usage_from_counters=True, usage_counters_max_age=60,
+                   group='quota')
+        self.now = timeutils.utcnow()
+        self.useFixture(utils_fixture.TimeFixture(self.now))
+        self.counts = {'project': {'instances': 2, 'cores': 2, 'ram': 4},
+                       'user': {'instances': 1, 'cores': 1, 'ram': 2}}
+
+    def _counters(self, counts, created_at):
+        return {scope: {resource: (in_use, created_at)
+                        for resource, in_use in scope_counts.items()}
+                for scope, scope_counts in counts.items()}
+
+    @mock.patch('nova.quota._reset_usage_counters')
+    @mock.patch('nova.quota._instances_cores_ram_count_uncached')
+    @mock.patch('nova.quota._get_usage_counters')
+    def test_instances_cores_ram_count_counters(self, mock_get, mock_count,
+                                                mock_reset):
+        mock_get.return_value = self._counters(
+            self.counts, self.now - datetime.timedelta(seconds=60))
+
+        counts = quota._instances_cores_ram_count(
+            mock.sentinel.context, mock.sentinel.project_id,
+            user_id=mock.sentinel.user_id)
+
+        self.assertEqual(self.counts, counts)
+        mock_get.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.project_id,
+            user_id=mock.sentinel.user_id)
+        mock_count.assert_not_called()
+        mock_reset.assert_not_called()
+
+    @mock.patch('nova.quota.LOG.info')
+    @mock.patch('nova.quota._reset_usage_counters')
+    @mock.patch('nova.quota._instances_cores_ram_count_uncached')
+    @mock.patch('nova.quota._get_usage_counters')
+    def test_instances_cores_ram_count_counters_expired(
+            self, mock_get, mock_count, mock_reset, mock_log):
+        counters = self._counters(
+            self.counts, self.now - datetime.timedelta(seconds=61))
+        counters['project']['cores'] = (5, counters['project']['cores'][1])
+        mock_get.return_value = counters
+        mock_count.return_value = self.counts
+
+        counts = quota._instances_cores_ram_count(
+            mock.sentinel.context, mock.sentinel.project_id,
+            user_id=mock.sentinel.user_id)
+
+        self.assertEqual(self.counts, counts)
+        mock_count.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.project_id,
+            user_id=mock.sentinel.user_id)
+        mock_reset.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.project_id,
+            mock.sentinel.user_id, self.counts)
+        # The drift of the counters is logged.
+        mock_log.assert_called_once_with(
+            mock.ANY, {'project_id': mock.sentinel.project_id,
+                       'drift': {'project': {'cores': 3}}})
+
+    @mock.patch('nova.quota._reset_usage_counters')
+    @mock.patch('nova.quota._instances_cores_ram_count_uncached')
+    @mock.patch('nova.quota._get_usage_counters')
+    def test_instances_cores_ram_count_counters_missing(
+            self, mock_get, mock_count, mock_reset):
+        # Only the project counters exist, the user ones are missing.
+        mock_get.return_value = self._counters(self.counts, self.now)
+        mock_get.return_value['user'] = {}
+        mock_count.return_value = self.counts
+
+        counts = quota._instances_cores_ram_count(
+            mock.sentinel.context, mock.sentinel.project_id,
+            user_id=mock.sentinel.user_id)
+
+        self.assertEqual(self.counts, counts)
+        mock_reset.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.project_id,
+            mock.sentinel.user_id, self.counts)
+
+    @mock.patch('nova.quota._reset_usage_counters')
+    @mock.patch('nova.quota._instances_cores_ram_count_uncached')
+    @mock.patch('nova.quota._get_usage_counters')
+    def test_instances_cores_ram_count_counters_no_max_age(
+            self, mock_get, mock_count, mock_reset):
+        self.flags(usage_counters_max_age=0, group='quota')
+        mock_get.return_value = self._counters(
+            self.counts, self.now - datetime.timedelta(days=1))
+
+        counts = quota._instances_cores_ram_count(
+            mock.sentinel.context, mock.sentinel.project_id,
+            user_id=mock.sentinel.user_id)
+
+        self.assertEqual(self.counts, counts)
+        mock_count.assert_not_called()
+        mock_reset.assert_not_called()
+
+    @mock.patch('nova.quota._reset_usage_counters')
+    @mock.patch('nova.quota._instances_cores_ram_count_uncached')
+    @mock.patch('nova.quota._get_usage_counters',
+                side_effect=test.TestingException)
+    def test_instances_cores_ram_count_counters_error(
+            self, mock_get, mock_count, mock_reset):
+        mock_count.return_value = self.counts
+
+        counts = quota._instances_cores_ram_count(
+            mock.sentinel.context, mock.sentinel.project_id,
+            user_id=mock.sentinel.user_id)
+
+        # The usage is counted as if the counters were disabled.
+        self.assertEqual(self.counts, counts)
+        mock_reset.assert_not_called()
+
+    @mock.patch('nova.quota._update_usage_counters')
+    def test_update_usage_counters(self, mock_update):
+        quota.update_usage_counters(
+            mock.sentinel.context, mock.sentinel.project_id,
+            mock.sentinel.user_id,
+            {'instances': 0, 'cores': 2, 'key_pairs': 1})
+        mock_update.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.project_id,
+            mock.sentinel.user_id, {'cores': 2})
+
+    @mock.patch('nova.quota._update_usage_counters')
+    def test_update_usage_counters_disabled(self, mock_update):
+        self.flags(count_usage_from_counters=False, group='quota')
+        quota.update_usage_counters(
+            mock.sentinel.context, mock.sentinel.project_id,
+            mock.sentinel.user_id, {'cores': 2})
+        mock_update.assert_not_called()
+
+    @mock.patch('nova.quota._update_usage_counters',
+                side_effect=test.TestingException)
+    def test_update_usage_counters_error(self, mock_update):
+        # Errors are logged but do not fail the operation.
+        quota.update_usage_counters(
+            mock.sentinel.context, mock.sentinel.project_id,
+            mock.sentinel.user_id, {'cores': 2})
+        self.assertIn('Failed to update the quota usage counters',
+                      self.stdlog.logger.output)
+
+    @mock.patch('nova.quota._update_usage_counters')
+    def test_update_instance_usage_counters(self, mock_update):
+        instance = objects.Instance(
+            project_id=uuids.project_id,
+            user_id=uuids.user_id,
+            flavor=objects.Flavor(vcpus=2, memory_mb=512))
+        quota.update_instance_usage_counters(mock.sentinel.context, instance,
+                                             count=-3)
+        mock_update.assert_called_once_with(
+            mock.sentinel.context, uuids.project_id,
+            uuids.user_id,
+            {'instances': -3, 'cores': -6, 'ram': -1536})
+
+    @mock.patch('nova.quota._update_usage_counters')
+    def test_update_instance_usage_counters_resizing(self, mock_update):
+        # The usage of the largest flavor of a resizing instance is removed.
+        instance = objects.Instance(
+            project_id=uuids.project_id,
+            user_id=uuids.user_id,
+            flavor=objects.Flavor(vcpus=2, memory_mb=512),
+            old_flavor=objects.Flavor(vcpus=4, memory_mb=256),
+            new_flavor=None)
+        quota.update_instance_usage_counters(mock.sentinel.context, instance,
+                                             count=-1)
+        mock_update.assert_called_once_with(
+            mock.sentinel.context, uuids.project_id,
+            uuids.user_id,
+            {'instances': -1, 'cores': -4, 'ram': -512})
+
+    @mock.patch('nova.quota._destroy_usage_counters')
+    @mock.patch('nova.quota._update_usage_counters')
+    def test_update_instance_usage_counters_destroyed(self, mock_update,
+                                                      mock_destroy):
+        instance = objects.Instance(project_id=uuids.project_id,
+                                    user_id=uuids.user_id)
+        with mock.patch.object(instance, 'obj_load_attr',
+                               side_effect=exception.InstanceNotFound(
+                                   instance_id=uuids.instance)):
+            quota.update_instance_usage_counters(mock.sentinel.context,
+                                                 instance, count=-1)
+        mock_update.assert_not_called()
+        mock_destroy.assert_called_once_with(mock.sentinel.context,
+                                             uuids.project_id)
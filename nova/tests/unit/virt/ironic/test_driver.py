@@ -15,6 +15,8 @@
 
 """Tests for the ironic driver."""
 
+import time
+
 import fixtures
 from ironicclient import exc as ironic_exception
 import mock
@@ -3288,6 +3290,10 @@ class HashRingTestCase(test.NoDBTestCase):
         self.ctx = nova_context.get_admin_context()
         self.mock_is_up = (
             self.driver.servicegroup_api.service_is_up)
+        self.mock_are_up = (
+            self.driver.servicegroup_api.services_are_up)
+        self.mock_are_up.side_effect = lambda svcs: [
+            self.driver.servicegroup_api.service_is_up(svc) for svc in svcs]
 
     @mock.patch.object(ironic_driver.IronicDriver, '_refresh_hash_ring')
     def test_hash_ring_refreshed_on_init(self, mock_hr):
@@ -3315,6 +3321,12 @@ class HashRingTestCase(test.NoDBTestCase):
         mock_hash_ring.assert_called_once_with(expected_hosts, partitions=32)
         self.assertEqual(SENTINEL, self.driver.hash_ring)
         self.mock_is_up.assert_has_calls(is_up_calls)
+        # The liveness of the services is checked with a single call.
+        self.assertEqual(1, self.mock_are_up.call_count)
+        checked = self.mock_are_up.call_args[0][0]
+        for svc in services:
+            if svc.host not in uncalled:
+                self.assertIn(svc, checked)
 
     def test__refresh_hash_ring_same_host_different_case(self):
         # Test that we treat Host1 and host1 as the same host
@@ -3357,6 +3369,24 @@ class HashRingTestCase(test.NoDBTestCase):
         self.mock_is_up.side_effect = [True, True, False, True]
         self._test__refresh_hash_ring(services, expected_hosts)
 
+    @mock.patch.object(hash_ring, 'HashRing')
+    @mock.patch.object(objects.ServiceList, 'get_all_computes_by_hv_type')
+    def test__refresh_hash_ring_unchanged(self, mock_services,
+                                          mock_hash_ring):
+        self.flags(host='host1')
+        self.mock_is_up.return_value = True
+        mock_services.return_value = [_make_compute_service('host2')]
+
+        self.driver._refresh_hash_ring(self.ctx)
+        self.driver._refresh_hash_ring(self.ctx)
+        mock_hash_ring.assert_called_once_with({'host1', 'host2'},
+                                               partitions=32)
+
+        mock_services.return_value = []
+        self.driver._refresh_hash_ring(self.ctx)
+        mock_hash_ring.assert_called_with({'host1'}, partitions=32)
+        self.assertEqual(2, mock_hash_ring.call_count)
+
     @mock.patch.object(ironic_driver.IronicDriver, '_can_send_version')
     def test__refresh_hash_ring_peer_list(self, mock_can_send):
         services = ['host1', 'host2', 'host3']
@@ -3602,6 +3632,186 @@ class NodeCacheTestCase(test.NoDBTestCase):
         expected_cache = {n.uuid: n for n in nodes[1:]}
         self.assertEqual(expected_cache, self.driver.node_cache)
 
+    @mock.patch.object(hash_ring.HashRing, 'get_nodes')
+    @mock.patch.object(ironic_driver.IronicDriver, '_refresh_hash_ring')
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host',
+                       return_value=[])
+    def test__refresh_cache_hash_ring_lookups_cached(
+            self, mock_instances, mock_refresh_hr, mock_get_nodes):
+        mock_get_nodes.return_value = {self.host}
+        nodes = [
+            _get_cached_node(
+                uuid=uuidutils.generate_uuid(), instance_uuid=None),
+            _get_cached_node(
+                uuid=uuidutils.generate_uuid(), instance_uuid=None),
+        ]
+        with mock.patch.object(self.driver, '_get_node_list',
+                               return_value=nodes):
+            self.driver._refresh_cache()
+            self.driver._refresh_cache()
+        self.assertEqual(2, mock_get_nodes.call_count)
+
+        # The nodes are looked up again when the hash ring members change.
+        self.driver._hash_ring_owned = {}
+        with mock.patch.object(self.driver, '_get_node_list',
+                               return_value=nodes):
+            self.driver._refresh_cache()
+        self.assertEqual(4, mock_get_nodes.call_count)
+
+    @mock.patch.object(objects.ServiceList, 'get_all_computes_by_hv_type')
+    def test__refresh_hash_ring_resets_lookups(self, mock_services):
+        self.useFixture(fixtures.MockPatchObject(
+            self.driver.servicegroup_api, 'services_are_up',
+            side_effect=lambda services: [True] * len(services)))
+        mock_services.return_value = [_make_compute_service(self.host)]
+        self.driver._refresh_hash_ring(self.ctx)
+        self.driver._hash_ring_owned = {uuids.node: True}
+        self.driver._refresh_hash_ring(self.ctx)
+        self.assertEqual({uuids.node: True}, self.driver._hash_ring_owned)
+
+        mock_services.return_value.append(_make_compute_service('host2'))
+        self.driver._refresh_hash_ring(self.ctx)
+        self.assertEqual({}, self.driver._hash_ring_owned)
+
+    @mock.patch.object(ironic_driver, 'LOG')
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host',
+                       return_value=[])
+    def test__refresh_cache_rebalanced_nodes(self, mock_instances, mock_log):
+        nodes = [_get_cached_node(uuid=node_uuid, instance_uuid=None)
+                 for node_uuid in (uuids.node1, uuids.node2, uuids.node3)]
+        hosts = {uuids.node1.encode('utf-8'): {self.host},
+                 uuids.node2.encode('utf-8'): {'host2'},
+                 uuids.node3.encode('utf-8'): {self.host}}
+
+        def fake_refresh_hash_ring(ctxt):
+            self.driver._hash_ring_members = members
+            self.driver._hash_ring_owned = {}
+
+        members = {self.host}
+        with test.nested(
+            mock.patch.object(self.driver, '_refresh_hash_ring',
+                              side_effect=fake_refresh_hash_ring),
+            mock.patch.object(self.driver, '_get_node_list',
+                              return_value=nodes),
+            mock.patch.object(hash_ring.HashRing, 'get_nodes',
+                              side_effect=lambda key: hosts[key]),
+        ):
+            self.driver._refresh_cache()
+            mock_log.info.assert_not_called()
+
+            # host2 joined the hash ring and node3 moved to it, while node2
+            # moved from it.
+            members = {self.host, 'host2'}
+            hosts[uuids.node2.encode('utf-8')] = {self.host}
+            hosts[uuids.node3.encode('utf-8')] = {'host2'}
+            self.driver._refresh_cache()
+
+        self.assertEqual({uuids.node1, uuids.node2},
+                         set(self.driver.node_cache))
+        mock_log.info.assert_called_once_with(
+            mock.ANY, {'in': 1, 'moved_in': [uuids.node2],
+                       'out': 1, 'moved_out': [uuids.node3]})
+
+    def _get_listed_node(self, node):
+        # The SDK only returns the requested fields, with their SDK names.
+        return ironic_utils.get_test_node(
+            fields=('id', 'updated_at'), id=node.uuid,
+            updated_at=node.updated_at)
+
+    @mock.patch.object(hash_ring.HashRing, 'get_nodes')
+    @mock.patch.object(ironic_driver.IronicDriver, '_refresh_hash_ring')
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host',
+                       return_value=[])
+    def test__refresh_cache_incremental(self, mock_instances,
+                                        mock_refresh_hr, mock_get_nodes):
+        self.flags(node_cache_full_refresh_interval=600, group='ironic')
+        mock_get_nodes.return_value = {self.host}
+        nodes = [
+            _get_cached_node(
+                uuid=uuids.node1, instance_uuid=None,
+                updated_at='2020-01-01T00:00:00+00:00'),
+            _get_cached_node(
+                uuid=uuids.node2, instance_uuid=None,
+                updated_at='2020-01-01T00:00:00+00:00'),
+            _get_cached_node(
+                uuid=uuids.node3, instance_uuid=None,
+                updated_at='2020-01-01T00:00:00+00:00'),
+        ]
+        with mock.patch.object(self.driver, '_get_node_list',
+                               return_value=nodes) as mock_list:
+            self.driver._refresh_cache()
+        mock_list.assert_called_once_with(
+            fields=ironic_driver._NODE_CACHE_FIELDS)
+        self.assertEqual({n.uuid: n for n in nodes}, self.driver.node_cache)
+
+        # node1 was updated, node2 was deleted and node4 was added.
+        updated = _get_cached_node(
+            uuid=uuids.node1, instance_uuid=uuids.instance,
+            updated_at='2020-01-01T00:01:00+00:00')
+        added = _get_cached_node(
+            uuid=uuids.node4, instance_uuid=None,
+            updated_at='2020-01-01T00:01:00+00:00')
+        listed = [self._get_listed_node(n)
+                  for n in (updated, nodes[2], added)]
+        with test.nested(
+            mock.patch.object(self.driver, '_get_node_list',
+                              return_value=iter(listed)),
+            mock.patch.object(self.driver, '_ironic_connection'),
+        ) as (mock_list, mock_conn):
+            mock_conn.get_node.side_effect = [updated, added]
+            self.driver._refresh_cache()
+
+        mock_list.assert_called_once_with(
+            return_generator=True, fields=('uuid', 'updated_at'))
+        mock_conn.get_node.assert_has_calls([
+            mock.call(uuids.node1, fields=ironic_driver._NODE_CACHE_FIELDS),
+            mock.call(uuids.node4, fields=ironic_driver._NODE_CACHE_FIELDS)])
+        self.assertEqual({uuids.node1, uuids.node3, uuids.node4},
+                         set(self.driver._node_list))
+        # node1 now has an instance which is not ours.
+        self.assertEqual({uuids.node3: nodes[2], uuids.node4: added},
+                         self.driver.node_cache)
+
+    @mock.patch.object(hash_ring.HashRing, 'get_nodes')
+    @mock.patch.object(ironic_driver.IronicDriver, '_refresh_hash_ring')
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host',
+                       return_value=[])
+    def test__refresh_cache_incremental_too_many_changes(
+            self, mock_instances, mock_refresh_hr, mock_get_nodes):
+        self.flags(node_cache_full_refresh_interval=600, group='ironic')
+        self.driver._node_list_time = time.time()
+        mock_get_nodes.return_value = {self.host}
+        nodes = [_get_cached_node(uuid=uuidutils.generate_uuid(),
+                                  instance_uuid=None)
+                 for i in range(ironic_driver._NODE_CACHE_MAX_CHANGED + 1)]
+        listed = [self._get_listed_node(n) for n in nodes]
+        with mock.patch.object(self.driver, '_get_node_list',
+                               side_effect=[iter(listed), nodes]) as mock_list:
+            self.driver._refresh_cache()
+
+        mock_list.assert_has_calls([
+            mock.call(return_generator=True, fields=('uuid', 'updated_at')),
+            mock.call(fields=ironic_driver._NODE_CACHE_FIELDS)])
+        self.assertEqual({n.uuid: n for n in nodes}, self.driver.node_cache)
+
+    @mock.patch.object(hash_ring.HashRing, 'get_nodes')
+    @mock.patch.object(ironic_driver.IronicDriver, '_refresh_hash_ring')
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host',
+                       return_value=[])
+    def test__refresh_cache_incremental_interval_expired(
+            self, mock_instances, mock_refresh_hr, mock_get_nodes):
+        self.flags(node_cache_full_refresh_interval=600, group='ironic')
+        self.driver._node_list_time = time.time() - 600
+        mock_get_nodes.return_value = {self.host}
+        nodes = [_get_cached_node(uuid=uuids.node, instance_uuid=None)]
+        with mock.patch.object(self.driver, '_get_node_list',
+                               return_value=nodes) as mock_list:
+            self.driver._refresh_cache()
+
+        mock_list.assert_called_once_with(
+            fields=ironic_driver._NODE_CACHE_FIELDS)
+        self.assertGreater(self.driver._node_list_time, time.time() - 600)
+
 
 @mock.patch.object(FAKE_CLIENT, 'node')
 class IronicDriverConsoleTestCase(test.NoDBTestCase):
@@ -109,6 +109,7 @@ VIR_MIGRATE_NON_SHARED_INC = 128
 VIR_MIGRATE_AUTO_CONVERGE = 8192
 VIR_MIGRATE_POSTCOPY = 32768
 VIR_MIGRATE_TLS = 65536
+VIR_MIGRATE_PARALLEL = 131072
 
 VIR_NODE_CPU_STATS_ALL_CPUS = -1
 
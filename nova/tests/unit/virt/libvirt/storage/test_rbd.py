@@ -366,6 +366,51 @@ class RbdTestCase(test.NoDBTestCase):
         self.mock_rados.Rados.open_ioctx.assert_called_with(
             test.MatchType(str))
 
+    @mock.patch.dict(rbd_utils._RADOS_CLIENTS, clear=True)
+    @mock.patch.object(rbd_utils.RBDDriver, '_new_rados_client')
+    def test_connect_to_rados_persistent(self, mock_new_client):
+        self.flags(rbd_persistent_connections=True, group='libvirt')
+        client = mock.Mock(state='connected')
+        mock_new_client.return_value = client
+
+        for pool in (None, 'alt_pool'):
+            ret = self.driver._connect_to_rados(pool)
+            self.assertEqual((client, client.open_ioctx.return_value), ret)
+            self.driver._disconnect_from_rados(*ret)
+
+        # The client is connected once and kept connected.
+        mock_new_client.assert_called_once_with()
+        client.open_ioctx.assert_has_calls(
+            [mock.call(self.rbd_pool), mock.call('alt_pool')])
+        self.assertEqual(2, client.open_ioctx.return_value.close.call_count)
+        client.shutdown.assert_not_called()
+
+    @mock.patch.dict(rbd_utils._RADOS_CLIENTS, clear=True)
+    @mock.patch.object(rbd_utils.RBDDriver, '_new_rados_client')
+    def test_connect_to_rados_persistent_reconnect(self, mock_new_client):
+        self.flags(rbd_persistent_connections=True, group='libvirt')
+        client1 = mock.Mock(state='connected')
+        client2 = mock.Mock(state='connected')
+        mock_new_client.side_effect = [client1, client2]
+
+        self.assertIs(client1, self.driver._connect_to_rados()[0])
+        client1.state = 'shutdown'
+        self.assertIs(client2, self.driver._connect_to_rados()[0])
+        self.assertIs(client2, self.driver._connect_to_rados()[0])
+        self.assertEqual(2, mock_new_client.call_count)
+
+    @mock.patch.dict(rbd_utils._RADOS_CLIENTS, clear=True)
+    @mock.patch.object(rbd_utils.RBDDriver, '_new_rados_client')
+    def test_connect_to_rados_persistent_error(self, mock_new_client):
+        self.flags(rbd_persistent_connections=True, group='libvirt')
+        client = mock.Mock(state='connected')
+        client.open_ioctx.side_effect = self.mock_rados.Error
+        mock_new_client.return_value = client
+
+        self.assertRaises(self.mock_rados.Error,
+                          self.driver._connect_to_rados)
+        client.shutdown.assert_not_called()
+
     def test_ceph_args_none(self):
         self.driver.rbd_user = None
         self.driver.ceph_conf = None
@@ -621,6 +666,20 @@ class RbdTestCase(test.NoDBTestCase):
         self.driver.rollback_to_snap(self.volume_name, self.snap_name)
         proxy.rollback_to_snap.assert_called_once_with(self.snap_name)
 
+    @mock.patch.object(rbd_utils, 'RBDVolumeProxy')
+    def test_read_chunks(self, mock_proxy):
+        proxy = mock_proxy.return_value
+        proxy.__enter__.return_value = proxy
+        proxy.size.return_value = 10
+        proxy.read.side_effect = [b'snap', b'shot', b'ok']
+
+        self.assertEqual([b'snap', b'shot', b'ok'],
+                         list(self.driver.read_chunks(self.volume_name, 4)))
+        mock_proxy.assert_called_once_with(self.driver, self.volume_name,
+                                           read_only=True)
+        proxy.read.assert_has_calls([
+            mock.call(0, 4), mock.call(4, 4), mock.call(8, 2)])
+
     @mock.patch('oslo_concurrency.processutils.execute')
     def test_get_pool_info(self, mock_execute):
         mock_execute.return_value = (CEPH_DF, '')
@@ -630,6 +689,36 @@ class RbdTestCase(test.NoDBTestCase):
                     'used': ceph_df_json['pools'][1]['stats']['bytes_used']}
         self.assertDictEqual(expected, self.driver.get_pool_info())
 
+    @mock.patch.dict(rbd_utils._RADOS_CLIENTS, clear=True)
+    @mock.patch('oslo_concurrency.processutils.execute')
+    @mock.patch.object(rbd_utils.RBDDriver, '_new_rados_client')
+    def test_get_pool_info_persistent(self, mock_new_client, mock_execute):
+        self.flags(rbd_persistent_connections=True, group='libvirt')
+        client = mock.Mock(state='connected')
+        client.mon_command.return_value = (0, CEPH_DF, '')
+        mock_new_client.return_value = client
+        ceph_df_json = jsonutils.loads(CEPH_DF)
+        expected = {'total': ceph_df_json['stats']['total_bytes'],
+                    'free': ceph_df_json['pools'][1]['stats']['max_avail'],
+                    'used': ceph_df_json['pools'][1]['stats']['bytes_used']}
+
+        self.assertDictEqual(expected, self.driver.get_pool_info())
+
+        client.mon_command.assert_called_once_with(mock.ANY, b'')
+        self.assertEqual({'prefix': 'df', 'format': 'json'},
+                         jsonutils.loads(client.mon_command.call_args[0][0]))
+        mock_execute.assert_not_called()
+
+    @mock.patch.dict(rbd_utils._RADOS_CLIENTS, clear=True)
+    @mock.patch.object(rbd_utils.RBDDriver, '_new_rados_client')
+    def test_get_pool_info_persistent_error(self, mock_new_client):
+        self.flags(rbd_persistent_connections=True, group='libvirt')
+        client = mock.Mock(state='connected')
+        client.mon_command.return_value = (-1, '', 'error')
+        mock_new_client.return_value = client
+
+        self.assertRaises(exception.StorageError, self.driver.get_pool_info)
+
     @mock.patch('oslo_concurrency.processutils.execute')
     def test_get_pool_info_not_found(self, mock_execute):
         # Make the pool something other than self.rbd_pool so it won't be found
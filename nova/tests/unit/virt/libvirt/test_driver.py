@@ -38,6 +38,7 @@ import ddt
 import eventlet
 from eventlet import greenthread
 import fixtures
+from glanceclient.common import http as glance_http
 from lxml import etree
 import mock
 from os_brick import encryptors
@@ -1269,6 +1270,18 @@ class LibvirtConnTestCase(test.NoDBTestCase,
             drvr.init_host("dummyhost")
             self.assertTrue(mock_check_fb_support.called)
 
+    @mock.patch.object(imagecache, 'start_peer_server')
+    def test_init_host_peer_transfer(self, mock_start):
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), True)
+        drvr.init_host("dummyhost")
+        mock_start.assert_not_called()
+        self.assertIsNone(drvr._image_cache_server)
+
+        self.flags(peer_transfer=True, group='image_cache')
+        drvr.init_host("dummyhost")
+        mock_start.assert_called_once_with()
+        self.assertEqual(mock_start.return_value, drvr._image_cache_server)
+
     def test_min_version_file_backed_ok(self):
         self.flags(file_backed_memory=1024, group='libvirt')
         self.flags(ram_allocation_ratio=1.0)
@@ -1606,6 +1619,70 @@ class LibvirtConnTestCase(test.NoDBTestCase,
                          libvirt_driver.libvirt.VIR_MIGRATE_LIVE |
                          libvirt_driver.libvirt.VIR_MIGRATE_NON_SHARED_INC))
 
+    @mock.patch.object(host.Host, 'has_min_version', return_value=True)
+    def test_live_migration_parallel_connections(self, mock_min_version):
+        self.flags(live_migration_parallel_connections=4, group='libvirt')
+        self._do_test_parse_migration_flags(
+            lm_expected=(libvirt_driver.libvirt.VIR_MIGRATE_UNDEFINE_SOURCE |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PERSIST_DEST |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PEER2PEER |
+                         libvirt_driver.libvirt.VIR_MIGRATE_LIVE |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PARALLEL),
+            bm_expected=(libvirt_driver.libvirt.VIR_MIGRATE_UNDEFINE_SOURCE |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PERSIST_DEST |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PEER2PEER |
+                         libvirt_driver.libvirt.VIR_MIGRATE_LIVE |
+                         libvirt_driver.libvirt.VIR_MIGRATE_NON_SHARED_INC |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PARALLEL))
+
+    @mock.patch.object(host.Host, 'has_min_version', return_value=False)
+    def test_live_migration_parallel_connections_old_version(
+            self, mock_min_version):
+        self.flags(live_migration_parallel_connections=4, group='libvirt')
+        self._do_test_parse_migration_flags(
+            lm_expected=(libvirt_driver.libvirt.VIR_MIGRATE_UNDEFINE_SOURCE |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PERSIST_DEST |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PEER2PEER |
+                         libvirt_driver.libvirt.VIR_MIGRATE_LIVE))
+
+    @mock.patch.object(host.Host, 'has_min_version', return_value=True)
+    def test_live_migration_parallel_connections_old_bindings(
+            self, mock_min_version):
+        # The libvirt-python bindings do not define VIR_MIGRATE_PARALLEL.
+        self.useFixture(fixtures.MonkeyPatch(
+            'nova.tests.unit.virt.libvirt.fakelibvirt.VIR_MIGRATE_PARALLEL',
+            fixtures.MonkeyPatch.delete))
+        self.flags(live_migration_parallel_connections=4, group='libvirt')
+        self._do_test_parse_migration_flags(
+            lm_expected=(libvirt_driver.libvirt.VIR_MIGRATE_UNDEFINE_SOURCE |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PERSIST_DEST |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PEER2PEER |
+                         libvirt_driver.libvirt.VIR_MIGRATE_LIVE))
+
+    @mock.patch.object(host.Host, 'has_min_version', return_value=True)
+    def test_live_migration_parallel_connections_and_post_copy(
+            self, mock_min_version):
+        self.flags(live_migration_parallel_connections=4, group='libvirt')
+        self.flags(live_migration_permit_post_copy=True, group='libvirt')
+        self._do_test_parse_migration_flags(
+            lm_expected=(libvirt_driver.libvirt.VIR_MIGRATE_UNDEFINE_SOURCE |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PERSIST_DEST |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PEER2PEER |
+                         libvirt_driver.libvirt.VIR_MIGRATE_LIVE |
+                         libvirt_driver.libvirt.VIR_MIGRATE_POSTCOPY))
+
+    @mock.patch.object(host.Host, 'has_min_version', return_value=True)
+    def test_live_migration_parallel_connections_tunnelled(
+            self, mock_min_version):
+        self.flags(live_migration_parallel_connections=4, group='libvirt')
+        self.flags(live_migration_tunnelled=True, group='libvirt')
+        self._do_test_parse_migration_flags(
+            lm_expected=(libvirt_driver.libvirt.VIR_MIGRATE_UNDEFINE_SOURCE |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PERSIST_DEST |
+                         libvirt_driver.libvirt.VIR_MIGRATE_PEER2PEER |
+                         libvirt_driver.libvirt.VIR_MIGRATE_LIVE |
+                         libvirt_driver.libvirt.VIR_MIGRATE_TUNNELLED))
+
     @mock.patch('nova.utils.get_image_from_system_metadata')
     @mock.patch.object(host.Host,
                        'has_min_version', return_value=True)
@@ -11824,6 +11901,53 @@ class LibvirtConnTestCase(test.NoDBTestCase,
             drvr._live_migration_uri(target_connection),
             params=params, flags=expected_flags)
 
+    @mock.patch.object(host.Host, 'has_min_version', return_value=True)
+    @mock.patch.object(fakelibvirt.virDomain, "migrateToURI3")
+    @mock.patch('nova.virt.libvirt.migration.get_updated_guest_xml',
+                return_value='')
+    @mock.patch('nova.virt.libvirt.guest.Guest.get_xml_desc', return_value='')
+    def test_block_live_migration_parallel_connections(
+            self, mock_old_xml, mock_new_xml,
+            mock_migrateToURI3, mock_min_version):
+        self.flags(live_migration_parallel_connections=4, group='libvirt')
+
+        target_connection = None
+        disk_paths = ['vda', 'vdb']
+
+        params = {
+            'bandwidth': CONF.libvirt.live_migration_bandwidth,
+            'migrate_disks': disk_paths,
+            'parallel.connections': 4,
+        }
+
+        # Start test
+        migrate_data = objects.LibvirtLiveMigrateData(
+            graphics_listen_addr_vnc='0.0.0.0',
+            graphics_listen_addr_spice='0.0.0.0',
+            serial_listen_addr='127.0.0.1',
+            target_connect_addr=target_connection,
+            bdms=[],
+            block_migration=True)
+
+        dom = fakelibvirt.virDomain
+        guest = libvirt_guest.Guest(dom)
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        drvr._parse_migration_flags()
+        instance = objects.Instance(**self.test_instance)
+        drvr._live_migration_operation(self.context, instance,
+                                       target_connection, True, migrate_data,
+                                       guest, disk_paths)
+
+        expected_flags = (fakelibvirt.VIR_MIGRATE_UNDEFINE_SOURCE |
+                          fakelibvirt.VIR_MIGRATE_PERSIST_DEST |
+                          fakelibvirt.VIR_MIGRATE_PEER2PEER |
+                          fakelibvirt.VIR_MIGRATE_NON_SHARED_INC |
+                          fakelibvirt.VIR_MIGRATE_PARALLEL |
+                          fakelibvirt.VIR_MIGRATE_LIVE)
+        mock_migrateToURI3.assert_called_once_with(
+            drvr._live_migration_uri(target_connection),
+            params=params, flags=expected_flags)
+
     @mock.patch.object(host.Host, 'has_min_version', return_value=True)
     @mock.patch.object(fakelibvirt.virDomain, "migrateToURI3")
     @mock.patch('nova.virt.libvirt.guest.Guest.get_xml_desc',
@@ -12776,6 +12900,84 @@ class LibvirtConnTestCase(test.NoDBTestCase,
                                              self.EXPECT_SUCCESS,
                                              expected_switch=True)
 
+    def _test_live_migration_monitor_adaptive_convergence(self, switch):
+        # Each one of these fake times is used for time.time()
+        # when a new domain_info_records entry is consumed.
+        fake_times = [0, 1, 2, 3, 4, 5, 6, 7, 8]
+
+        # The guest dirties 2 GiB of memory during each iteration.
+        domain_info_records = [
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_NONE),
+        ] + [
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_UNBOUNDED,
+                memory_total=8 * units.Gi,
+                memory_processed=i * units.Gi,
+                memory_remaining=8 * units.Gi if i == 0 else 2 * units.Gi,
+                memory_iteration=i + 1)
+            for i in range(5)
+        ] + [
+            "thread-finish",
+            "domain-stop",
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_COMPLETED),
+        ]
+
+        self._test_live_migration_monitoring(
+            domain_info_records, fake_times, self.EXPECT_SUCCESS,
+            scheduled_action='postcopy_switch',
+            scheduled_action_executed=switch)
+
+    @mock.patch.object(libvirt_driver.LibvirtDriver,
+                       "_is_post_copy_enabled", return_value=True)
+    def test_live_migration_monitor_adaptive_convergence(
+            self, mock_postcopy_enabled):
+        self.flags(live_migration_adaptive_convergence=True, group='libvirt')
+        self._test_live_migration_monitor_adaptive_convergence(True)
+
+    @mock.patch.object(libvirt_driver.LibvirtDriver,
+                       "_is_post_copy_enabled", return_value=True)
+    def test_live_migration_monitor_adaptive_convergence_disabled(
+            self, mock_postcopy_enabled):
+        self._test_live_migration_monitor_adaptive_convergence(False)
+
+    @mock.patch.object(libvirt_guest.Guest, "migrate_configure_max_downtime")
+    @mock.patch.object(libvirt_driver.LibvirtDriver,
+                       "_is_post_copy_enabled", return_value=False)
+    def test_live_migration_monitor_adaptive_convergence_above_step(
+            self, mock_postcopy_enabled, mock_downtime):
+        # The adaptive downtime is above the first downtime step, which
+        # must not lower it back on the following iterations.
+        self.flags(live_migration_adaptive_convergence=True, group='libvirt')
+        fake_times = [0, 1, 2, 3, 4, 5, 6, 7, 8]
+
+        domain_info_records = [
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_NONE),
+        ] + [
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_UNBOUNDED,
+                memory_total=8 * units.Gi,
+                memory_processed=i * units.Gi,
+                memory_remaining=100 * units.Mi,
+                memory_iteration=i + 1)
+            for i in range(5)
+        ] + [
+            "thread-finish",
+            "domain-stop",
+            libvirt_guest.JobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_COMPLETED),
+        ]
+
+        self._test_live_migration_monitoring(
+            domain_info_records, fake_times, self.EXPECT_SUCCESS)
+
+        downtimes = [c[0][0] for c in mock_downtime.call_args_list]
+        # The first step is applied, then raised once by the adaptive
+        # convergence and never lowered afterwards.
+        self.assertEqual([50, 145], downtimes)
+
     @mock.patch.object(host.Host, "get_connection")
     @mock.patch.object(utils, "spawn")
     @mock.patch.object(libvirt_driver.LibvirtDriver, "_live_migration_monitor")
@@ -12822,7 +13024,8 @@ class LibvirtConnTestCase(test.NoDBTestCase,
         mock_monitor.assert_called_once_with(
             self.context, instance, guest, "fakehost",
             fake_post, fake_recover, True,
-            migrate_data, AnyEventletEvent(), disks_to_copy[0])
+            migrate_data, AnyEventletEvent(), disks_to_copy[0],
+            device_names=disks_to_copy[1])
 
     @mock.patch('os.path.exists', return_value=False)
     @mock.patch('nova.virt.libvirt.utils.create_image')
@@ -25189,6 +25392,49 @@ class LVMSnapshotTests(_BaseSnapshotTests):
         self.flags(snapshot_image_format='qcow2', group='libvirt')
         self._test_lvm_snapshot('qcow2')
 
+    @mock.patch('nova.virt.libvirt.utils.find_disk',
+                new=mock.Mock(return_value=('/dev/nova-vg/lv', 'raw')))
+    @mock.patch('nova.virt.libvirt.utils.get_disk_backing_file',
+                new=mock.Mock(return_value=None))
+    @mock.patch('nova.virt.libvirt.utils.get_disk_type_from_path',
+                new=mock.Mock(return_value='lvm'))
+    @mock.patch('nova.privsep.path.readchunk',
+                side_effect=[b'snap', b'shot', b''])
+    @mock.patch.object(libvirt_driver.imagebackend.images,
+                       'convert_image')
+    @mock.patch.object(libvirt_driver.imagebackend.lvm, 'volume_info')
+    def test_raw_streaming(self, mock_volume_info, mock_convert_image,
+                           mock_readchunk):
+        self.flags(images_type='lvm', images_volume_group='nova-vg',
+                   snapshot_streaming=True, group='libvirt')
+        uploaded = []
+        orig_update = self.image_service.update
+
+        def fake_update(context, image_id, metadata, data=None, **kwargs):
+            # The data is read like the Glance client does.
+            uploaded.append(b''.join(
+                glance_http._BaseHTTPClient._chunk_body(data)))
+            return orig_update(context, image_id, metadata, **kwargs)
+
+        with mock.patch.object(self.image_service, 'update',
+                               side_effect=fake_update):
+            self._test_snapshot(disk_format='raw')
+
+        self.assertEqual([b'snapshot'], uploaded)
+        mock_readchunk.assert_has_calls([
+            mock.call('/dev/nova-vg/lv', 0, imagebackend.SNAPSHOT_CHUNK_SIZE),
+            mock.call('/dev/nova-vg/lv', 4, imagebackend.SNAPSHOT_CHUNK_SIZE),
+            mock.call('/dev/nova-vg/lv', 8, imagebackend.SNAPSHOT_CHUNK_SIZE)])
+        mock_convert_image.assert_not_called()
+
+    @mock.patch('nova.privsep.path.readchunk')
+    def test_qcow2_streaming(self, mock_readchunk):
+        # Only raw snapshots are streamed.
+        self.flags(snapshot_image_format='qcow2', snapshot_streaming=True,
+                   group='libvirt')
+        self._test_lvm_snapshot('qcow2')
+        mock_readchunk.assert_not_called()
+
 
 class TestLibvirtMultiattach(test.NoDBTestCase):
     """Libvirt driver tests for volume multiattach support."""
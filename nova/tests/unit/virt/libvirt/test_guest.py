@@ -680,6 +680,14 @@ class GuestTestCase(test.NoDBTestCase):
                                            'destination_xml': '</xml>',
                                            'bandwidth': 2})
 
+    def test_migrate_v3_parallel_connections(self):
+        self.guest.migrate('an-uri', flags=1, migrate_uri='dest-uri',
+                           bandwidth=2, parallel_connections=4)
+        self.domain.migrateToURI3.assert_called_once_with(
+                'an-uri', flags=1, params={'migrate_uri': 'dest-uri',
+                                           'bandwidth': 2,
+                                           'parallel.connections': 4})
+
     @testtools.skipIf(not six.PY2, 'libvirt python3 bindings accept unicode')
     def test_migrate_v3_unicode(self):
         dest_xml_template = "<domain type='qemu'><name>%s</name></domain>"
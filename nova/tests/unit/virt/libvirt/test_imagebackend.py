@@ -450,6 +450,48 @@ class FlatTestCase(_ImageTestCase, test.NoDBTestCase):
                                                  imgmodel.FORMAT_RAW),
                          model)
 
+    @mock.patch.object(images, 'convert_image')
+    @mock.patch.object(imagebackend.libvirt_utils, 'copy_image')
+    def test_snapshot_extract(self, mock_copy, mock_convert):
+        image = self.image_class(self.INSTANCE, self.NAME)
+        image.driver_format = 'raw'
+
+        image.snapshot_extract('/tmp/snap', 'raw')
+
+        mock_convert.assert_called_once_with(self.PATH, '/tmp/snap', 'raw',
+                                             'raw')
+        mock_copy.assert_not_called()
+
+    @mock.patch.object(images, 'convert_image')
+    @mock.patch.object(imagebackend.libvirt_utils, 'copy_image')
+    def test_snapshot_extract_reflink(self, mock_copy, mock_convert):
+        self.flags(reflink_copies=True, group='libvirt')
+        image = self.image_class(self.INSTANCE, self.NAME)
+        image.driver_format = 'raw'
+
+        image.snapshot_extract('/tmp/snap', 'raw')
+        mock_copy.assert_called_once_with(self.PATH, '/tmp/snap')
+        mock_convert.assert_not_called()
+
+        # A conversion to another format still needs qemu-img.
+        image.snapshot_extract('/tmp/snap', 'qcow2')
+        mock_convert.assert_called_once_with(self.PATH, '/tmp/snap', 'raw',
+                                             'qcow2')
+
+    @mock.patch.object(imagebackend.libvirt_utils, 'read_file_chunks')
+    def test_snapshot_stream(self, mock_read):
+        image = self.image_class(self.INSTANCE, self.NAME)
+        image.driver_format = 'raw'
+
+        self.assertEqual(mock_read.return_value,
+                         image.snapshot_stream('raw'))
+        mock_read.assert_called_once_with(
+            self.PATH, imagebackend.SNAPSHOT_CHUNK_SIZE)
+
+        self.assertRaises(NotImplementedError, image.snapshot_stream, 'qcow2')
+        image.driver_format = 'qcow2'
+        self.assertRaises(NotImplementedError, image.snapshot_stream, 'qcow2')
+
 
 class Qcow2TestCase(_ImageTestCase, test.NoDBTestCase):
     SIZE = units.Gi
@@ -1274,6 +1316,19 @@ class EncryptedLvmTestCase(_ImageTestCase, test.NoDBTestCase):
         self.assertEqual(imgmodel.LocalBlockImage(self.PATH),
                          model)
 
+    @mock.patch('nova.privsep.path.readchunk',
+                side_effect=[b'snap', b'shot', b''])
+    def test_snapshot_stream(self, mock_readchunk):
+        image = self.image_class(self.INSTANCE, self.NAME)
+
+        self.assertRaises(NotImplementedError, image.snapshot_stream, 'qcow2')
+        self.assertEqual([b'snap', b'shot'],
+                         list(image.snapshot_stream('raw')))
+        mock_readchunk.assert_has_calls([
+            mock.call(self.PATH, 0, imagebackend.SNAPSHOT_CHUNK_SIZE),
+            mock.call(self.PATH, 4, imagebackend.SNAPSHOT_CHUNK_SIZE),
+            mock.call(self.PATH, 8, imagebackend.SNAPSHOT_CHUNK_SIZE)])
+
 
 @ddt.ddt
 class RbdTestCase(_ImageTestCase, test.NoDBTestCase):
@@ -1551,6 +1606,15 @@ class RbdTestCase(_ImageTestCase, test.NoDBTestCase):
 
         super(RbdTestCase, self)._test_libvirt_info_scsi_with_unit(disk_unit)
 
+    @mock.patch.object(rbd_utils.RBDDriver, 'read_chunks')
+    def test_snapshot_stream(self, mock_read):
+        image = self.image_class(self.INSTANCE, self.NAME)
+
+        self.assertRaises(NotImplementedError, image.snapshot_stream, 'qcow2')
+        self.assertEqual(mock_read.return_value, image.snapshot_stream('raw'))
+        mock_read.assert_called_once_with(image.rbd_name,
+                                          imagebackend.SNAPSHOT_CHUNK_SIZE)
+
     @mock.patch.object(rbd_utils.RBDDriver, "get_mon_addrs")
     def test_get_model(self, mock_mon_addrs):
         pool = "FakePool"
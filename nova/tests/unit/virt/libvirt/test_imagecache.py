@@ -18,17 +18,21 @@ import contextlib
 import os
 import time
 
+import fixtures
 import mock
 from oslo_concurrency import lockutils
 from oslo_concurrency import processutils
 from oslo_log import formatters
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils.fixture import uuidsentinel as uuids
 from six.moves import cStringIO
+import webob
 
 from nova.compute import manager as compute_manager
 import nova.conf
 from nova import context
+from nova import exception
 from nova import objects
 from nova import test
 from nova.tests.unit import fake_instance
@@ -68,6 +72,79 @@ class GetCacheFnameTestCase(test.NoDBTestCase):
         self.assertEqual(expected_cache_name, cache_name)
 
 
+class ImageCacheAppTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(ImageCacheAppTestCase, self).setUp()
+        base_dir = self.useFixture(fixtures.TempDir()).path
+        with open(os.path.join(base_dir,
+                               imagecache.get_cache_fname(uuids.image)),
+                  'wb') as f:
+            f.write(b'image data')
+        self.app = imagecache.ImageCacheApp(base_dir, 'secret')
+
+    def _get_response(self, path, token='secret', **kwargs):
+        req = webob.Request.blank(path, **kwargs)
+        if token is not None:
+            req.headers['X-Image-Cache-Token'] = token
+        return req.get_response(self.app)
+
+    def test_get(self):
+        resp = self._get_response('/images/%s' % uuids.image)
+        self.assertEqual(200, resp.status_int)
+        self.assertEqual(b'image data', resp.body)
+
+    def test_head(self):
+        resp = self._get_response('/images/%s' % uuids.image, method='HEAD')
+        self.assertEqual(200, resp.status_int)
+        self.assertEqual(10, resp.content_length)
+
+    def test_get_range(self):
+        resp = self._get_response('/images/%s' % uuids.image,
+                                  headers={'Range': 'bytes=6-9'})
+        self.assertEqual(206, resp.status_int)
+        self.assertEqual(b'data', resp.body)
+
+    def test_not_found(self):
+        for path in ('/images/%s' % uuids.other_image, '/images/..',
+                     '/images/%s' % imagecache.get_cache_fname(uuids.image),
+                     '/%s' % uuids.image):
+            self.assertEqual(404, self._get_response(path).status_int)
+
+    def test_method_not_allowed(self):
+        resp = self._get_response('/images/%s' % uuids.image, method='PUT')
+        self.assertEqual(405, resp.status_int)
+
+    def test_forbidden(self):
+        for token in (None, '', 'wrong'):
+            resp = self._get_response('/images/%s' % uuids.image, token=token)
+            self.assertEqual(403, resp.status_int)
+
+    def test_forbidden_no_token_configured(self):
+        self.app.token = None
+        resp = self._get_response('/images/%s' % uuids.image, token='')
+        self.assertEqual(403, resp.status_int)
+
+    @mock.patch('nova.wsgi.Server')
+    def test_start_peer_server(self, mock_server):
+        self.flags(instances_path='/instances')
+        self.flags(peer_transfer_listen='192.168.1.2', peer_transfer_port=1234,
+                   peer_transfer_token='secret', group='image_cache')
+        server = imagecache.start_peer_server()
+        self.assertEqual(mock_server.return_value, server)
+        mock_server.assert_called_once_with(
+            'image_cache', mock.ANY, host='192.168.1.2', port=1234)
+        app = mock_server.call_args[0][1]
+        self.assertEqual('/instances/_base', app.base_dir)
+        self.assertEqual('secret', app.token)
+        server.start.assert_called_once_with()
+
+    @mock.patch('nova.wsgi.Server')
+    def test_start_peer_server_no_token(self, mock_server):
+        self.assertRaises(exception.InvalidConfiguration,
+                          imagecache.start_peer_server)
+        mock_server.assert_not_called()
+
+
 class ImageCacheManagerTestCase(test.NoDBTestCase):
 
     def setUp(self):
@@ -236,6 +313,88 @@ class ImageCacheManagerTestCase(test.NoDBTestCase):
         self.assertRaises(processutils.ProcessExecutionError,
                           image_cache_manager._list_backing_images)
 
+    def _create_instance_disks(self, *names):
+        for name in names:
+            os.mkdir(os.path.join(CONF.instances_path, name))
+            open(os.path.join(CONF.instances_path, name, 'disk'), 'w').close()
+
+    @mock.patch('nova.virt.libvirt.utils.get_disk_backing_file',
+                return_value='e97222e91fc4241f49a7f520d1dcf446751129b3')
+    def test_list_backing_images_index(self, mock_get_backing):
+        self.flags(instances_path=self.useFixture(fixtures.TempDir()).path,
+                   state_path=self.useFixture(fixtures.TempDir()).path)
+        self.flags(backing_file_full_scan_interval=3600, group='image_cache')
+        self._create_instance_disks('instance-00000001', 'instance-00000002')
+        found = os.path.join(CONF.instances_path,
+                             CONF.image_cache.subdirectory_name,
+                             'e97222e91fc4241f49a7f520d1dcf446751129b3')
+
+        image_cache_manager = imagecache.ImageCacheManager()
+        image_cache_manager.instance_names = self.stock_instance_names
+        self.assertEqual([found], image_cache_manager._list_backing_images())
+        self.assertEqual(2, mock_get_backing.call_count)
+
+        # The backing files are read from the index, which persists across
+        # restarts.
+        mock_get_backing.reset_mock()
+        image_cache_manager = imagecache.ImageCacheManager()
+        image_cache_manager.instance_names = self.stock_instance_names
+        self.assertEqual([found], image_cache_manager._list_backing_images())
+        mock_get_backing.assert_not_called()
+
+        # Only the backing file of a replaced disk is read again.
+        disk_path = os.path.join(CONF.instances_path, 'instance-00000002',
+                                 'disk')
+        os.rename(disk_path, disk_path + '.tmp')
+        open(disk_path, 'w').close()
+        os.remove(disk_path + '.tmp')
+        self.assertEqual([found], image_cache_manager._list_backing_images())
+        mock_get_backing.assert_called_once_with(disk_path)
+
+        # The disks of deleted instances are dropped from the index.
+        image_cache_manager.instance_names = set(['instance-00000001'])
+        image_cache_manager._list_backing_images()
+        with open(image_cache_manager._get_backing_index_path()) as f:
+            index = jsonutils.loads(f.read())
+        self.assertEqual(
+            [os.path.join(CONF.instances_path, 'instance-00000001', 'disk')],
+            list(index['disks']))
+
+    @mock.patch('nova.virt.libvirt.utils.get_disk_backing_file',
+                return_value=None)
+    def test_list_backing_images_index_full_scan(self, mock_get_backing):
+        self.flags(instances_path=self.useFixture(fixtures.TempDir()).path,
+                   state_path=self.useFixture(fixtures.TempDir()).path)
+        self.flags(backing_file_full_scan_interval=3600, group='image_cache')
+        self._create_instance_disks('instance-00000001')
+
+        image_cache_manager = imagecache.ImageCacheManager()
+        image_cache_manager.instance_names = self.stock_instance_names
+        with mock.patch.object(time, 'time', return_value=1000000):
+            image_cache_manager._list_backing_images()
+            image_cache_manager._list_backing_images()
+        self.assertEqual(1, mock_get_backing.call_count)
+
+        with mock.patch.object(time, 'time', return_value=1003600):
+            image_cache_manager._list_backing_images()
+        self.assertEqual(2, mock_get_backing.call_count)
+
+    @mock.patch('nova.virt.libvirt.utils.get_disk_backing_file',
+                return_value=None)
+    def test_list_backing_images_index_corrupt(self, mock_get_backing):
+        self.flags(instances_path=self.useFixture(fixtures.TempDir()).path,
+                   state_path=self.useFixture(fixtures.TempDir()).path)
+        self.flags(backing_file_full_scan_interval=3600, group='image_cache')
+        self._create_instance_disks('instance-00000001')
+        image_cache_manager = imagecache.ImageCacheManager()
+        with open(image_cache_manager._get_backing_index_path(), 'w') as f:
+            f.write('{')
+
+        image_cache_manager.instance_names = self.stock_instance_names
+        self.assertEqual([], image_cache_manager._list_backing_images())
+        mock_get_backing.assert_called_once_with(
+            os.path.join(CONF.instances_path, 'instance-00000001', 'disk'))
+
     def test_find_base_file_nothing(self):
         self.stub_out('os.path.exists', lambda x: False)
 
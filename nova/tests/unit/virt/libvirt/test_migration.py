@@ -1114,6 +1114,20 @@ class MigrationMonitorTestCase(test.NoDBTestCase):
         self.assertEqual(newdt, 50)
         self.assertFalse(mock_dt.called)
 
+    @mock.patch.object(libvirt_guest.Guest,
+                       "migrate_configure_max_downtime")
+    def test_live_migration_update_downtime_above_step(self, mock_dt):
+        steps = [
+            (9000, 50),
+            (18000, 200),
+        ]
+        # We shouldn't lower downtime raised above the current step
+        newdt = migration.update_downtime(self.guest, self.instance,
+                                          120, steps, 11000)
+
+        self.assertEqual(newdt, 120)
+        self.assertFalse(mock_dt.called)
+
     @mock.patch.object(libvirt_guest.Guest,
                        "migrate_configure_max_downtime")
     def test_live_migration_update_downtime_step2(self, mock_dt):
@@ -1145,6 +1159,131 @@ class MigrationMonitorTestCase(test.NoDBTestCase):
         self.assertEqual(newdt, 200)
         mock_dt.assert_called_once_with(200)
 
+    def _get_estimator(self, iteration_remaining, rate=units.Gi):
+        """Feed a convergence estimator with a synthetic migration trace.
+
+        The migration transfers rate bytes per sec, and each iteration of
+        the migration starts with the given amount of memory left to
+        transfer and lasts 1 sec.
+        """
+        estimator = migration.ConvergenceEstimator()
+        elapsed = processed = 0
+        for iteration, remaining in enumerate(iteration_remaining, 1):
+            for i in range(2):
+                estimator.add_sample(elapsed, libvirt_guest.JobInfo(
+                    memory_processed=processed,
+                    memory_remaining=remaining,
+                    memory_iteration=iteration))
+                processed += rate // 2
+                remaining = max(remaining - rate // 2, 0)
+                elapsed += 0.5
+        return estimator
+
+    def test_live_migration_convergence_estimator(self):
+        estimator = self._get_estimator(
+            [8 * units.Gi, 2 * units.Gi, units.Gi, 512 * units.Mi])
+        self.assertEqual(units.Gi, estimator.transfer_rate())
+        # 512 MiB - 512 MiB transferred during the last 0.5 sec
+        self.assertEqual(0, estimator.expected_downtime())
+        self.assertTrue(estimator.is_converging())
+
+    def test_live_migration_convergence_estimator_not_converging(self):
+        estimator = self._get_estimator(
+            [8 * units.Gi, 2 * units.Gi, 2 * units.Gi, 2 * units.Gi,
+             2 * units.Gi])
+        self.assertEqual(1500, estimator.expected_downtime())
+        self.assertFalse(estimator.is_converging())
+
+    def test_live_migration_convergence_estimator_no_data(self):
+        estimator = migration.ConvergenceEstimator()
+        self.assertIsNone(estimator.transfer_rate())
+        self.assertIsNone(estimator.expected_downtime())
+        self.assertTrue(estimator.is_converging())
+
+    @mock.patch.object(libvirt_guest.Guest,
+                       "migrate_configure_max_downtime")
+    def test_live_migration_update_downtime_adaptive(self, mock_dt):
+        estimator = self._get_estimator([8 * units.Gi, 640 * units.Mi])
+        # 128 MiB are left to transfer at 1 GiB/s
+        self.assertEqual(125, estimator.expected_downtime())
+
+        newdt = migration.update_downtime_adaptive(
+            self.guest, self.instance, 50, estimator)
+
+        self.assertEqual(187, newdt)
+        mock_dt.assert_called_once_with(187)
+
+        # The downtime is never lowered.
+        mock_dt.reset_mock()
+        newdt = migration.update_downtime_adaptive(
+            self.guest, self.instance, 200, estimator)
+        self.assertEqual(200, newdt)
+        mock_dt.assert_not_called()
+
+    @mock.patch.object(libvirt_guest.Guest,
+                       "migrate_configure_max_downtime")
+    def test_live_migration_update_downtime_adaptive_max(self, mock_dt):
+        self.flags(live_migration_downtime=400, group='libvirt')
+
+        # The expected downtime of 281 ms is raised to the maximum.
+        estimator = self._get_estimator([8 * units.Gi, 800 * units.Mi])
+        newdt = migration.update_downtime_adaptive(
+            self.guest, self.instance, None, estimator)
+        self.assertEqual(400, newdt)
+        mock_dt.assert_called_once_with(400)
+
+        # The expected downtime of 1500 ms is too long.
+        mock_dt.reset_mock()
+        estimator = self._get_estimator([8 * units.Gi, 2 * units.Gi])
+        newdt = migration.update_downtime_adaptive(
+            self.guest, self.instance, 50, estimator)
+        self.assertEqual(50, newdt)
+        mock_dt.assert_not_called()
+
+    def test_live_migration_should_switch_to_postcopy(self):
+        estimator = self._get_estimator(
+            [8 * units.Gi, 2 * units.Gi, 2 * units.Gi, 2 * units.Gi,
+             2 * units.Gi])
+        self.assertTrue(migration.should_switch_to_postcopy(
+            self.instance, estimator, "running"))
+        self.assertFalse(migration.should_switch_to_postcopy(
+            self.instance, estimator, "running (post-copy)"))
+
+    def test_live_migration_should_switch_to_postcopy_converging(self):
+        estimator = self._get_estimator(
+            [8 * units.Gi, 4 * units.Gi, 2 * units.Gi, units.Gi,
+             512 * units.Mi])
+        self.assertFalse(migration.should_switch_to_postcopy(
+            self.instance, estimator, "running"))
+
+    def test_live_migration_should_switch_to_postcopy_short_downtime(self):
+        # Not converging, but can be completed within max downtime.
+        estimator = self._get_estimator(
+            [8 * units.Gi, 768 * units.Mi, 768 * units.Mi, 768 * units.Mi,
+             768 * units.Mi])
+        self.assertFalse(migration.should_switch_to_postcopy(
+            self.instance, estimator, "running"))
+
+    def test_get_disk_progress(self):
+        jobs = {
+            'vda': {'type': 2, 'bandwidth': 0, 'cur': units.Gi,
+                    'end': 4 * units.Gi},
+            # The copy of vdb has completed.
+            'vdb': {},
+        }
+
+        def fake_block_job_info(disk, flags):
+            if disk == 'vdc':
+                raise fakelibvirt.libvirtError("no job")
+            return jobs[disk]
+
+        with mock.patch.object(self.dom, "blockJobInfo",
+                               side_effect=fake_block_job_info):
+            self.assertEqual(
+                [('vda', units.Gi, 4 * units.Gi)],
+                migration.get_disk_progress(self.guest,
+                                            ['vda', 'vdb', 'vdc']))
+
     @mock.patch.object(objects.Instance, "save")
     @mock.patch.object(objects.Migration, "save")
     def test_live_migration_save_stats(self, mock_isave, mock_msave):
@@ -18,6 +18,7 @@ import os
 import tempfile
 
 import ddt
+from glanceclient.common import http as glance_http
 import mock
 import os_traits
 from oslo_concurrency import processutils
@@ -53,6 +54,13 @@ class LibvirtUtilsTestCase(test.NoDBTestCase):
         libvirt_utils.copy_image('src', 'dest')
         mock_execute.assert_called_once_with('cp', '-r', 'src', 'dest')
 
+    @mock.patch('oslo_concurrency.processutils.execute')
+    def test_copy_image_local_reflink(self, mock_execute):
+        self.flags(reflink_copies=True, group='libvirt')
+        libvirt_utils.copy_image('src', 'dest')
+        mock_execute.assert_called_once_with('cp', '-r', '--reflink=auto',
+                                             'src', 'dest')
+
     @mock.patch('nova.virt.libvirt.volume.remotefs.SshDriver.copy_file')
     def test_copy_image_remote_ssh(self, mock_rem_fs_remove):
         self.flags(remote_filesystem_transport='ssh', group='libvirt')
@@ -601,6 +609,60 @@ disk size: 4.4M
                                        dest_format='ploop',
                                        out_format='parallels')
 
+    def test_read_file_chunks(self):
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'snapshot')
+            f.flush()
+            self.assertEqual(
+                [b'sna', b'psh', b'ot'],
+                list(libvirt_utils.read_file_chunks(f.name, 3)))
+
+    def test_read_ahead(self):
+        chunks = [b'sna', b'psh', b'ot']
+        self.assertEqual(chunks,
+                         list(libvirt_utils.read_ahead(iter(chunks), 2)))
+
+    def test_read_ahead_error(self):
+        def fake_chunks():
+            yield b'sna'
+            raise test.TestingException()
+
+        data = libvirt_utils.read_ahead(fake_chunks(), 2)
+        self.assertEqual(b'sna', next(data))
+        self.assertRaises(test.TestingException, next, data)
+
+    def test_iterable_to_file_adapter(self):
+        data = libvirt_utils.IterableToFileAdapter(
+            iter([b'sna', b'', b'pshot']))
+        self.assertEqual(b'sn', data.read(2))
+        self.assertEqual(b'a', data.read(2))
+        self.assertEqual(b'psh', data.read(3))
+        self.assertEqual(b'ot', data.read())
+        self.assertEqual(b'', data.read(2))
+
+    def test_iterable_to_file_adapter_chunk_body(self):
+        # The Glance client reads the data to upload in chunks.
+        chunks = [b'sna', b'psh', b'ot']
+        data = libvirt_utils.IterableToFileAdapter(
+            libvirt_utils.read_ahead(iter(chunks), 2))
+        self.assertEqual(chunks,
+                         list(glance_http._BaseHTTPClient._chunk_body(data)))
+
+    def test_iterable_to_file_adapter_close(self):
+        closed = []
+
+        def fake_chunks():
+            try:
+                yield b'sna'
+                yield b'pshot'
+            finally:
+                closed.append(True)
+
+        data = libvirt_utils.IterableToFileAdapter(fake_chunks())
+        self.assertEqual(b'sna', data.read(3))
+        data.close()
+        self.assertEqual([True], closed)
+
     def test_load_file(self):
         dst_fd, dst_path = tempfile.mkstemp()
         try:
@@ -697,6 +759,9 @@ disk size: 4.4M
         def fake_rm_on_error(path, remove=None):
             self.executes.append(('rm', '-f', path))
 
+        def fake_fsync(path):
+            self.executes.append(('sync', path))
+
         def fake_qemu_img_info(path):
             class FakeImgInfo(object):
                 pass
@@ -721,6 +786,7 @@ disk size: 4.4M
         self.stub_out('os.rename', fake_rename)
         self.stub_out('os.unlink', fake_unlink)
         self.stub_out('nova.virt.images.fetch', lambda *_, **__: None)
+        self.stub_out('nova.virt.images._fsync', fake_fsync)
         self.stub_out('nova.virt.images.qemu_img_info', fake_qemu_img_info)
         self.stub_out('oslo_utils.fileutils.delete_if_exists',
                       fake_rm_on_error)
@@ -749,7 +815,8 @@ disk size: 4.4M
 
         target = 't.raw'
         self.executes = []
-        expected_commands = [('mv', 't.raw.part', 't.raw')]
+        expected_commands = [('sync', 't.raw.part'),
+                             ('mv', 't.raw.part', 't.raw')]
         images.fetch_to_raw(context, image_id, target)
         self.assertEqual(self.executes, expected_commands)
         mock_convert_image.assert_not_called()
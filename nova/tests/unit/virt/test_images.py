@@ -104,6 +104,44 @@ class QemuTestCase(test.NoDBTestCase):
                                images.fetch_to_raw,
                                None, 'href123', '/no/path')
 
+    @mock.patch('os.rename')
+    @mock.patch.object(images, '_fsync')
+    @mock.patch.object(images, 'qemu_img_info')
+    @mock.patch.object(images, 'fetch')
+    def test_fetch_to_raw_raw_image_synced(self, mock_fetch, mock_info,
+                                           mock_fsync, mock_rename):
+        mock_info.return_value.backing_file = None
+        mock_info.return_value.file_format = 'raw'
+        images.fetch_to_raw(None, 'href123', '/no/path')
+        mock_fetch.assert_called_once_with(
+            None, 'href123', '/no/path.part', None, sync=False)
+        mock_fsync.assert_called_once_with('/no/path.part')
+        mock_rename.assert_called_once_with('/no/path.part', '/no/path')
+
+    @mock.patch('os.rename')
+    @mock.patch('os.unlink')
+    @mock.patch.object(images, '_fsync')
+    @mock.patch.object(images, 'convert_image')
+    @mock.patch.object(images, 'qemu_img_info')
+    @mock.patch.object(images, 'fetch')
+    def test_fetch_to_raw_converted_image_not_synced(
+            self, mock_fetch, mock_info, mock_convert, mock_fsync,
+            mock_unlink, mock_rename):
+        self.flags(force_raw_images=True)
+        qcow2_info = mock.Mock(backing_file=None, file_format='qcow2')
+        raw_info = mock.Mock(backing_file=None, file_format='raw')
+        mock_info.side_effect = [qcow2_info, raw_info]
+        images.fetch_to_raw(None, 'href123', '/no/path')
+        mock_fetch.assert_called_once_with(
+            None, 'href123', '/no/path.part', None, sync=False)
+        mock_convert.assert_called_once_with(
+            '/no/path.part', '/no/path.converted', 'qcow2', 'raw')
+        # qemu-img flushes the converted image itself and the downloaded
+        # image is thrown away, so neither needs to be synced.
+        mock_fsync.assert_not_called()
+        mock_unlink.assert_called_once_with('/no/path.part')
+        mock_rename.assert_called_once_with('/no/path.converted', '/no/path')
+
     @mock.patch.object(compute_utils, 'disk_ops_semaphore')
     @mock.patch('nova.privsep.utils.supports_direct_io', return_value=True)
     @mock.patch('oslo_concurrency.processutils.execute')
@@ -25,6 +25,7 @@ from oslo_concurrency import processutils
 from oslo_log import log as logging
 from oslo_utils import fileutils
 from oslo_utils import imageutils
+from oslo_utils import timeutils
 
 from nova.compute import utils as compute_utils
 import nova.conf
@@ -102,20 +103,43 @@ def _convert_image(source, dest, in_format, out_format, run_as_root,
 
 
 #下载image到path
-def fetch(context, image_href, path, trusted_certs=None):
+def fetch(context, image_href, path, trusted_certs=None, sync=True):
+    """Download an image to a local path.
+
+    :param sync: Whether to flush the downloaded image to persistent storage
+                 before returning. Callers which only use the downloaded file
+                 as the source of a conversion can skip this.
+    """
     with fileutils.remove_path_on_error(path):
         with compute_utils.disk_ops_semaphore:
             IMAGE_API.download(context, image_href, dest_path=path,
-                               trusted_certs=trusted_certs)
+                               trusted_certs=trusted_certs, sync=sync)
 
 
 def get_info(context, image_href):
     return IMAGE_API.get(context, image_href)
 
 
+def _fsync(path):
+    """Flush the data of a file to persistent storage."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
 def fetch_to_raw(context, image_href, path, trusted_certs=None):
     path_tmp = "%s.part" % path
-    fetch(context, image_href, path_tmp, trusted_certs)
+    # NOTE: The downloaded file is only synced to persistent storage once we
+    # know whether it is used as is. When it is converted to raw the staging
+    # file is thrown away, and qemu-img flushes the converted image itself,
+    # so syncing the download would only double the writes to the disk.
+    timer = timeutils.StopWatch()
+    timer.start()
+    fetch(context, image_href, path_tmp, trusted_certs, sync=False)
+    LOG.info("Downloaded image %(image)s in %(elapsed).2f seconds",
+             {'image': image_href, 'elapsed': timer.elapsed()})
 
     with fileutils.remove_path_on_error(path_tmp):
         data = qemu_img_info(path_tmp)
@@ -136,6 +160,7 @@ def fetch_to_raw(context, image_href, path, trusted_certs=None):
             staged = "%s.converted" % path
             LOG.debug("%s was %s, converting to raw", image_href, fmt)
             with fileutils.remove_path_on_error(staged):
+                timer.restart()
                 try:
                     convert_image(path_tmp, staged, fmt, 'raw')
                 except exception.ImageUnacceptable as exp:
@@ -152,6 +177,14 @@ def fetch_to_raw(context, image_href, path, trusted_certs=None):
                         reason=_("Converted to raw, but format is now %s") %
                         data.file_format)
 
+                LOG.info("Converted image %(image)s from %(fmt)s to raw in "
+                         "%(elapsed).2f seconds",
+                         {'image': image_href, 'fmt': fmt,
+                          'elapsed': timer.elapsed()})
                 os.rename(staged, path)
         else:
+            # Ensure that the image is pushed all the way down to persistent
+            # storage before it is put in place, so that a subsequent host
+            # crash does not leave instances using a corrupt backing file.
+            _fsync(path_tmp)
             os.rename(path_tmp, path)
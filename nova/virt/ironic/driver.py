@@ -31,6 +31,7 @@ from oslo_serialization import jsonutils
 from oslo_service import loopingcall
 from oslo_utils import excutils
 from oslo_utils import importutils
+from oslo_utils import timeutils
 import six
 import six.moves.urllib.parse as urlparse
 from tooz import hashring as hash_ring
@@ -83,6 +84,14 @@ _NODE_FIELDS = ('uuid', 'power_state', 'target_power_state', 'provision_state',
                 'target_provision_state', 'last_error', 'maintenance',
                 'properties', 'instance_uuid', 'traits', 'resource_class')
 
+# Fields of the nodes listed to refresh the node cache when it is refreshed
+# incrementally, see _refresh_node_list.
+_NODE_CACHE_FIELDS = _NODE_FIELDS + ('updated_at',)
+
+# Maximum number of nodes retrieved one by one when the node cache is
+# refreshed incrementally, above which all nodes are listed instead.
+_NODE_CACHE_MAX_CHANGED = 50
+
 # Console state checking interval in seconds
 _CONSOLE_STATE_CHECKING_INTERVAL = 1
 
@@ -91,6 +100,20 @@ _CONSOLE_STATE_CHECKING_INTERVAL = 1
 _HASH_RING_PARTITIONS = 2 ** 5
 
 
+def _add_legacy_node_attributes(node):
+    # TODO(dustinc): Update all usages to use SDK attributes then stop
+    #  copying values to PythonClient attributes.
+    # NOTE(dustinc): There are usages that filter out these fields
+    #  which forces us to check for the attributes.
+    if hasattr(node, "id"):
+        node.uuid = node.id
+    if hasattr(node, "instance_id"):
+        node.instance_uuid = node.instance_id
+    if hasattr(node, "is_maintenance"):
+        node.maintenance = node.is_maintenance
+    return node
+
+
 def map_power_state(state):
     try:
         return _POWER_STATE_MAP[state]
@@ -195,6 +218,16 @@ class IronicDriver(virt_driver.ComputeDriver):
 
         self.node_cache = {}
         self.node_cache_time = 0
+        # The manageable nodes listed from Ironic to build node_cache from,
+        # when the cache is refreshed incrementally.
+        self._node_list = {}
+        self._node_list_time = 0
+        # Whether nodes are mapped to this service on the hash ring, which
+        # only changes when the members of the hash ring change.
+        self._hash_ring_members = None
+        self._hash_ring_owned = {}
+        # The hash ring members when node_cache was last refreshed.
+        self._node_cache_members = None
         self.servicegroup_api = servicegroup.API()
 
         self.ironicclient = client_wrapper.IronicClientWrapper()
@@ -665,20 +698,8 @@ class IronicDriver(virt_driver.ComputeDriver):
         if return_generator:
             return node_generator
         else:
-            node_list = []
-            # TODO(dustinc): Update all usages to use SDK attributes then stop
-            #  copying values to PythonClient attributes.
-            for node in node_generator:
-                # NOTE(dustinc): There are usages that filter out these fields
-                #  which forces us to check for the attributes.
-                if hasattr(node, "id"):
-                    node.uuid = node.id
-                if hasattr(node, "instance_id"):
-                    node.instance_uuid = node.instance_id
-                if hasattr(node, "is_maintenance"):
-                    node.maintenance = node.is_maintenance
-                node_list.append(node)
-            return node_list
+            return [_add_legacy_node_attributes(node)
+                    for node in node_generator]
 
     def list_instances(self):
         """Return the names of all the instances provisioned.
@@ -764,34 +785,47 @@ class IronicDriver(virt_driver.ComputeDriver):
         # TODO(jroll) optimize this to limit to the peer_list
         service_list = objects.ServiceList.get_all_computes_by_hv_type(
             ctxt, self._get_hypervisor_type())
-        services = set()
-        for svc in service_list:
-            # NOTE(jroll) if peer_list is None, we aren't partitioning by
-            # conductor group, so we check all compute services for liveness.
-            # if we have a peer_list, don't check liveness for compute
-            # services that aren't in the list.
-            if peer_list is None or svc.host in peer_list:
-                is_up = self.servicegroup_api.service_is_up(svc)
-                if is_up:
-                    services.add(svc.host.lower())
+        # NOTE(jroll) if peer_list is None, we aren't partitioning by
+        # conductor group, so we check all compute services for liveness.
+        # if we have a peer_list, don't check liveness for compute
+        # services that aren't in the list.
+        candidates = [svc for svc in service_list
+                      if peer_list is None or svc.host in peer_list]
+        # NOTE: Check the liveness of all of the candidates at once rather
+        # than making a servicegroup call per compute service.
+        are_up = self.servicegroup_api.services_are_up(candidates)
+        services = set(svc.host.lower()
+                       for svc, is_up in zip(candidates, are_up) if is_up)
         # NOTE(jroll): always make sure this service is in the list, because
         # only services that have something registered in the compute_nodes
         # table will be here so far, and we might be brand new.
         services.add(CONF.host.lower())
 
-        self.hash_ring = hash_ring.HashRing(services,
-                                            partitions=_HASH_RING_PARTITIONS)
+        # NOTE: The hash ring only needs to be rebuilt, and nodes looked up
+        # in it again, when compute services were added to or removed from
+        # it.
+        if services != self._hash_ring_members:
+            self.hash_ring = hash_ring.HashRing(
+                services, partitions=_HASH_RING_PARTITIONS)
+            self._hash_ring_members = services
+            self._hash_ring_owned = {}
         LOG.debug('Hash ring members are %s', services)
 
-    def _refresh_cache(self):
-        ctxt = nova_context.get_admin_context()
-        self._refresh_hash_ring(ctxt)
-        instances = objects.InstanceList.get_uuids_by_host(ctxt, CONF.host)
-        node_cache = {}
+    def _is_mapped_to_host(self, node_uuid):
+        """Whether a node is mapped to this service on the hash ring."""
+        try:
+            return self._hash_ring_owned[node_uuid]
+        except KeyError:
+            owned = (CONF.host.lower() in
+                     self.hash_ring.get_nodes(node_uuid.encode('utf-8')))
+            self._hash_ring_owned[node_uuid] = owned
+            return owned
 
-        def _get_node_list(**kwargs):
-            return self._get_node_list(fields=_NODE_FIELDS, **kwargs)
+    def _get_manageable_node_list(self, **kwargs):
+        """Return the nodes which can be managed by this service.
 
+        :param kwargs: Parameters for _get_node_list.
+        """
         # NOTE(jroll) if partition_key is set, we need to limit nodes that
         # can be managed to nodes that have a matching conductor_group
         # attribute. If the API isn't new enough to support conductor groups,
@@ -801,7 +835,8 @@ class IronicDriver(virt_driver.ComputeDriver):
         if partition_key is not None:
             try:
                 self._can_send_version(min_version='1.46')
-                nodes = _get_node_list(conductor_group=partition_key)
+                nodes = self._get_node_list(conductor_group=partition_key,
+                                            **kwargs)
                 LOG.debug('Limiting manageable ironic nodes to conductor '
                           'group %s', partition_key)
             except exception.IronicAPIVersionNotAvailable:
@@ -809,11 +844,104 @@ class IronicDriver(virt_driver.ComputeDriver):
                           'available to filter nodes by conductor group. '
                           'All nodes will be eligible to be managed by '
                           'this compute service.')
-                nodes = _get_node_list()
+                nodes = self._get_node_list(**kwargs)
         else:
-            nodes = _get_node_list()
+            nodes = self._get_node_list(**kwargs)
+        return nodes
+
+    def _get_changed_node_list(self):
+        """Return the manageable nodes which changed since they were listed.
 
-        for node in nodes:
+        Only the UUID and update time of the nodes are listed, and the nodes
+        which were added or updated since they were last listed are then
+        retrieved one by one, unless there are too many of them in which case
+        all nodes are listed again. Nodes which were removed are removed from
+        the list of nodes.
+
+        :returns: The nodes which were added or updated, or None if all nodes
+                  need to be listed again.
+        """
+        changed = []
+        listed = set()
+        for node in self._get_manageable_node_list(
+                return_generator=True, fields=('uuid', 'updated_at')):
+            listed.add(node.id)
+            cached = self._node_list.get(node.id)
+            # NOTE: Ironic records the update time of nodes with a precision
+            # of a second, so an update following another one within the
+            # same second is only seen by the next full refresh.
+            if cached is None or cached.updated_at != node.updated_at:
+                changed.append(node.id)
+                if len(changed) > _NODE_CACHE_MAX_CHANGED:
+                    return None
+
+        for node_uuid in set(self._node_list) - listed:
+            del self._node_list[node_uuid]
+
+        nodes = []
+        for node_uuid in changed:
+            try:
+                node = self.ironic_connection.get_node(
+                    node_uuid, fields=_NODE_CACHE_FIELDS)
+            except sdk_exc.ResourceNotFound:
+                self._node_list.pop(node_uuid, None)
+                continue
+            nodes.append(_add_legacy_node_attributes(node))
+        return nodes
+
+    def _refresh_node_list(self):
+        """Refresh the list of manageable nodes the cache is built from.
+
+        :returns: The list of nodes retrieved from Ironic.
+        """
+        full_refresh_interval = CONF.ironic.node_cache_full_refresh_interval
+        nodes = None
+        if (full_refresh_interval and
+                time.time() - self._node_list_time < full_refresh_interval):
+            nodes = self._get_changed_node_list()
+            if nodes is not None:
+                for node in nodes:
+                    self._node_list[node.uuid] = node
+
+        if nodes is None:
+            fields = (_NODE_CACHE_FIELDS if full_refresh_interval else
+                      _NODE_FIELDS)
+            nodes = self._get_manageable_node_list(fields=fields)
+            self._node_list = {node.uuid: node for node in nodes}
+            self._node_list_time = time.time()
+        return nodes
+
+    def _log_rebalanced_nodes(self, node_cache):
+        """Log the nodes which moved to or from this service.
+
+        :param node_cache: The node cache built after the hash ring members
+                           changed.
+        """
+        # NOTE: Nodes which are no longer listed were removed from Ironic
+        # rather than moved.
+        moved_in = [node_uuid for node_uuid in node_cache
+                    if node_uuid not in self.node_cache]
+        moved_out = [node_uuid for node_uuid in self.node_cache
+                     if node_uuid not in node_cache and
+                     node_uuid in self._node_list]
+        if moved_in or moved_out:
+            LOG.info('Hash ring members changed, %(in)d node(s) moved to '
+                     'this service: %(moved_in)s, %(out)d node(s) moved '
+                     'away from it: %(moved_out)s',
+                     {'in': len(moved_in), 'moved_in': moved_in,
+                      'out': len(moved_out), 'moved_out': moved_out})
+
+    def _refresh_cache(self):
+        timer = timeutils.StopWatch()
+        timer.start()
+        ctxt = nova_context.get_admin_context()
+        self._refresh_hash_ring(ctxt)
+        instances = objects.InstanceList.get_uuids_by_host(ctxt, CONF.host)
+        node_cache = {}
+
+        nodes = self._refresh_node_list()
+
+        for node in self._node_list.values():
             # NOTE(jroll): we always manage the nodes for instances we manage
             if node.instance_uuid in instances:
                 node_cache[node.uuid] = node
@@ -825,10 +953,19 @@ class IronicDriver(virt_driver.ComputeDriver):
             # nova while the service was down, and not yet reaped, will not be
             # reported until the periodic task cleans it up.
             elif (node.instance_uuid is None and
-                  CONF.host.lower() in
-                  self.hash_ring.get_nodes(node.uuid.encode('utf-8'))):
+                  self._is_mapped_to_host(node.uuid)):
                 node_cache[node.uuid] = node
 
+        LOG.debug('Refreshed the node cache in %(time).3f seconds: '
+                  '%(fetched)d node(s) retrieved, %(cached)d node(s) cached',
+                  {'time': timer.elapsed(), 'fetched': len(nodes),
+                   'cached': len(node_cache)})
+
+        if (self._node_cache_members is not None and
+                self._node_cache_members != self._hash_ring_members):
+            self._log_rebalanced_nodes(node_cache)
+        self._node_cache_members = self._hash_ring_members
+
         self.node_cache = node_cache
         self.node_cache_time = time.time()
         # For Pike, we need to ensure that all instances have their flavor
@@ -1322,6 +1459,7 @@ class IronicDriver(virt_driver.ComputeDriver):
             # update_usages resource tracker call that will happen next
             # has the up-to-date node view.
             self.node_cache.pop(node.uuid, None)
+            self._node_list.pop(node.uuid, None)
             LOG.debug('Removed node %(uuid)s from node cache.',
                       {'uuid': node.uuid})
         _sync_remove_cache_entry()
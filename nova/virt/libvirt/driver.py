@@ -266,6 +266,9 @@ MIN_LIBVIRT_FILE_BACKED_DISCARD_VERSION = (4, 4, 0)
 MIN_LIBVIRT_NATIVE_TLS_VERSION = (4, 4, 0)
 MIN_QEMU_NATIVE_TLS_VERSION = (2, 11, 0)
 
+MIN_LIBVIRT_PARALLEL_MIGRATION_VERSION = (5, 2, 0)
+MIN_QEMU_PARALLEL_MIGRATION_VERSION = (4, 0, 0)
+
 # If the host has this libvirt version, then we skip the retry loop of
 # instance destroy() call, as libvirt itself increased the wait time
 # before the SIGKILL signal takes effect.
@@ -359,6 +362,7 @@ class LibvirtDriver(driver.ComputeDriver):
 
         self._disk_cachemode = None
         self.image_cache_manager = imagecache.ImageCacheManager()
+        self._image_cache_server = None
         self.image_backend = imagebackend.Backend(CONF.use_cow_images)
 
         self.disk_cachemodes = {}
@@ -728,6 +732,9 @@ class LibvirtDriver(driver.ComputeDriver):
 
         self._check_cpu_compatibility()
 
+        if CONF.image_cache.peer_transfer:
+            self._image_cache_server = imagecache.start_peer_server()
+
     def _check_cpu_compatibility(self):
         mode = CONF.libvirt.cpu_mode
         models = CONF.libvirt.cpu_models
@@ -980,6 +987,39 @@ class LibvirtDriver(driver.ComputeDriver):
             migration_flags |= libvirt.VIR_MIGRATE_AUTO_CONVERGE
         return migration_flags
 
+    def _is_parallel_migration_available(self):
+        return self._host.has_min_version(
+            MIN_LIBVIRT_PARALLEL_MIGRATION_VERSION,
+            MIN_QEMU_PARALLEL_MIGRATION_VERSION)
+
+    def _handle_live_migration_parallel(self, migration_flags):
+        if CONF.libvirt.live_migration_parallel_connections <= 1:
+            return migration_flags
+        if migration_flags & libvirt.VIR_MIGRATE_TUNNELLED != 0:
+            LOG.warning('The live_migration_parallel_connections option is '
+                        'ignored for tunnelled live migrations.')
+        elif self._is_post_copy_enabled(migration_flags):
+            LOG.warning('The live_migration_permit_post_copy is set to '
+                        'True so parallel live migration connections will '
+                        'not be in use.')
+        elif not self._is_parallel_migration_available():
+            LOG.warning('Parallel live migration connections require '
+                        'libvirt %(libvirt)s and QEMU %(qemu)s or later, '
+                        'so they will not be in use.',
+                        {'libvirt': libvirt_utils.version_to_string(
+                            MIN_LIBVIRT_PARALLEL_MIGRATION_VERSION),
+                         'qemu': libvirt_utils.version_to_string(
+                            MIN_QEMU_PARALLEL_MIGRATION_VERSION)})
+        elif getattr(libvirt, 'VIR_MIGRATE_PARALLEL', None) is None:
+            # NOTE: The libvirt-python bindings may be older than the
+            # libvirt daemon and not define the flag.
+            LOG.warning('Parallel live migration connections require '
+                        'libvirt-python bindings which define '
+                        'VIR_MIGRATE_PARALLEL, so they will not be in use.')
+        else:
+            migration_flags |= libvirt.VIR_MIGRATE_PARALLEL
+        return migration_flags
+
     def _parse_migration_flags(self):
         (live_migration_flags,
             block_migration_flags) = self._prepare_migration_flags()
@@ -1004,6 +1044,11 @@ class LibvirtDriver(driver.ComputeDriver):
         block_migration_flags = self._handle_live_migration_auto_converge(
             block_migration_flags)
 
+        live_migration_flags = self._handle_live_migration_parallel(
+            live_migration_flags)
+        block_migration_flags = self._handle_live_migration_parallel(
+            block_migration_flags)
+
         self._live_migration_flags = live_migration_flags
         self._block_migration_flags = block_migration_flags
 
@@ -2374,6 +2419,14 @@ class LibvirtDriver(driver.ComputeDriver):
                 self._prepare_domain_for_snapshot(context, live_snapshot,
                                                   state, instance)
 
+            if (CONF.libvirt.snapshot_streaming and not live_snapshot and
+                    self._stream_snapshot(context, instance, root_disk,
+                                          image_id, metadata, image_format,
+                                          virt_dom, state,
+                                          update_task_state)):
+                LOG.info("Snapshot image upload complete", instance=instance)
+                return
+
             snapshot_directory = CONF.libvirt.snapshots_directory
             fileutils.ensure_tree(snapshot_directory)
             with utils.tempdir(dir=snapshot_directory) as tmpdir:
@@ -2429,6 +2482,50 @@ class LibvirtDriver(driver.ComputeDriver):
 
         LOG.info("Snapshot image upload complete", instance=instance)
 
+    def _stream_snapshot(self, context, instance, root_disk, image_id,
+                         metadata, image_format, virt_dom, state,
+                         update_task_state):
+        """Upload a cold snapshot of the root disk while it is read.
+
+        :returns: False if the image backend of the root disk cannot stream
+                  a snapshot in image_format, True once the snapshot is
+                  uploaded.
+        """
+        try:
+            chunks = root_disk.snapshot_stream(image_format)
+        except NotImplementedError as e:
+            LOG.debug('Unable to stream snapshot: %s', e, instance=instance)
+            return False
+
+        def _progress(chunks):
+            uploaded = 0
+            next_report = units.Gi
+            for chunk in chunks:
+                yield chunk
+                uploaded += len(chunk)
+                if uploaded >= next_report:
+                    LOG.info('Uploaded %d MiB of snapshot',
+                             uploaded // units.Mi, instance=instance)
+                    next_report += units.Gi
+
+        LOG.info("Beginning streamed snapshot upload", instance=instance)
+        update_task_state(task_state=task_states.IMAGE_UPLOADING,
+                          expected_state=task_states.IMAGE_PENDING_UPLOAD)
+        try:
+            # NOTE: The disk is read while the previous chunks are uploaded.
+            # The Glance client reads the data to upload like a file.
+            data = libvirt_utils.IterableToFileAdapter(
+                _progress(libvirt_utils.read_ahead(chunks, 4)))
+            try:
+                # execute operation with disk concurrency semaphore
+                with compute_utils.disk_ops_semaphore:
+                    self._image_api.update(context, image_id, metadata, data)
+            finally:
+                data.close()
+        finally:
+            self._snapshot_domain(context, False, virt_dom, state, instance)
+        return True
+
     def _prepare_domain_for_snapshot(self, context, live_snapshot, state,
                                      instance):
         # NOTE(dkang): managedSave does not work for LXC
@@ -8601,13 +8698,19 @@ class LibvirtDriver(driver.ComputeDriver):
             if CONF.serial_console.enabled:
                 serial_ports = list(self._get_serial_ports_from_guest(guest))
 
+            parallel_connections = None
+            if self._is_parallel_migration_enabled(migration_flags):
+                parallel_connections = (
+                    CONF.libvirt.live_migration_parallel_connections)
+
             LOG.debug("About to invoke the migrate API", instance=instance)
             guest.migrate(self._live_migration_uri(dest),
                           migrate_uri=migrate_uri,
                           flags=migration_flags,
                           migrate_disks=device_names,
                           destination_xml=new_xml_str,
-                          bandwidth=CONF.libvirt.live_migration_bandwidth)
+                          bandwidth=CONF.libvirt.live_migration_bandwidth,
+                          parallel_connections=parallel_connections)
             LOG.debug("Migrate API has completed", instance=instance)
 
             for hostname, port in serial_ports:
@@ -8746,7 +8849,7 @@ class LibvirtDriver(driver.ComputeDriver):
                                 dest, post_method,
                                 recover_method, block_migration,
                                 migrate_data, finish_event,
-                                disk_paths):
+                                disk_paths, device_names=None):
         on_migration_failure = deque()
         data_gb = self._live_migration_data_gb(instance, disk_paths)
         downtime_steps = list(libvirt_migrate.downtime_steps(data_gb))
@@ -8759,6 +8862,7 @@ class LibvirtDriver(driver.ComputeDriver):
         n = 0
         start = time.time()
         is_post_copy_enabled = self._is_post_copy_enabled(migration_flags)
+        estimator = libvirt_migrate.ConvergenceEstimator()
         while True:
             info = guest.get_job_info()
 
@@ -8821,6 +8925,16 @@ class LibvirtDriver(driver.ComputeDriver):
                     guest, instance, curdowntime,
                     downtime_steps, elapsed)
 
+                if CONF.libvirt.live_migration_adaptive_convergence:
+                    estimator.add_sample(elapsed, info)
+                    curdowntime = libvirt_migrate.update_downtime_adaptive(
+                        guest, instance, curdowntime, estimator)
+                    if (is_post_copy_enabled and
+                            libvirt_migrate.should_switch_to_postcopy(
+                                instance, estimator, migration.status)):
+                        libvirt_migrate.trigger_postcopy_switch(
+                            guest, instance, migration)
+
                 # We loop every 500ms, so don't log on every
                 # iteration to avoid spamming logs for long
                 # running migrations. Just once every 5 secs
@@ -8875,6 +8989,18 @@ class LibvirtDriver(driver.ComputeDriver):
                         "remaining_disk": info.disk_remaining,
                         "total_disk": info.disk_total}, instance=instance)
 
+                    if device_names and info.disk_remaining != 0:
+                        for dev, cur, end in (
+                                libvirt_migrate.get_disk_progress(
+                                    guest, device_names)):
+                            lg("Disk %(dev)s %(remaining)d%% remaining "
+                               "(bytes processed=%(processed)d, "
+                               "total=%(total)d).",
+                               {"dev": dev,
+                                "remaining": round((end - cur) * 100 / end),
+                                "processed": cur, "total": end},
+                               instance=instance)
+
                 n = n + 1
             elif info.type == libvirt.VIR_DOMAIN_JOB_COMPLETED:
                 # Migration is all done
@@ -8970,7 +9096,8 @@ class LibvirtDriver(driver.ComputeDriver):
             self._live_migration_monitor(context, instance, guest, dest,
                                          post_method, recover_method,
                                          block_migration, migrate_data,
-                                         finish_event, disk_paths)
+                                         finish_event, disk_paths,
+                                         device_names=device_names)
         except Exception as ex:
             LOG.warning("Error monitoring migration: %(ex)s",
                         {"ex": ex}, instance=instance, exc_info=True)
@@ -8982,6 +9109,13 @@ class LibvirtDriver(driver.ComputeDriver):
     def _is_post_copy_enabled(self, migration_flags):
         return (migration_flags & libvirt.VIR_MIGRATE_POSTCOPY) != 0
 
+    def _is_parallel_migration_enabled(self, migration_flags):
+        # NOTE: VIR_MIGRATE_PARALLEL is only set once the host has been
+        # checked to support it, older libvirt python bindings do not
+        # define it.
+        return (migration_flags &
+                getattr(libvirt, 'VIR_MIGRATE_PARALLEL', 0)) != 0
+
     def live_migration_force_complete(self, instance):
         try:
             self.active_migrations[instance.uuid].append('force-complete')
@@ -617,7 +617,8 @@ class Guest(object):
         self._domain.suspend()
 
     def migrate(self, destination, migrate_uri=None, migrate_disks=None,
-                destination_xml=None, flags=0, bandwidth=0):
+                destination_xml=None, flags=0, bandwidth=0,
+                parallel_connections=None):
         """Migrate guest object from its current host to the destination
 
         :param destination: URI of host destination where guest will be migrate
@@ -645,7 +646,11 @@ class Guest(object):
                                      memory to the destination host
            VIR_MIGRATE_POSTCOPY Tell libvirt to enable post-copy migration
            VIR_MIGRATE_TLS Use QEMU-native TLS
+           VIR_MIGRATE_PARALLEL Send memory pages over multiple
+                                connections
         :param bandwidth: The maximum bandwidth in MiB/s
+        :param parallel_connections: The number of connections used by
+                                     VIR_MIGRATE_PARALLEL
         """
         params = {}
         # In migrateToURI3 these parameters are extracted from the
@@ -658,6 +663,8 @@ class Guest(object):
             params['migrate_disks'] = migrate_disks
         if migrate_uri:
             params['migrate_uri'] = migrate_uri
+        if parallel_connections:
+            params['parallel.connections'] = parallel_connections
 
         # Due to a quirk in the libvirt python bindings,
         # VIR_MIGRATE_NON_SHARED_INC with an empty migrate_disks is
@@ -52,6 +52,9 @@ CONF = nova.conf.CONF
 LOG = logging.getLogger(__name__)
 IMAGE_API = glance.API()
 
+# Size of the chunks in which streamed snapshots are read.
+SNAPSHOT_CHUNK_SIZE = 8 * units.Mi
+
 
 # NOTE(neiljerram): Don't worry if this fails. This sometimes happens, with
 # EACCES (Permission Denied), when the base file is on an NFS client
@@ -460,6 +463,22 @@ class Image(object):
         """
         pass
 
+    def snapshot_stream(self, out_format):
+        """Read a snapshot of the image without extracting it to a file.
+
+        This is used during cold (offline) snapshots in place of
+        snapshot_extract() to upload the snapshot while it is read.
+
+        The implementation of this method is optional and therefore is
+        not an abstractmethod.
+
+        :param out_format: The image snapshot format.
+        :raises: NotImplementedError if the snapshot cannot be streamed in
+                 the specified format
+        :returns: An iterator over the chunks of data of the snapshot
+        """
+        raise NotImplementedError(_('snapshot_stream() is not implemented'))
+
     def _get_lock_name(self, base):
         """Get an image's name of a base file."""
         return os.path.split(base)[-1]
@@ -595,7 +614,20 @@ class Flat(Image):
         disk.extend(image, size)
 
     def snapshot_extract(self, target, out_format):
-        images.convert_image(self.path, target, self.driver_format, out_format)
+        if (CONF.libvirt.reflink_copies and
+                self.driver_format == out_format == imgmodel.FORMAT_RAW):
+            # NOTE: Converting a raw image to raw is a plain copy, which can
+            # be done by cloning the image.
+            libvirt_utils.copy_image(self.path, target)
+        else:
+            images.convert_image(self.path, target, self.driver_format,
+                                 out_format)
+
+    def snapshot_stream(self, out_format):
+        if not self.driver_format == out_format == imgmodel.FORMAT_RAW:
+            raise NotImplementedError(_('Only raw snapshots of raw images '
+                                        'can be streamed'))
+        return libvirt_utils.read_file_chunks(self.path, SNAPSHOT_CHUNK_SIZE)
 
     @staticmethod
     def is_file_in_instance_path():
@@ -823,6 +855,22 @@ class Lvm(Image):
         images.convert_image(self.path, target, self.driver_format,
                              out_format, run_as_root=True)
 
+    def snapshot_stream(self, out_format):
+        if out_format != imgmodel.FORMAT_RAW:
+            raise NotImplementedError(_('Only raw snapshots can be streamed'))
+        return self._read_chunks()
+
+    def _read_chunks(self):
+        # NOTE: Logical volumes are only readable by root.
+        offset = 0
+        while True:
+            chunk = nova.privsep.path.readchunk(self.path, offset,
+                                                SNAPSHOT_CHUNK_SIZE)
+            if not chunk:
+                return
+            offset += len(chunk)
+            yield chunk
+
     def get_model(self, connection):
         return imgmodel.LocalBlockImage(self.path)
 
@@ -954,6 +1002,11 @@ class Rbd(Image):
     def snapshot_extract(self, target, out_format):
         images.convert_image(self.path, target, 'raw', out_format)
 
+    def snapshot_stream(self, out_format):
+        if out_format != imgmodel.FORMAT_RAW:
+            raise NotImplementedError(_('Only raw snapshots can be streamed'))
+        return self.driver.read_chunks(self.rbd_name, SNAPSHOT_CHUNK_SIZE)
+
     @staticmethod
     def is_shared_block_storage():
         return True
@@ -21,6 +21,7 @@ http://wiki.openstack.org/nova-image-cache-management.
 """
 
 import hashlib
+import hmac
 import os
 import re
 import time
@@ -28,19 +29,30 @@ import time
 from oslo_concurrency import lockutils
 from oslo_concurrency import processutils
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import encodeutils
+from oslo_utils import uuidutils
 import six
+import webob.dec
+import webob.exc
+import webob.static
 
 import nova.conf
+from nova import exception
+from nova.i18n import _
+from nova.image.download import peer
 import nova.privsep.path
 from nova import utils
 from nova.virt import imagecache
 from nova.virt.libvirt import utils as libvirt_utils
+from nova import wsgi
 
 LOG = logging.getLogger(__name__)
 
 CONF = nova.conf.CONF
 
+BACKING_INDEX_FILE = 'imagecache_backing_index.json'
+
 
 def get_cache_fname(image_id):
     """Return a filename based on the SHA1 hash of a given image ID.
@@ -53,10 +65,69 @@ def get_cache_fname(image_id):
     return hashlib.sha1(image_id.encode('utf-8')).hexdigest()
 
 
+class ImageCacheApp(object):
+    """WSGI application serving the cached images to other compute hosts.
+
+    An image is served at /images/<image id> when it is cached, see
+    nova.image.download.peer for the client side. Requests must carry the
+    [image_cache]/peer_transfer_token shared by the compute hosts.
+    """
+
+    def __init__(self, base_dir, token):
+        self.base_dir = base_dir
+        self.token = token
+
+    def _is_authorized(self, req):
+        token = req.headers.get(peer.TOKEN_HEADER)
+        if not self.token or not token:
+            return False
+        return hmac.compare_digest(token.encode('utf-8'),
+                                   self.token.encode('utf-8'))
+
+    @webob.dec.wsgify
+    def __call__(self, req):
+        if not self._is_authorized(req):
+            return webob.exc.HTTPForbidden()
+        if req.method not in ('GET', 'HEAD'):
+            return webob.exc.HTTPMethodNotAllowed()
+        prefix, _sep, image_id = req.path_info.strip('/').partition('/')
+        if prefix != 'images' or not uuidutils.is_uuid_like(image_id):
+            return webob.exc.HTTPNotFound()
+        # NOTE: Images are downloaded to a temporary file which is renamed
+        # once complete, so a partially downloaded image is never served.
+        path = os.path.join(self.base_dir, get_cache_fname(image_id))
+        if not os.path.isfile(path):
+            return webob.exc.HTTPNotFound()
+        return webob.static.FileApp(path)
+
+
+def start_peer_server():
+    """Start serving the cached images to other compute hosts.
+
+    :raises: InvalidConfiguration if [image_cache]/peer_transfer_token is not
+             set.
+    """
+    token = CONF.image_cache.peer_transfer_token
+    if not token:
+        raise exception.InvalidConfiguration(
+            _('[image_cache]/peer_transfer_token must be set when '
+              '[image_cache]/peer_transfer is enabled.'))
+    base_dir = os.path.join(CONF.instances_path,
+                            CONF.image_cache.subdirectory_name)
+    server = wsgi.Server('image_cache', ImageCacheApp(base_dir, token),
+                         host=CONF.image_cache.peer_transfer_listen,
+                         port=CONF.image_cache.peer_transfer_port)
+    server.start()
+    return server
+
+
 class ImageCacheManager(imagecache.ImageCacheManager):
     def __init__(self):
         super(ImageCacheManager, self).__init__()
         self.lock_path = os.path.join(CONF.instances_path, 'locks')
+        # The index of the backing files of the instance disks, loaded from
+        # BACKING_INDEX_FILE on first use.
+        self._backing_index = None
         self._reset_state()
 
     def _reset_state(self):
@@ -109,9 +180,83 @@ class ImageCacheManager(imagecache.ImageCacheManager):
             else:
                 self._store_swap_image(ent)
 
+    @staticmethod
+    def _get_backing_index_path():
+        return os.path.join(CONF.state_path, BACKING_INDEX_FILE)
+
+    def _load_backing_index(self):
+        """Return the index of the backing files of the instance disks.
+
+        The index maps the path of each instance disk to its backing file,
+        along with the inode of the disk and the modification time of its
+        instance directory when the backing file was read, which tell whether
+        the disk may have been replaced since. Returns None when the index is
+        disabled, and an index without disks when a full scan is due.
+        """
+        interval = CONF.image_cache.backing_file_full_scan_interval
+        if not interval:
+            return None
+
+        if self._backing_index is None:
+            path = self._get_backing_index_path()
+            try:
+                with open(path) as f:
+                    self._backing_index = jsonutils.loads(f.read())
+            except (IOError, OSError, ValueError) as e:
+                LOG.debug('Unable to read backing file index %(path)s: '
+                          '%(error)s', {'path': path, 'error': e})
+                self._backing_index = {'scan_time': 0, 'disks': {}}
+
+        now = time.time()
+        if now - self._backing_index['scan_time'] >= interval:
+            LOG.debug('Running a full scan of the backing files of the '
+                      'instance disks')
+            self._backing_index = {'scan_time': now, 'disks': {}}
+        return self._backing_index
+
+    def _save_backing_index(self):
+        path = self._get_backing_index_path()
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(jsonutils.dumps(self._backing_index))
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            LOG.warning('Unable to write backing file index %(path)s: '
+                        '%(error)s', {'path': path, 'error': e})
+
+    @staticmethod
+    def _get_disk_backing_file(disk_path, index, disks):
+        """Return the backing file of an instance disk.
+
+        The backing file recorded in the index is returned when the disk has
+        not been replaced since, and is read from the disk otherwise. The
+        backing file is recorded in disks.
+        """
+        if index is None:
+            return libvirt_utils.get_disk_backing_file(disk_path)
+
+        # NOTE: Operations which change the backing file of a disk, such as
+        # rebuild, resize or migration, create a new disk file in the
+        # instance directory, which changes both the inode of the disk and
+        # the modification time of the directory.
+        inode = os.stat(disk_path).st_ino
+        dir_mtime = os.path.getmtime(os.path.dirname(disk_path))
+        entry = index['disks'].get(disk_path)
+        if (entry and entry['inode'] == inode and
+                entry['dir_mtime'] == dir_mtime):
+            backing_file = entry['backing_file']
+        else:
+            backing_file = libvirt_utils.get_disk_backing_file(disk_path)
+        disks[disk_path] = {'inode': inode, 'dir_mtime': dir_mtime,
+                            'backing_file': backing_file}
+        return backing_file
+
     def _list_backing_images(self):
         """List the backing images currently in use."""
         inuse_images = []
+        index = self._load_backing_index()
+        disks = {}
         for ent in os.listdir(CONF.instances_path):
             if ent in self.instance_names:
                 LOG.debug('%s is a valid instance name', ent)
@@ -119,9 +264,9 @@ class ImageCacheManager(imagecache.ImageCacheManager):
                 if os.path.exists(disk_path):
                     LOG.debug('%s has a disk file', ent)
                     try:
-                        backing_file = libvirt_utils.get_disk_backing_file(
-                            disk_path)
-                    except processutils.ProcessExecutionError:
+                        backing_file = self._get_disk_backing_file(
+                            disk_path, index, disks)
+                    except (processutils.ProcessExecutionError, OSError):
                         # (for bug 1261442)
                         if not os.path.exists(disk_path):
                             LOG.debug('Failed to get disk backing file: %s',
@@ -149,6 +294,11 @@ class ImageCacheManager(imagecache.ImageCacheManager):
                                         {'instance': ent,
                                          'backing': backing_file})
                             self.unexplained_images.remove(backing_path)
+
+        if index is not None:
+            # NOTE: The disks of the instances which are gone are dropped.
+            index['disks'] = disks
+            self._save_backing_index()
         return inuse_images
 
     def _find_base_file(self, base_dir, fingerprint):
@@ -37,6 +37,14 @@ CONF = nova.conf.CONF
 # etc in Ocata.
 libvirt = None
 
+# Number of samples of the job stats, taken every 0.5 sec by the live
+# migration monitor, over which the transfer rate is estimated.
+CONVERGENCE_RATE_SAMPLES = 10
+# Number of iterations of the migration over which the memory left to
+# transfer must shrink by CONVERGENCE_RATIO for the migration to converge.
+CONVERGENCE_ITERATIONS = 4
+CONVERGENCE_RATIO = 0.9
+
 
 def graphics_listen_addrs(migrate_data):
     """Returns listen addresses of vnc/spice from a LibvirtLiveMigrateData"""
@@ -494,7 +502,9 @@ def update_downtime(guest, instance,
         LOG.debug("No current step", instance=instance)
         return olddowntime
 
-    if thisstep[1] == olddowntime:
+    # NOTE: The adaptive convergence may have raised the downtime above
+    # the current step already, which must not be lowered back.
+    if olddowntime is not None and thisstep[1] <= olddowntime:
         LOG.debug("Downtime does not need to change",
                   instance=instance)
         return olddowntime
@@ -513,6 +523,156 @@ def update_downtime(guest, instance,
     return thisstep[1]
 
 
+class ConvergenceEstimator(object):
+    """Estimate the convergence of a live migration from its job stats.
+
+    The transfer rate is estimated over the last CONVERGENCE_RATE_SAMPLES
+    samples, and the memory left to transfer at the start of each iteration,
+    which is the memory dirtied by the guest during the previous iteration,
+    is kept for the last CONVERGENCE_ITERATIONS iterations.
+    """
+
+    def __init__(self):
+        self._rate_samples = deque(maxlen=CONVERGENCE_RATE_SAMPLES)
+        self._iteration_remaining = deque(maxlen=CONVERGENCE_ITERATIONS)
+        self._iteration = None
+        self._remaining = 0
+
+    def add_sample(self, elapsed, info):
+        """Add a sample of the job stats.
+
+        :param elapsed: total elapsed time of migration in secs
+        :param info: a nova.virt.libvirt.guest.JobInfo
+        """
+        self._rate_samples.append((elapsed, info.memory_processed))
+        self._remaining = info.memory_remaining
+        if info.memory_iteration and info.memory_iteration != self._iteration:
+            self._iteration = info.memory_iteration
+            self._iteration_remaining.append(info.memory_remaining)
+
+    def transfer_rate(self):
+        """Return the transfer rate in bytes per sec, or None if unknown."""
+        if len(self._rate_samples) < 2:
+            return None
+        start_time, start_processed = self._rate_samples[0]
+        end_time, end_processed = self._rate_samples[-1]
+        if end_time <= start_time or end_processed <= start_processed:
+            return None
+        return (end_processed - start_processed) / (end_time - start_time)
+
+    def expected_downtime(self):
+        """Return the downtime in ms needed to complete the migration now,
+        or None if unknown.
+        """
+        rate = self.transfer_rate()
+        if not rate:
+            return None
+        return int(self._remaining * 1000 / rate)
+
+    def is_converging(self):
+        """Return False if the memory left to transfer no longer shrinks
+        between iterations, True otherwise.
+        """
+        if len(self._iteration_remaining) < CONVERGENCE_ITERATIONS:
+            return True
+        return (self._iteration_remaining[-1] <
+                self._iteration_remaining[0] * CONVERGENCE_RATIO)
+
+
+def update_downtime_adaptive(guest, instance, olddowntime, estimator):
+    """Raise max downtime to complete the migration if possible
+
+    :param guest: a nova.virt.libvirt.guest.Guest to set downtime for
+    :param instance: a nova.objects.Instance
+    :param olddowntime: current set downtime, or None
+    :param estimator: a ConvergenceEstimator of the migration
+
+    Raise the maximum downtime to the downtime expected to be needed
+    to complete the migration, with some margin, when that is within
+    the maximum permitted downtime, rather than waiting for the
+    downtime steps to reach it.
+
+    Any errors hit when updating downtime will be ignored
+
+    :returns: the new downtime value
+    """
+    expected = estimator.expected_downtime()
+    maxdowntime = CONF.libvirt.live_migration_downtime
+    if expected is None or expected > maxdowntime:
+        return olddowntime
+
+    downtime = min(int(expected * 1.5), maxdowntime)
+    if olddowntime is not None and downtime <= olddowntime:
+        return olddowntime
+
+    LOG.info("Increasing downtime to %(downtime)d ms to complete migration "
+             "with an expected downtime of %(expected)d ms",
+             {"downtime": downtime, "expected": expected},
+             instance=instance)
+    try:
+        guest.migrate_configure_max_downtime(downtime)
+    except libvirt.libvirtError as e:
+        LOG.warning("Unable to increase max downtime to %(time)d ms: %(e)s",
+                    {"time": downtime, "e": e}, instance=instance)
+        return olddowntime
+    return downtime
+
+
+def should_switch_to_postcopy(instance, estimator, migration_status):
+    """Determine if the migration should be switched to post-copy early
+
+    :param instance: a nova.objects.Instance
+    :param estimator: a ConvergenceEstimator of the migration
+    :param migration_status: current status of the migration
+
+    :returns: True if the migration is not converging and cannot be
+              completed within the maximum permitted downtime, False
+              otherwise
+    """
+    if migration_status == 'running (post-copy)':
+        return False
+
+    if estimator.is_converging():
+        return False
+
+    expected = estimator.expected_downtime()
+    if (expected is not None and
+            expected <= CONF.libvirt.live_migration_downtime):
+        return False
+
+    LOG.info("Live migration is not converging, expected downtime "
+             "%(expected)s ms", {"expected": expected}, instance=instance)
+    return True
+
+
+def get_disk_progress(guest, device_names):
+    """Get the progress of the copy of each block migrated disk
+
+    :param guest: a nova.virt.libvirt.guest.Guest being migrated
+    :param device_names: list of device names of the migrated disks
+
+    The disks of a block migration are copied by block copy jobs
+    running in parallel, whose progress is only reported as a whole
+    in the job stats of the migration.
+
+    Any errors hit when querying the block jobs will be ignored
+
+    :returns: a list of (device name, bytes copied, bytes to copy)
+              tuples for the disks still being copied
+    """
+    progress = []
+    for dev in device_names:
+        try:
+            job = guest.get_block_device(dev).get_job_info()
+        except libvirt.libvirtError as e:
+            LOG.debug("Unable to get the block job of %(dev)s: %(e)s",
+                      {"dev": dev, "e": e})
+            continue
+        if job is not None and job.end != 0:
+            progress.append((dev, job.cur, job.end))
+    return progress
+
+
 def save_stats(instance, migration, info, remaining):
     """Save migration stats to the database
 
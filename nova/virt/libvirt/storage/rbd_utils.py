@@ -14,6 +14,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
 from eventlet import tpool
 from six.moves import urllib
 
@@ -41,6 +43,12 @@ CONF = nova.conf.CONF
 
 LOG = logging.getLogger(__name__)
 
+# The connected librados clients shared by all operations of the process when
+# [libvirt]/rbd_persistent_connections is enabled, by RADOS client name and
+# Ceph configuration file.
+_RADOS_CLIENTS = {}
+_RADOS_CLIENTS_LOCK = threading.Lock()
+
 
 class RbdProxy(object):
     """A wrapper around rbd.RBD class instance to avoid blocking of process.
@@ -130,12 +138,43 @@ class RBDDriver(object):
         self.rbd_connect_timeout = CONF.libvirt.rbd_connect_timeout
         self.ceph_conf = CONF.libvirt.images_rbd_ceph_conf
 
-    def _connect_to_rados(self, pool=None):
+    def _new_rados_client(self):
         client = rados.Rados(rados_id=self.rbd_user,
                                   conffile=self.ceph_conf)
         try:
             #连接到ceph
             client.connect(timeout=self.rbd_connect_timeout)
+        except rados.Error:
+            # shutdown cannot raise an exception
+            client.shutdown()
+            raise
+        return client
+
+    def _get_rados_client(self):
+        """Return the connected librados client shared by the process."""
+        key = (self.rbd_user, self.ceph_conf)
+        with _RADOS_CLIENTS_LOCK:
+            client = _RADOS_CLIENTS.get(key)
+            if client is not None and client.state != 'connected':
+                LOG.info('Replacing the connection to the Ceph cluster of '
+                         'RADOS client %s in state %s', self.rbd_user,
+                         client.state)
+                del _RADOS_CLIENTS[key]
+                client = None
+            if client is None:
+                client = self._new_rados_client()
+                _RADOS_CLIENTS[key] = client
+            return client
+
+    def _is_shared_client(self, client):
+        return _RADOS_CLIENTS.get((self.rbd_user, self.ceph_conf)) is client
+
+    def _connect_to_rados(self, pool=None):
+        if CONF.libvirt.rbd_persistent_connections:
+            client = self._get_rados_client()
+        else:
+            client = self._new_rados_client()
+        try:
             pool_to_open = pool or self.pool
             # NOTE(luogangyi): open_ioctx >= 10.1.0 could handle unicode
             # arguments perfectly as part of Python 3 support.
@@ -145,13 +184,16 @@ class RBDDriver(object):
             return client, ioctx
         except rados.Error:
             # shutdown cannot raise an exception
-            client.shutdown()
+            if not self._is_shared_client(client):
+                client.shutdown()
             raise
 
     def _disconnect_from_rados(self, client, ioctx):
         # closing an ioctx cannot raise an exception
         ioctx.close()
-        client.shutdown()
+        # NOTE: The shared client is kept connected for the next operations.
+        if not self._is_shared_client(client):
+            client.shutdown()
 
     def ceph_args(self):
         """List of command line parameters to be passed to ceph commands to
@@ -371,6 +413,17 @@ class RBDDriver(object):
             for volume in filter(filter_fn, volumes):
                 self._destroy_volume(client, volume)
 
+    def read_chunks(self, name, chunk_size):
+        """Yield the content of an RBD image in chunks of chunk_size bytes.
+
+        :param name: Name of the RBD image
+        :param chunk_size: Maximum size in bytes of each chunk
+        """
+        with RBDVolumeProxy(self, name, read_only=True) as vol:
+            size = vol.size()
+            for offset in range(0, size, chunk_size):
+                yield vol.read(offset, min(chunk_size, size - offset))
+
     def get_pool_info(self):
         # NOTE(melwitt): We're executing 'ceph df' here instead of calling
         # the RADOSClient.get_cluster_stats python API because we need
@@ -381,8 +434,20 @@ class RBDDriver(object):
         # available storage per OSD, added together across all OSDs. The
         # MAX_AVAIL stat will divide by the replication size when doing the
         # calculation.
-        args = ['ceph', 'df', '--format=json'] + self.ceph_args()
-        out, _ = processutils.execute(*args)
+        if CONF.libvirt.rbd_persistent_connections:
+            # NOTE: Send the same command to the monitors through the shared
+            # connection rather than spawning the ceph CLI, which connects
+            # and authenticates to the cluster on every call.
+            client = self._get_rados_client()
+            cmd = jsonutils.dumps({'prefix': 'df', 'format': 'json'})
+            ret, out, status = tpool.execute(client.mon_command, cmd, b'')
+            if ret != 0:
+                raise exception.StorageError(
+                    reason=_('ceph df failed with error %(ret)d: '
+                             '%(status)s') % {'ret': ret, 'status': status})
+        else:
+            args = ['ceph', 'df', '--format=json'] + self.ceph_args()
+            out, _err = processutils.execute(*args)
         stats = jsonutils.loads(out)
 
         # Find the pool for which we are configured.
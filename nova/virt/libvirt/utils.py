@@ -23,6 +23,8 @@ import os
 import re
 import uuid
 
+from eventlet import queue
+from eventlet import tpool
 import os_traits
 from oslo_concurrency import processutils
 from oslo_log import log as logging
@@ -260,7 +262,12 @@ def copy_image(src, dest, host=None, receive=False,
         # coreutils 8.11, holes can be read efficiently too.
         # we add '-r' argument because ploop disks are directories
         #实现本地copy
-        processutils.execute('cp', '-r', src, dest)
+        if CONF.libvirt.reflink_copies:
+            # NOTE: With --reflink=auto, cp clones the data when the file
+            # system supports it and falls back to a sparse copy otherwise.
+            processutils.execute('cp', '-r', '--reflink=auto', src, dest)
+        else:
+            processutils.execute('cp', '-r', src, dest)
     else:
         if receive:
             src = "%s:%s" % (utils.safe_ip_format(host), src)
@@ -315,6 +322,84 @@ def extract_snapshot(disk_path, source_fmt, out_path, dest_fmt):
                          compress=compress)
 
 
+def read_file_chunks(path, chunk_size):
+    """Yield the content of a file in chunks of chunk_size bytes.
+
+    :param path: File to read
+    :param chunk_size: Maximum size in bytes of each chunk
+    """
+    with file_open(path, 'rb') as f:
+        while True:
+            chunk = tpool.execute(f.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def read_ahead(chunks, depth):
+    """Iterate over chunks while the next ones are read concurrently.
+
+    The chunks are read by a separate green thread, which keeps up to depth
+    chunks ahead of the caller, so that reading the chunks and consuming them,
+    for example uploading them, overlap.
+
+    :param chunks: Iterable of chunks of data to read ahead
+    :param depth: Maximum number of chunks read ahead
+    """
+    chunk_queue = queue.LightQueue(depth)
+
+    def _read():
+        try:
+            for chunk in chunks:
+                chunk_queue.put((chunk, None))
+            chunk_queue.put((None, None))
+        except Exception as e:
+            chunk_queue.put((None, e))
+
+    reader = utils.spawn(_read)
+    try:
+        while True:
+            chunk, error = chunk_queue.get()
+            if error is not None:
+                raise error
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        reader.kill()
+
+
+class IterableToFileAdapter(object):
+    """A degenerate file-like so that an iterable of chunks can be read like
+    a file.
+
+    The Glance client reads the data it uploads like a file, so this is the
+    adapter between the chunks of a streamed snapshot and the Glance client.
+    """
+
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.remaining_data = b''
+
+    def read(self, size=-1):
+        chunk = self.remaining_data
+        try:
+            while not chunk:
+                chunk = next(self.iterator)
+        except StopIteration:
+            return b''
+        if size is None or size < 0:
+            size = len(chunk)
+        return_value = chunk[0:size]
+        self.remaining_data = chunk[size:]
+        return return_value
+
+    def close(self):
+        close = getattr(self.iterator, 'close', None)
+        if close is not None:
+            close()
+
+
 def load_file(path):
     """Read contents of file
 